@@ -9,6 +9,15 @@ python manage.py collectstatic --noinput
 
 export PYTHONPATH=/app/naughtyDjango
 
+# SERVER_MODE=asgi: uvicorn 워커(이벤트 루프)로 실행 — 작업 대기/long-poll/SSE 연결이 프로세스를 점유하지 않는다
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    exec gunicorn main.asgi:application \
+        --bind 0.0.0.0:8000 \
+        --workers 4 \
+        --worker-class uvicorn.workers.UvicornWorker \
+        --timeout 30
+fi
+
 # gunicorn 실행
 exec gunicorn main.wsgi:application \
     --bind 0.0.0.0:8000 \
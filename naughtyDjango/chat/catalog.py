@@ -0,0 +1,45 @@
+# chat/catalog.py
+"""
+상품 카탈로그 공용 정보.
+
+- CATALOG_ALIAS : 검색/스크리너/조회 도구가 읽는 OpenSearch alias
+  (index_to_opensearch 가 financial-products-v<N> 를 만든 뒤 이 alias 를 원자적으로 교체)
+- 카탈로그 generation : alias 교체 때마다 1씩 증가하는 번호 (Redis 에 게시)
+  결과 캐시 등은 키에 generation 을 넣어 재색인 후 자동으로 무효화한다.
+"""
+import logging
+import os
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_ALIAS = os.getenv("OPENSEARCH_INDEX", "financial-products")
+CATALOG_GENERATION_KEY = "catalog:generation"
+
+
+def versioned_index_name(generation: int, alias: str = CATALOG_ALIAS) -> str:
+    return f"{alias}-v{generation}"
+
+
+def parse_generation(index_name: str, alias: str = CATALOG_ALIAS):
+    """'financial-products-v12' → 12 (형식이 다르면 None)."""
+    prefix = f"{alias}-v"
+    if not index_name.startswith(prefix):
+        return None
+    suffix = index_name[len(prefix):]
+    return int(suffix) if suffix.isdigit() else None
+
+
+def catalog_generation() -> int:
+    """현재 게시된 카탈로그 generation (Redis 장애/미게시 시 0)."""
+    try:
+        return int(cache.get(CATALOG_GENERATION_KEY) or 0)
+    except Exception as e:
+        logger.warning(f"catalog generation read failed: {e}")
+        return 0
+
+
+def publish_generation(generation: int) -> None:
+    """alias 교체 직후 호출. 만료 없이 보관한다."""
+    cache.set(CATALOG_GENERATION_KEY, int(generation), None)
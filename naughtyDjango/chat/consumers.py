@@ -0,0 +1,168 @@
+# chat/consumers.py
+"""
+프로필 수집 대화용 WebSocket 채널 (ASGI 모드, Django Channels).
+
+ws/chats/session/<session_id>/?username=<email> 로 연결하면 세션 하나당 연결 하나를 유지한다.
+HTTP 로 매 턴 chat_profile_gather/ → task/<id>/ 폴링 → profile/conflict/ 를 오가던 흐름을
+연결 하나에서 처리한다.
+
+클라이언트 → 서버
+- {"type": "message", "message": "..."}   사용자 발화 (process_chat_async 로 처리)
+- {"type": "conflict", "choice": "yes"|"no"} 프로필 충돌 응답
+- {"type": "ping"}
+
+서버 → 클라이언트 (CustomResponse 와 같은 isSuccess/code/message/result + event)
+- ready / processing / token / reply(다음 질문) / conflict(COMMON2001) / conflict_resolved / error / pong
+
+- 작업 결과는 작업 스트림(chat.stream_events)을 XREAD 로 기다렸다가 도착 즉시 push (폴링 없음)
+- 사용자 확인(DB 조회)은 연결 시 한 번만 하고, 대기 중인 충돌은 연결 상태로만 들고 있다가 그대로 반영한다
+"""
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from celery.result import AsyncResult
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from main.constants.error_codes import GeneralErrorCode
+from main.constants.success_codes import GeneralSuccessCode
+from chat.services import ChatService
+from chat.stream_events import TERMINAL_EVENTS, aread_events
+from chat.tasks import process_chat_async
+
+logger = logging.getLogger(__name__)
+
+# 작업 하나의 결과를 기다리는 최대 시간(초)
+WS_TASK_TIMEOUT_SECONDS = float(os.getenv("WS_TASK_TIMEOUT_SECONDS", 120))
+# 스트림 XREAD 한 번의 대기(초) — 이 간격으로 결과 백엔드도 확인
+WS_READ_BLOCK_SECONDS = 15
+
+
+class ProfileChatConsumer(AsyncJsonWebsocketConsumer):
+
+    async def connect(self):
+        self.session_id = self.scope["url_route"]["kwargs"]["session_id"]
+        query = parse_qs((self.scope.get("query_string") or b"").decode())
+        self.username = (query.get("username") or [""])[0]
+        self.pending_conflict = None
+        self.relays = set()
+
+        self.user = await database_sync_to_async(ChatService.get_or_validate_user)(self.username)
+        await self.accept()
+        if not self.user:
+            await self._push("error", False, GeneralErrorCode.USER_NOT_FOUND)
+            await self.close(code=4404)
+            return
+        logger.info("ws: connected", extra={"session_id": self.session_id, "username": self.username})
+        await self._push("ready", True, GeneralSuccessCode.OK, result={"session_id": self.session_id})
+
+    async def disconnect(self, code):
+        for relay in list(getattr(self, "relays", ())):
+            relay.cancel()
+        logger.info("ws: disconnected", extra={"session_id": getattr(self, "session_id", None), "code": code})
+
+    async def receive_json(self, content, **kwargs):
+        kind = content.get("type") if isinstance(content, dict) else None
+        if kind == "message":
+            await self._on_message((content.get("message") or "").strip())
+        elif kind == "conflict":
+            await self._on_conflict_choice(content.get("choice"))
+        elif kind == "ping":
+            await self._push("pong", True, GeneralSuccessCode.OK)
+        else:
+            await self._push("error", False, GeneralErrorCode.BAD_REQUEST, result={"type": kind})
+
+    async def _push(self, event, is_success, code, message=None, result=None):
+        await self.send_json({
+            "event": event,
+            "isSuccess": is_success,
+            "code": code[0],
+            "message": message or code[1],
+            "result": result if result is not None else {},
+        })
+
+    async def _on_message(self, message: str):
+        if not message:
+            await self._push("error", False, GeneralErrorCode.MESSAGE_REQUIRED)
+            return
+
+        await database_sync_to_async(ChatService.save_user_message)(self.session_id, self.username, message)
+
+        quick = ChatService.maybe_quick_reply(message)
+        if quick:
+            await database_sync_to_async(ChatService.save_assistant_message)(self.session_id, self.username, quick)
+            await self._push("reply", True, GeneralSuccessCode.OK, result={"response": quick})
+            return
+
+        task = await sync_to_async(process_chat_async.delay, thread_sensitive=False)(
+            self.session_id, self.username, message, ""
+        )
+        await self._push("processing", True, GeneralSuccessCode.OK, "처리 중입니다...", {"task_id": task.id})
+
+        relay = asyncio.ensure_future(self._relay(task.id))
+        self.relays.add(relay)
+        relay.add_done_callback(self.relays.discard)
+
+    async def _relay(self, task_id: str):
+        """작업 스트림을 읽어 토큰/결과/충돌을 도착하는 대로 push."""
+        started, last_id = time.monotonic(), "0"
+        try:
+            while time.monotonic() - started < WS_TASK_TIMEOUT_SECONDS:
+                left = WS_TASK_TIMEOUT_SECONDS - (time.monotonic() - started)
+                events = await aread_events(task_id, last_id, block_ms=int(min(WS_READ_BLOCK_SECONDS, left) * 1000) or 1)
+                for event_id, event, data in events:
+                    last_id = event_id
+                    if event == "token":
+                        await self._push("token", True, GeneralSuccessCode.OK, result={"task_id": task_id, **data})
+                    elif event in TERMINAL_EVENTS:
+                        await self._on_task_event(task_id, event, data)
+                        return
+                if not events and await sync_to_async(AsyncResult(task_id).ready, thread_sensitive=False)():
+                    # 스트림 기록이 유실된 경우 결과 백엔드에서 직접 읽는다
+                    result = await sync_to_async(AsyncResult(task_id).get, thread_sensitive=False)(propagate=False)
+                    await self._on_task_event(task_id, "done", {"result": result})
+                    return
+            await self._push("error", False, GeneralErrorCode.TASK_FAILED, "응답 시간이 초과되었습니다.",
+                             {"task_id": task_id, "status": "timeout"})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"ws relay failed: task_id={task_id}, {e}")
+            await self._push("error", False, GeneralErrorCode.TASK_FAILED, result={"task_id": task_id})
+
+    async def _on_task_event(self, task_id: str, event: str, data: dict):
+        result = data.get("result") if event == "done" else None
+        if event == "done" and isinstance(result, dict) and result.get("type") == "conflict_detected":
+            event, data = "conflict", result
+
+        if event == "conflict":
+            conflict_data = {data.get("field"): data.get("value")}
+            # 공용 캐시(chat:conflict_pending)에는 쓰지 않는다 — 다른 세션의 HTTP 응답에 섞이지 않도록 연결에만 둔다
+            self.pending_conflict = conflict_data
+            await self._push("conflict", True, GeneralSuccessCode.CONFLICTS, result={
+                "message": f"프로필 변경이 감지되었습니다: {data.get('field')} = {data.get('value')}",
+                "conflict_data": conflict_data,
+                "session_id": self.session_id,
+                "task_id": task_id,
+                "requires_confirmation": True,
+            })
+        elif event == "done" and isinstance(result, dict) and result.get("type") == "chat_response":
+            await self._push("reply", True, GeneralSuccessCode.OK,
+                             result={"task_id": task_id, "response": result.get("response")})
+        else:
+            await self._push("error", False, GeneralErrorCode.TASK_FAILED,
+                             result={"task_id": task_id, "status": "failed"})
+
+    async def _on_conflict_choice(self, choice):
+        if self.pending_conflict is None:
+            await self._push("error", False, GeneralErrorCode.NOT_CONFLICTS)
+            return
+        pending, self.pending_conflict = self.pending_conflict, None
+        message = await database_sync_to_async(ChatService.resolve_profile_conflict)(
+            self.session_id, choice, self.username, pending
+        )
+        await self._push("conflict_resolved", True, GeneralSuccessCode.OK, result={"message": message})
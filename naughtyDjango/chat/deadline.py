@@ -0,0 +1,113 @@
+# chat/deadline.py
+"""
+요청 단위 마감 시각(deadline) 전파.
+
+API 뷰가 요청을 받은 순간 마감 시각(epoch 초)을 정하고 Celery 작업 헤더로 넘기면,
+작업은 bind_deadline 으로 ContextVar 에 묶는다. 그 안에서 실행되는 LLM/임베딩/검색 호출은
+stage_budget 으로 "남은 시간 안에서의 한 번 시도 timeout + 허용 재시도 수"를 받아 쓴다.
+
+- 단계별 상한(STAGE_TIMEOUTS)보다 길게 기다리지 않고, 남은 시간이 STAGE_MIN_SECONDS 보다 적으면
+  그 단계를 시작하지 않고 DeadlineExceeded → 호출 측이 값싼 대체 응답을 돌려준다
+- 마감이 묶여 있지 않으면(관리 명령, 프로필 대화 등) 모든 함수가 None 을 돌려 기존 설정을 그대로 쓴다
+- 프로세스 간 전달이므로 monotonic 이 아니라 wall clock(time.time) 기준
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple
+
+# 추천 요청 전체 예산(초) — Celery soft limit(240초)보다 충분히 짧게
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", 45))
+# Celery 작업 헤더 이름
+DEADLINE_HEADER = "deadline_at"
+
+# 단계별 한 번 시도 timeout 상한(초)
+STAGE_TIMEOUTS = {
+    "llm": float(os.getenv("DEADLINE_LLM_TIMEOUT", 20)),
+    "agent_llm": float(os.getenv("DEADLINE_AGENT_LLM_TIMEOUT", 15)),
+    "embedding": float(os.getenv("DEADLINE_EMBEDDING_TIMEOUT", 5)),
+    "search": float(os.getenv("DEADLINE_SEARCH_TIMEOUT", 5)),
+}
+# 남은 시간이 이보다 적으면 그 단계를 시작하지 않는다
+STAGE_MIN_SECONDS = {"llm": 3.0, "agent_llm": 3.0, "embedding": 0.5, "search": 0.5}
+
+# 마감 안에 답을 만들 수 없을 때의 대체 응답
+DEADLINE_FALLBACK_MESSAGE = (
+    "답변을 준비하는 데 시간이 오래 걸려 여기서 멈췄어요. "
+    "조건을 조금 더 구체적으로 적어 다시 물어봐 주세요. 예) '국내 PBR 1 미만 상위 5개', '삼성전자 정보'"
+)
+# 스트리밍 답변을 받는 도중 마감이 지나 끊었을 때 받은 부분 뒤에 붙이는 안내
+DEADLINE_TRUNCATED_NOTE = "\n\n(응답 시간 제한으로 답변을 여기까지만 보여드려요.)"
+
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, stage: str, remaining: float):
+        super().__init__(f"deadline exceeded before {stage} (remaining {remaining:.2f}s)")
+        self.stage = stage
+        self.remaining = remaining
+
+
+def new_deadline(seconds: Optional[float] = None) -> float:
+    return time.time() + (REQUEST_DEADLINE_SECONDS if seconds is None else seconds)
+
+
+def current_deadline() -> Optional[float]:
+    return _DEADLINE.get()
+
+
+def remaining() -> Optional[float]:
+    """남은 시간(초). 마감이 없으면 None."""
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline - time.time()
+
+
+@contextmanager
+def bind_deadline(deadline: Optional[float]) -> Iterator[None]:
+    token = _DEADLINE.set(float(deadline) if deadline else None)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def deadline_from_request(request) -> Optional[float]:
+    """Celery task.request 에서 헤더로 넘어온 마감 시각."""
+    value = getattr(request, DEADLINE_HEADER, None)
+    if value is None:
+        value = (getattr(request, "headers", None) or {}).get(DEADLINE_HEADER)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def check(stage: str) -> Optional[float]:
+    """단계를 시작해도 되는지 확인. 남은 시간(없으면 None)을 돌려주고, 부족하면 DeadlineExceeded."""
+    left = remaining()
+    if left is not None and left < STAGE_MIN_SECONDS.get(stage, 0.0):
+        raise DeadlineExceeded(stage, left)
+    return left
+
+
+def stage_budget(stage: str, max_retries: int = 0) -> Optional[Tuple[float, int]]:
+    """
+    (한 번 시도 timeout, 허용 재시도 수). 마감이 없으면 None.
+    재시도는 timeout 을 다 쓰고도 남은 시간 안에 들어가는 만큼만 허용한다.
+    """
+    left = check(stage)
+    if left is None:
+        return None
+    timeout = min(STAGE_TIMEOUTS[stage], left)
+    retries = min(max_retries, max(0, int(left // timeout) - 1))
+    return timeout, retries
+
+
+def attempt_timeout(stage: str, attempts: int) -> Optional[float]:
+    """클라이언트가 재시도 횟수를 정해 두는 경우(OpenSearch transport) 모든 시도가 남은 시간에 들어가는 timeout."""
+    left = check(stage)
+    if left is None:
+        return None
+    return min(STAGE_TIMEOUTS[stage], left / max(1, attempts))
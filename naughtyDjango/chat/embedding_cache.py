@@ -0,0 +1,123 @@
+# chat/embedding_cache.py
+"""
+질의 임베딩 2단 캐시.
+
+- L1: 프로세스 내 LRU (TTL 포함, float32 ndarray 로 보관)
+- L2: Redis(django cache) — float32 bytes 로 저장 (JSON 리스트 대비 약 1/4 크기)
+- 키: 모델명 + 정규화된 질의 텍스트(NFKC, 공백 정리)의 SHA-256
+
+검색(search_financial_products), opensearch_service 명령, SelfQueryRetriever 의
+임베딩 함수가 모두 이 모듈을 거치므로 같은 질의는 한 번만 임베딩된다.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import List, Optional
+
+import numpy as np
+from django.core.cache import cache
+
+from chat.gpt.openai_client import budgeted_openai_client
+from chat.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_CACHE_PREFIX = "emb:v1"
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", 7 * 24 * 3600))
+EMBEDDING_CACHE_L1_SIZE = int(os.getenv("EMBEDDING_CACHE_L1_SIZE", 2048))
+EMBEDDING_CACHE_L1_TTL = float(os.getenv("EMBEDDING_CACHE_L1_TTL", 3600))
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """캐시 키/임베딩 입력으로 쓰는 정규화 텍스트."""
+    return _WS_RE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+_l1 = LRUCache(EMBEDDING_CACHE_L1_SIZE, EMBEDDING_CACHE_L1_TTL)
+_stats_lock = threading.Lock()
+_stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+
+
+def _bump(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += n
+
+
+def _cache_key(normalized: str, model: str) -> str:
+    digest = hashlib.sha256(f"{model}\x00{normalized}".encode("utf-8")).hexdigest()
+    return f"{EMBEDDING_CACHE_PREFIX}:{model}:{digest}"
+
+
+def _lookup(key: str) -> Optional[np.ndarray]:
+    vec = _l1.get(key)
+    if vec is not None:
+        _bump("l1_hits")
+        return vec
+    try:
+        raw = cache.get(key)
+    except Exception as e:
+        logger.warning(f"embedding cache get failed: {e}")
+        raw = None
+    if raw is not None:
+        vec = np.frombuffer(raw, dtype=np.float32)
+        _l1.set(key, vec)
+        _bump("l2_hits")
+        return vec
+    return None
+
+
+def _store(key: str, vec: np.ndarray) -> None:
+    _l1.set(key, vec)
+    try:
+        cache.set(key, vec.tobytes(), EMBEDDING_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"embedding cache set failed: {e}")
+
+
+def embed_queries(texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+    """여러 질의를 임베딩한다. 캐시에 없는 것만 한 번의 API 호출로 묶어 요청한다."""
+    normalized = [normalize_query(t) for t in texts]
+    keys = [_cache_key(n, model) for n in normalized]
+    vectors: List[Optional[np.ndarray]] = [_lookup(k) for k in keys]
+
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        _bump("misses", len(missing))
+        # 같은 배치 안의 중복 질의는 한 번만 요청
+        unique_inputs = list(dict.fromkeys(normalized[i] for i in missing))
+        resp = budgeted_openai_client("embedding").embeddings.create(model=model, input=unique_inputs)
+        fetched = {
+            text: np.asarray(item.embedding, dtype=np.float32)
+            for text, item in zip(unique_inputs, resp.data)
+        }
+        for i in missing:
+            vectors[i] = fetched[normalized[i]]
+            _store(keys[i], vectors[i])
+
+    return [v.tolist() for v in vectors]
+
+
+def embed_query(text: str, model: str = EMBEDDING_MODEL) -> List[float]:
+    """단일 질의 임베딩 (캐시 적용)."""
+    return embed_queries([text], model=model)[0]
+
+
+def embedding_cache_stats() -> dict:
+    """이 프로세스의 L1/L2 적중 수와 적중률."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    total = snapshot["l1_hits"] + snapshot["l2_hits"] + snapshot["misses"]
+    hits = snapshot["l1_hits"] + snapshot["l2_hits"]
+    snapshot["l1_size"] = len(_l1)
+    snapshot["hit_rate"] = round(hits / total, 4) if total else 0.0
+    return snapshot
+
+
+def clear_local_embedding_cache() -> None:
+    _l1.clear()
@@ -0,0 +1,110 @@
+# chat/gpt/completion_cache.py
+"""
+Chat Completion 응답 캐시.
+
+- 키: model + messages + 샘플링 파라미터를 정규화(JSON)한 SHA-256 다이제스트.
+  내장 hash()는 프로세스마다 salt 가 달라 gunicorn/Celery 워커 간 공유가 되지 않는다.
+- 값: content, finish_reason, 토큰 usage 만 저장한다. (ChatCompletion 객체 pickle 금지)
+- hit/miss 카운터는 Redis 에 누적해 모든 워커의 합계를 조회할 수 있다.
+"""
+import hashlib
+import json
+import logging
+import os
+from types import SimpleNamespace
+from typing import Optional
+
+from django.core.cache import cache
+
+from chat.stats import incr_counter
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "gpt:completion:v1"
+STATS_PREFIX = "gpt:completion:stats"
+COMPLETION_CACHE_TTL = int(os.getenv("OPENAI_COMPLETION_CACHE_TTL", 300))
+
+# 응답 내용에 영향을 주지 않는 호출 옵션은 키에서 제외
+_NON_SEMANTIC_PARAMS = {"timeout", "user", "extra_headers", "extra_query", "extra_body", "stream"}
+
+
+def make_cache_key(model: str, messages: list, params: dict) -> str:
+    """모델/메시지/파라미터의 정규화 표현으로 프로세스 독립적인 캐시 키를 만든다."""
+    semantic = {k: v for k, v in (params or {}).items() if k not in _NON_SEMANTIC_PARAMS and v is not None}
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "params": semantic},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return f"{CACHE_PREFIX}:{digest}"
+
+
+def payload_from_completion(response) -> dict:
+    """ChatCompletion 에서 캐시에 저장할 최소 정보만 추출한다."""
+    choice = response.choices[0]
+    usage = getattr(response, "usage", None)
+    return {
+        "model": getattr(response, "model", None),
+        "content": choice.message.content,
+        "finish_reason": getattr(choice, "finish_reason", None),
+        "usage": {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+        },
+    }
+
+
+def completion_from_payload(payload: dict, cached: bool = False):
+    """
+    저장된 payload 를 ChatCompletion 과 같은 모양(response.choices[0].message.content)으로 감싼다.
+    호출부는 캐시 적중 여부와 관계없이 동일한 방식으로 응답을 읽을 수 있다.
+    """
+    message = SimpleNamespace(role="assistant", content=payload.get("content"))
+    choice = SimpleNamespace(index=0, message=message, finish_reason=payload.get("finish_reason"))
+    return SimpleNamespace(
+        model=payload.get("model"),
+        choices=[choice],
+        usage=SimpleNamespace(**payload.get("usage", {})),
+        cached=cached,
+    )
+
+
+def get_cached(cache_key: str) -> Optional[dict]:
+    try:
+        payload = cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"completion cache get failed: {e}")
+        payload = None
+    _bump("hits" if payload is not None else "misses")
+    return payload
+
+
+def set_cached(cache_key: str, payload: dict, ttl: int = COMPLETION_CACHE_TTL) -> None:
+    try:
+        cache.set(cache_key, payload, ttl)
+    except Exception as e:
+        logger.warning(f"completion cache set failed: {e}")
+
+
+def _bump(name: str) -> None:
+    incr_counter(f"{STATS_PREFIX}:{name}")
+
+
+def completion_cache_stats() -> dict:
+    """전체 워커 누적 hit/miss 와 적중률을 반환한다."""
+    hits = cache.get(f"{STATS_PREFIX}:hits") or 0
+    misses = cache.get(f"{STATS_PREFIX}:misses") or 0
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_completion_cache_stats() -> None:
+    cache.delete_many([f"{STATS_PREFIX}:hits", f"{STATS_PREFIX}:misses"])
@@ -72,6 +72,7 @@ def _rephrase_question_with_llm(last_asked_key: str, user_input: str) -> str:
         model="gpt-3.5-turbo",
         temperature=0.3,
         max_tokens=150,
+        use_cache=False,  # 재질문은 매번 다른 표현이어야 하므로 캐시하지 않는다
     )
     return (response.choices[0].message.content or "").strip()
 
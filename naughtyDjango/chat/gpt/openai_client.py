@@ -1,40 +1,247 @@
 import os
+import logging
+import threading
 from dotenv import load_dotenv
-from openai import OpenAI
-from django.core.cache import cache
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+from chat.gpt.completion_cache import (
+    make_cache_key,
+    get_cached,
+    set_cached,
+    payload_from_completion,
+    completion_from_payload,
+    completion_cache_stats,
+)
+from chat.singleflight import SINGLEFLIGHT_WAIT_TIMEOUT, single_flight
+from chat.deadline import attempt_timeout, stage_budget
 
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
+# ── 커넥션 풀/타임아웃/재시도 설정 (환경 변수로 조정) ──
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 20))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 10))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 60))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 30))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", 5))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
 
-class OptimizedOpenAIClient:
-    """OpenAI 호출에 간단 캐싱과 재시도/타임아웃을 적용한 래퍼"""
 
-    def __init__(self):
-        self.client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            max_retries=2,
-            timeout=30.0,
+# ==========================================================
+# 프로세스 단위 OpenAI 클라이언트 레지스트리
+# - chat / embeddings / LangChain(ChatOpenAI) 모두 같은 httpx.Client(같은 HTTP 커넥션 풀)를 사용
+# - fork 이후에는 부모의 소켓을 공유하지 않도록 pid 가 바뀌면 새로 만든다
+# - Celery worker_process_init 에서 reset_clients() 로 명시적으로 초기화
+# ==========================================================
+_registry_lock = threading.Lock()
+_registry = {"pid": None, "http": None, "sync": None, "async": None}
+_metrics_lock = threading.Lock()
+_metrics = {"requests": 0, "connections_opened": 0}
+
+
+def _bump_metric(name: str) -> None:
+    with _metrics_lock:
+        _metrics[name] += 1
+
+
+def _trace(event_name, info):
+    # httpcore trace 확장: 새 TCP 연결이 열릴 때만 카운트 (나머지는 재사용)
+    if event_name == "connection.connect_tcp.complete":
+        _bump_metric("connections_opened")
+
+
+async def _atrace(event_name, info):
+    _trace(event_name, info)
+
+
+def _on_request(request):
+    _bump_metric("requests")
+    request.extensions["trace"] = _trace
+
+
+async def _aon_request(request):
+    _bump_metric("requests")
+    request.extensions["trace"] = _atrace
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+
+
+def _ensure_current_process() -> None:
+    if _registry["pid"] != os.getpid():
+        _registry.update({"pid": os.getpid(), "http": None, "sync": None, "async": None})
+
+
+def _http_client_locked() -> httpx.Client:
+    # _registry_lock 을 잡은 상태에서 호출
+    if _registry["http"] is None:
+        _registry["http"] = DefaultHttpxClient(
+            limits=_limits(),
+            timeout=_timeout(),
+            event_hooks={"request": [_on_request]},
         )
+    return _registry["http"]
+
+
+def get_http_client() -> httpx.Client:
+    """
+    프로세스 공용 httpx.Client. get_openai_client() 와 LangChain(ChatOpenAI(http_client=...))에
+    같은 객체를 넘겨 하나의 커넥션 풀을 쓴다.
+    """
+    with _registry_lock:
+        _ensure_current_process()
+        return _http_client_locked()
 
-    def create_completion(self, messages, model="gpt-3.5-turbo", **kwargs):
-        # 동일한 메시지 배열에 대해 캐시를 먼저 확인
-        prompt_str = str(messages)
-        cache_key = f"gpt_response_{hash(prompt_str)}"
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
 
-        response = self.client.chat.completions.create(
+def get_openai_client() -> OpenAI:
+    """프로세스 공용 동기 OpenAI 클라이언트 (chat / embeddings 공용)."""
+    with _registry_lock:
+        _ensure_current_process()
+        if _registry["sync"] is None:
+            _registry["sync"] = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=OPENAI_MAX_RETRIES,
+                timeout=_timeout(),
+                http_client=_http_client_locked(),
+            )
+        return _registry["sync"]
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """프로세스 공용 비동기 OpenAI 클라이언트 (ASGI 뷰 등 이벤트 루프 안에서 사용)."""
+    with _registry_lock:
+        _ensure_current_process()
+        if _registry["async"] is None:
+            _registry["async"] = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=OPENAI_MAX_RETRIES,
+                timeout=_timeout(),
+                http_client=DefaultAsyncHttpxClient(
+                    limits=_limits(),
+                    timeout=_timeout(),
+                    event_hooks={"request": [_aon_request]},
+                ),
+            )
+        return _registry["async"]
+
+
+def budgeted_openai_client(stage: str = "llm") -> OpenAI:
+    """
+    요청 마감(chat.deadline)이 묶여 있으면 남은 시간에 맞춘 timeout/max_retries 를 적용한 클라이언트.
+    with_options 는 같은 HTTP 커넥션 풀을 공유하는 얕은 복사본이다. 마감이 없으면 공용 클라이언트 그대로.
+    """
+    base = get_openai_client()
+    budget = stage_budget(stage, OPENAI_MAX_RETRIES)
+    if budget is None:
+        return base
+    timeout, retries = budget
+    return base.with_options(timeout=httpx.Timeout(timeout, connect=min(OPENAI_CONNECT_TIMEOUT, timeout)),
+                             max_retries=retries)
+
+
+def reset_clients() -> None:
+    """
+    레지스트리를 비운다. (Celery 자식 프로세스 시작 시 호출)
+    fork 로 물려받은 클라이언트는 닫지 않고 참조만 버린다 — 부모가 쓰는 소켓을 건드리지 않기 위함.
+    """
+    with _registry_lock:
+        if _registry["pid"] == os.getpid() and _registry["http"] is not None:
+            try:
+                _registry["http"].close()
+            except Exception:
+                pass
+        _registry.update({"pid": os.getpid(), "http": None, "sync": None, "async": None})
+    with _metrics_lock:
+        _metrics.update({"requests": 0, "connections_opened": 0})
+
+
+def client_metrics() -> dict:
+    """이 프로세스의 OpenAI HTTP 요청 수와 커넥션 재사용률."""
+    with _metrics_lock:
+        requests = _metrics["requests"]
+        opened = _metrics["connections_opened"]
+    reused = max(0, requests - opened)
+    return {
+        "pid": os.getpid(),
+        "requests": requests,
+        "connections_opened": opened,
+        "connections_reused": reused,
+        "reuse_ratio": round(reused / requests, 4) if requests else 0.0,
+    }
+
+
+def _flight_wait() -> float:
+    """follower 가 leader 를 기다리는 시간 — 요청 마감이 있으면 남은 시간 안으로 제한."""
+    left = attempt_timeout("llm", 1)
+    return SINGLEFLIGHT_WAIT_TIMEOUT if left is None else min(SINGLEFLIGHT_WAIT_TIMEOUT, left)
+
+
+class OptimizedOpenAIClient:
+    """OpenAI 호출에 내용 기반 캐싱과 재시도/타임아웃을 적용한 래퍼"""
+
+    @property
+    def client(self) -> OpenAI:
+        # 프로세스 공용 풀링 클라이언트를 사용 (reset_clients 이후에도 항상 최신)
+        return get_openai_client()
+
+    def create_completion(self, messages, model="gpt-3.5-turbo", use_cache=None, **kwargs):
+        """
+        동일한 (model, messages, 샘플링 파라미터) 요청은 워커와 무관하게 캐시에서 응답합니다.
+        use_cache 를 지정하지 않으면 temperature 0 호출만 캐시합니다
+        (temperature > 0 은 매번 다른 표현을 기대하는 호출이므로 같은 답을 재사용하지 않음).
+        """
+        if use_cache is None:
+            use_cache = kwargs.get("temperature", 1) == 0
+        if not use_cache:
+            return completion_from_payload(self._complete(messages, model, kwargs))
+
+        cache_key = make_cache_key(model, messages, kwargs)
+        cached = get_cached(cache_key)
+        if cached is not None:
+            return completion_from_payload(cached, cached=True)
+
+        # 같은 요청이 여러 워커에서 동시에 들어오면 한 곳에서만 OpenAI 를 호출
+        payload = single_flight(
+            cache_key,
+            lambda: self._complete_and_store(cache_key, messages, model, kwargs),
+            wait_timeout=_flight_wait(),
+        )
+        return completion_from_payload(payload)
+
+    def _complete(self, messages, model, kwargs) -> dict:
+        # 요청 마감이 있으면 남은 시간 안에서만 기다리고 재시도한다
+        response = budgeted_openai_client("llm").chat.completions.create(
             model=model,
             messages=messages,
             **kwargs,
         )
+        # ChatCompletion 객체 대신 content/usage 만 다룸
+        return payload_from_completion(response)
+
+    def _complete_and_store(self, cache_key, messages, model, kwargs) -> dict:
+        payload = self._complete(messages, model, kwargs)
+        set_cached(cache_key, payload)
+        return payload
+
+    @staticmethod
+    def cache_stats() -> dict:
+        return completion_cache_stats()
 
-        # 응답을 5분간 캐싱
-        cache.set(cache_key, response, 300)
-        return response
+    @staticmethod
+    def connection_stats() -> dict:
+        return client_metrics()
 
 
 # 모듈 단일 인스턴스
-client = OptimizedOpenAIClient()
\ No newline at end of file
+client = OptimizedOpenAIClient()
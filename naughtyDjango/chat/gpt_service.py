@@ -1,48 +1,20 @@
 import uuid
-from openai import OpenAI
 from dotenv import load_dotenv
-import os
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.runnables import RunnableLambda
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from django.core.cache import cache
 from django.contrib.auth.models import User
 import re
 import ast
 import json
 from functools import partial, lru_cache
+from chat.gpt.openai_client import client, budgeted_openai_client
+from chat.stream_events import stream_chat_completion
+from chat.deadline import DeadlineExceeded
 
 load_dotenv()
 
-# 캐싱을 이용해서 최적화
-class OptimizedOpenAIClient:
-    def __init__(self):
-        self.client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            max_retries=2,
-            timeout=30.0
-        )
-
-    def create_completion(self, messages, model="gpt-3.5-turbo", **kwargs):
-        # 반복되는 쿼리가 있으면 캐시 먼저 확인
-        prompt_str = str(messages)
-        cache_key = f"gpt_response_{hash(prompt_str)}"
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-
-        response = self.client.chat.completions.create(
-            model=model,
-            messages=messages,
-            **kwargs
-        )
-
-        # Cache for 5 minutes
-        cache.set(cache_key, response, 300)
-        return response
-
-client = OptimizedOpenAIClient()
 fine_tuned_model = "ft:gpt-3.5-turbo-0125:personal::BDpYRjbn"
 store = {}
 SESSION_TEMP_STORE = {}
@@ -334,9 +306,14 @@ def handle_chat(user_input, session_id, user_id=None):
 def handle_chitchat(query: str) -> str:
     """
     RAG 검색 없이 일반적인 대화를 처리합니다.
+    요청 마감이 얼마 남지 않았으면 LLM 을 부르지 않고 짧은 안내로 대신합니다.
     """
-    openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    response = openai_client.chat.completions.create(
+    try:
+        openai_client = budgeted_openai_client("llm")
+    except DeadlineExceeded:
+        return "잠시 응답이 지연되고 있어요. 다시 한 번 말씀해 주시겠어요?"
+    return stream_chat_completion(
+        openai_client,
         model="gpt-3.5-turbo",
         messages=[
             {"role": "system", "content": "당신은 친절한 금융 상담 챗봇입니다."},
@@ -344,5 +321,4 @@ def handle_chitchat(query: str) -> str:
         ],
         temperature=0.7,
         max_tokens=500
-    )
-    return response.choices[0].message.content
\ No newline at end of file
+    )
\ No newline at end of file
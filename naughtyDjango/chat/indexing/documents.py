@@ -0,0 +1,175 @@
+# chat/indexing/documents.py
+"""
+인덱싱 문서 구성 요소.
+
+RDS 테이블 행 → (임베딩용 한글 요약 텍스트, OpenSearch bulk 액션) 변환을 담당한다.
+index_to_opensearch 명령의 스트리밍 파이프라인(chat.indexing.pipeline)에서 사용한다.
+"""
+
+# 인덱싱 대상 테이블 → 한글 상품 유형
+TABLES = {
+    "deposit": "예금",
+    "savings": "적금",
+    "annuity": "연금",
+    "krx_stock_info": "국내주식",
+    "nasdaq_stock_info": "해외주식",
+}
+
+# float 으로 색인할 숫자 컬럼
+NUMERIC_FIELDS = [
+    'per', 'pbr', 'eps', 'perx', 'pbrx', 'epsx', 'stck_prpr', 'last',
+    'avg_prft_rate', 'btrm_prft_rate1', 'guar_rate'
+]
+
+# 주식 문서에 색인 시점에 더하는 팩터 필드 (chat.indexing.factors)
+FACTOR_FIELDS = [f"{factor}_{kind}" for factor in ("per", "pbr", "eps") for kind in ("pct", "z")]
+SCORE_FIELDS = ["score_value", "score_growth", "score_stable", "score_balanced"]
+
+EMBEDDING_DIM = 1536
+
+# k-NN 인덱스 설정/매핑
+INDEX_BODY = {
+    "settings": {"index": {"knn": True}},
+    "mappings": {
+        "_source": {"excludes": ["embedding"]},
+        "properties": {
+            "text": {"type": "text"},
+            "product_type": {"type": "keyword"},
+            "table": {"type": "keyword"},
+            "embedding": {"type": "knn_vector", "dimension": EMBEDDING_DIM},
+            "per": {"type": "float"},
+            "pbr": {"type": "float"},
+            "eps": {"type": "float"},
+            "perx": {"type": "float"},
+            "pbrx": {"type": "float"},
+            "epsx": {"type": "float"},
+            "stck_prpr": {"type": "float"},
+            "last": {"type": "float"},
+            "avg_prft_rate": {"type": "float"},
+            "btrm_prft_rate1": {"type": "float"},
+            "guar_rate": {"type": "float"},
+            **{field: {"type": "float"} for field in FACTOR_FIELDS + SCORE_FIELDS},
+        }
+    }
+}
+
+KOR_LABELS = {
+    "deposit": {
+        "kor_co_nm": "금융회사",
+        "fin_prdt_nm": "상품명",
+        "spcl_cnd": "우대조건",
+        "join_member": "가입대상",
+        "join_way": "가입방법",
+        "mtrt_int": "만기후이자",
+        "etc_note": "비고",
+    },
+    "savings": {
+        "kor_co_nm": "금융회사",
+        "fin_prdt_nm": "상품명",
+        "spcl_cnd": "우대조건",
+        "join_member": "가입대상",
+        "join_way": "가입방법",
+        "mtrt_int": "만기후이자",
+        "etc_note": "비고",
+    },
+    "annuity": {
+        "kor_co_nm": "운용회사",
+        "fin_prdt_nm": "상품명",
+        "pnsn_kind_nm": "연금종류",
+        "prdt_type_nm": "상품유형",
+        "avg_prft_rate": "평균수익률(%)",
+        "btrm_prft_rate1": "전년도수익률(%)",
+        "guar_rate": "최저보증이율(%)",
+        "sale_co": "판매사",
+        "join_way": "가입방법",
+        "sale_strt_day": "판매시작일",
+    },
+    "krx_stock_info": {
+        "bstp_kor_isnm": "종목명",
+        "prdt_abrv_name": "약식명",
+        "stck_shrn_iscd": "종목코드",
+        "stck_prpr": "현재가(원)",
+        "per": "PER",
+        "pbr": "PBR",
+        "eps": "EPS",
+    },
+    "nasdaq_stock_info": {
+        "prdt_abrv_name": "약식명",
+        "code": "티커",
+        "last": "현재가($)",
+        "perx": "PER",
+        "pbrx": "PBR",
+        "epsx": "EPS",
+        "e_icod": "섹터",
+    },
+}
+
+SYNONYM_TAGS = {
+    "deposit": "키워드: 예금, 정기예금, 금리, 이율, 우대조건",
+    "savings": "키워드: 적금, 정기적금, 자유적금, 금리, 이율, 우대",
+    "annuity": "키워드: 연금, 연금저축, 연금보험, IRP, 보증이율, 최저보증",
+    "krx_stock_info": "키워드: 국내주식, PER, PBR, EPS",
+    "nasdaq_stock_info": "키워드: 해외주식, PER, PBR, EPS, 나스닥",
+}
+
+def readable_text(row: dict, tbl: str, product_type_ko: str) -> str:
+    """
+    한글 라벨을 적용해 사람이 읽기 쉬운 요약 텍스트를 생성.
+    임베딩 품질을 위해 [상품유형] 토큰과 유의어 키워드를 포함.
+    """
+    labels = KOR_LABELS.get(tbl, {})
+    parts = [f"[{product_type_ko}]"]  # 예: [예금], [적금], [연금], [국내주식], [해외주식]
+
+    # 라벨 순서대로 먼저 출력하고, 남은 컬럼은 원래 컬럼명으로 보강
+    used = set()
+    for col in labels.keys():
+        if col in row and row[col] not in (None, ""):
+            parts.append(f"{labels[col]}: {row[col]}")
+            used.add(col)
+
+    for col, val in row.items():
+        if col in used or val in (None, ""):
+            continue
+        parts.append(f"{col}: {val}")
+
+    # 유의어 키워드 라인 추가(시맨틱 매칭 강화를 위한 약한 프롬프트)
+    syn = SYNONYM_TAGS.get(tbl)
+    if syn:
+        parts.append(syn)
+
+    return "\n".join(parts)
+
+
+def coerce_numeric_fields(row: dict) -> dict:
+    """숫자 필드를 float 으로 변환 (변환 불가 값은 None)."""
+    for field in NUMERIC_FIELDS:
+        if field in row and row[field] is not None:
+            try:
+                # 쉼표(,)가 포함된 숫자 문자열 처리 (예: "1,234.5")
+                if isinstance(row[field], str):
+                    row[field] = row[field].replace(',', '')
+                row[field] = float(row[field])
+            except (ValueError, TypeError):
+                # 숫자로 변환할 수 없는 값(예: 'N/A')은 None으로 처리
+                row[field] = None
+    return row
+
+
+def doc_id(tbl: str, row: dict) -> str:
+    return f"{tbl}-{row['id']}"
+
+
+def build_action(row: dict, tbl: str, product_type_ko: str, text: str, vector, index_name: str) -> dict:
+    """OpenSearch bulk index 액션을 만든다. (row 는 coerce_numeric_fields 적용 후)"""
+    return {
+        "_op_type": "index",
+        "_index": index_name,
+        "_id": doc_id(tbl, row),
+        "_source": {
+            **row,  # DB에서 읽어온 모든 컬럼(per, pbr 등)을 여기에 포함
+            "text": text,
+            "embedding": vector,
+            "table": tbl,
+            "product_type": product_type_ko
+        }
+    }
@@ -0,0 +1,197 @@
+# chat/indexing/embedding_store.py
+"""
+증분 재색인을 위한 영구 저장소 (로컬 SQLite).
+
+- embeddings: content hash → float32 임베딩 (같은 텍스트는 다시 임베딩하지 않음)
+- documents : 문서 id → 마지막으로 색인한 content hash / 마지막으로 본 run id
+  · hash 가 같으면 bulk 쓰기를 건너뛰고
+  · 이번 run 에서 보이지 않은 문서는 삭제 대상으로 판단한다
+- runs / checkpoints : 재색인 run 의 plan 과 테이블(구간)별 마지막 커밋 PK
+  · 임베딩은 받자마자 embeddings 에 저장되므로 중단돼도 다시 요청하지 않는다
+  · --resume / Celery 재시도는 체크포인트 다음 PK 부터 이어서 색인한다
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "var", "embedding_store.sqlite3",
+)
+EMBEDDING_STORE_PATH = os.getenv("INDEX_EMBEDDING_STORE", _DEFAULT_PATH)
+
+
+def content_hash(text: str, model: str) -> str:
+    """임베딩 입력 텍스트 + 모델명의 해시 (모델이 바뀌면 자동으로 재임베딩)."""
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """스레드 간 공유 가능한 SQLite 래퍼 (임베딩 스레드와 bulk 스레드가 함께 사용)."""
+
+    def __init__(self, path: str = EMBEDDING_STORE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # timeout: Celery 분할 색인 시 여러 프로세스가 같은 파일에 쓴다 (WAL + 대기)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                hash   TEXT PRIMARY KEY,
+                vector BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id   TEXT PRIMARY KEY,
+                tbl      TEXT NOT NULL,
+                hash     TEXT NOT NULL,
+                seen_run TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS documents_tbl_seen ON documents (tbl, seen_run);
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id     TEXT PRIMARY KEY,
+                plan       TEXT NOT NULL,
+                status     TEXT NOT NULL,
+                created_at REAL,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                run_id     TEXT NOT NULL,
+                part       TEXT NOT NULL,
+                last_id    INTEGER,
+                done       INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL,
+                PRIMARY KEY (run_id, part)
+            );
+            """
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------- embeddings ----------
+    def get_vectors(self, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        hashes = list(set(hashes))
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for h, blob in self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE hash IN ({marks})", chunk
+                ):
+                    found[h] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_vectors(self, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        rows = [(h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)", rows)
+
+    # ---------- documents ----------
+    def indexed_hashes(self, doc_ids: Iterable[str]) -> Dict[str, str]:
+        doc_ids = list(doc_ids)
+        found: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(doc_ids), 500):
+                chunk = doc_ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for doc_id, h in self._conn.execute(
+                    f"SELECT doc_id, hash FROM documents WHERE doc_id IN ({marks})", chunk
+                ):
+                    found[doc_id] = h
+        return found
+
+    def mark_seen(self, doc_ids: Iterable[str], run_id: str) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE documents SET seen_run = ? WHERE doc_id = ?",
+                [(run_id, d) for d in doc_ids],
+            )
+
+    def mark_indexed(self, items: Iterable[Tuple[str, str, str]], run_id: str) -> None:
+        """items: (doc_id, tbl, hash)"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (doc_id, tbl, hash, seen_run, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(d, t, h, run_id, now) for d, t, h in items],
+            )
+
+    def stale_doc_ids(self, tbl: str, run_id: str) -> List[str]:
+        """이번 run 에서 보이지 않은 (= DB 에서 삭제된) 문서 id."""
+        with self._lock:
+            return [
+                r[0] for r in self._conn.execute(
+                    "SELECT doc_id FROM documents WHERE tbl = ? AND (seen_run IS NULL OR seen_run != ?)",
+                    (tbl, run_id),
+                )
+            ]
+
+    def forget(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM documents WHERE doc_id = ?", [(d,) for d in doc_ids])
+
+    def reset_documents(self, tbl: Optional[str] = None) -> None:
+        """색인 상태만 초기화 (임베딩은 유지) — 인덱스를 새로 만든 경우 사용."""
+        with self._lock:
+            if tbl:
+                self._conn.execute("DELETE FROM documents WHERE tbl = ?", (tbl,))
+            else:
+                self._conn.execute("DELETE FROM documents")
+
+    # ---------- runs / checkpoints ----------
+    def save_run(self, plan: dict, status: str = "running") -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, plan, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, COALESCE((SELECT created_at FROM runs WHERE run_id = ?), ?), ?)",
+                (plan["run_id"], json.dumps(plan), status, plan["run_id"], now, now),
+            )
+
+    def set_run_status(self, run_id: str, status: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?",
+                (status, time.time(), run_id),
+            )
+            if status == "done":
+                self._conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+
+    def latest_run(self, status: str = "running") -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT plan FROM runs WHERE status = ? ORDER BY created_at DESC LIMIT 1", (status,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def runs_with_status(self, status: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT plan FROM runs WHERE status = ?", (status,)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def get_checkpoint(self, run_id: str, part: str) -> Tuple[Optional[int], bool]:
+        """(마지막 커밋 PK, 완료 여부). 기록이 없으면 (None, False)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_id, done FROM checkpoints WHERE run_id = ? AND part = ?", (run_id, part)
+            ).fetchone()
+        return (row[0], bool(row[1])) if row else (None, False)
+
+    def save_checkpoint(self, run_id: str, part: str, last_id: Optional[int], done: bool = False) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, part, last_id, done, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, part, last_id, int(done), time.time()),
+            )
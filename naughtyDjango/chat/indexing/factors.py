@@ -0,0 +1,96 @@
+# chat/indexing/factors.py
+"""
+주식 팩터 정규화 (색인 시점 사전 계산).
+
+시장(테이블)별 분포를 기준으로 PER/PBR/EPS 를 0~1 백분위와 z-score 로 바꾸고
+가중치 프로필별 종합 점수(score_<profile>)를 문서 필드로 함께 저장한다.
+스크리너 종합 점수 모드는 이 필드 하나로 정렬하므로 쿼리 시점 스크립트 정렬이 필요 없다.
+
+- *_pct : 클수록 매력적 (PER/PBR 은 이익/자산 수익률 1/x 기준, 0 이하는 최하위)
+- *_z   : 원값의 시장 내 z-score (참고/디버깅용)
+- 값이 없는 팩터는 백분위 0 으로 보고 점수에 반영 (정보 없는 종목이 위로 오지 않도록)
+"""
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+# 테이블 → {팩터: 실제 컬럼}
+FACTOR_COLUMNS = {
+    "krx_stock_info": {"per": "per", "pbr": "pbr", "eps": "eps"},
+    "nasdaq_stock_info": {"per": "perx", "pbr": "pbrx", "eps": "epsx"},
+}
+
+# 종합 점수 가중치 프로필 (합 = 1)
+WEIGHT_PROFILES = {
+    "value": {"per": 0.35, "pbr": 0.5, "eps": 0.15},
+    "growth": {"per": 0.2, "pbr": 0.1, "eps": 0.7},
+    "stable": {"per": 0.4, "pbr": 0.3, "eps": 0.3},
+    "balanced": {"per": 1 / 3, "pbr": 1 / 3, "eps": 1 / 3},
+}
+
+_DIGITS = 4
+
+
+def score_field(profile: str) -> str:
+    return f"score_{profile}"
+
+
+def _as_float(values: Iterable) -> np.ndarray:
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _attractiveness(factor: str, raw: np.ndarray) -> np.ndarray:
+    """백분위 기준값: PER/PBR 은 1/x (0 이하 → -inf = 최하위), EPS 는 원값."""
+    if factor == "eps":
+        return raw
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(np.isnan(raw), np.nan, np.where(raw > 0, 1.0 / raw, -np.inf))
+
+
+class MarketFactors:
+    """한 시장의 팩터 분포. annotate/annotate_columns 로 문서/컬럼에 팩터 필드를 붙인다."""
+
+    def __init__(self, tbl: str, rows: List[dict]):
+        self.tbl = tbl
+        self.columns = FACTOR_COLUMNS[tbl]
+        self._sorted: Dict[str, np.ndarray] = {}
+        self._moments: Dict[str, tuple] = {}
+        for factor, col in self.columns.items():
+            raw = _as_float(r.get(col) for r in rows)
+            attr = _attractiveness(factor, raw)
+            self._sorted[factor] = np.sort(attr[~np.isnan(attr)])
+            valid = raw[~np.isnan(raw)]
+            self._moments[factor] = (float(valid.mean()), float(valid.std())) if len(valid) else (0.0, 0.0)
+
+    def _percentile(self, factor: str, attr: np.ndarray) -> np.ndarray:
+        """중간 순위 백분위 (동점은 같은 값), 결측은 0."""
+        ref = self._sorted[factor]
+        if not len(ref):
+            return np.zeros(len(attr))
+        lo = np.searchsorted(ref, attr, side="left")
+        hi = np.searchsorted(ref, attr, side="right")
+        pct = (lo + hi) / (2.0 * len(ref))
+        return np.where(np.isnan(attr), 0.0, pct)
+
+    def annotate_columns(self, values: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """{실제 컬럼: float 배열} → {팩터 필드: float 배열 (결측 NaN)}."""
+        out, pcts = {}, {}
+        for factor, col in self.columns.items():
+            raw = values[col]
+            pcts[factor] = self._percentile(factor, _attractiveness(factor, raw))
+            out[f"{factor}_pct"] = np.where(np.isnan(raw), np.nan, pcts[factor]).round(_DIGITS)
+            mean, std = self._moments[factor]
+            with np.errstate(invalid="ignore"):
+                out[f"{factor}_z"] = ((raw - mean) / std if std else raw * 0.0).round(_DIGITS)
+        for profile, weights in WEIGHT_PROFILES.items():
+            score = sum(w * pcts[f] for f, w in weights.items())
+            out[score_field(profile)] = np.round(score, _DIGITS)
+        return out
+
+    def annotate(self, row: dict) -> dict:
+        """coerce_numeric_fields 를 거친 행에 팩터 필드를 더한다 (결측은 필드 생략)."""
+        values = {col: _as_float([row.get(col)]) for col in self.columns.values()}
+        for field, arr in self.annotate_columns(values).items():
+            if not np.isnan(arr[0]):
+                row[field] = float(arr[0])
+        return row
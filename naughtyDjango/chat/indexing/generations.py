@@ -0,0 +1,162 @@
+# chat/indexing/generations.py
+"""
+블루/그린 재색인 도우미.
+
+1) financial-products-v<N> 새 인덱스를 만든다 (색인 중 refresh 비활성화)
+2) 색인 후 refresh 복원 → table 별 문서 수 검증
+3) alias(financial-products) 를 update_aliases 한 번으로 원자적으로 교체
+4) Redis 에 catalog generation 게시, 오래된 generation 정리
+
+검색 쪽은 alias 만 보므로 색인 도중에도 이전 generation 을 온전히 조회한다.
+"""
+import copy
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List
+
+from django.core.cache import cache
+from opensearchpy import exceptions as os_exceptions
+
+from chat.catalog import CATALOG_ALIAS, catalog_generation, parse_generation
+from chat.indexing.documents import INDEX_BODY, TABLES
+
+logger = logging.getLogger(__name__)
+
+REINDEX_LOCK_KEY = "catalog:reindex:lock"
+# 재색인 최대 소요 시간보다 넉넉하게 (프로세스가 죽어도 이 시간 후 자동 해제)
+REINDEX_LOCK_TTL = int(os.getenv("INDEX_LOCK_TTL", 2 * 3600))
+# alias 교체 후 롤백용으로 남겨둘 이전 generation 수
+KEEP_GENERATIONS = int(os.getenv("INDEX_KEEP_GENERATIONS", 1))
+
+
+class ReindexInProgress(Exception):
+    """다른 재색인 작업이 이미 락을 잡고 있음."""
+
+
+class ValidationFailed(Exception):
+    """새 인덱스의 문서 수가 원본 행 수와 다름 → alias 를 바꾸지 않는다."""
+
+
+def acquire_reindex_lock(ttl: int = REINDEX_LOCK_TTL) -> str:
+    """Redis SET NX 락을 잡고 토큰을 반환한다. 이미 잡혀 있으면 ReindexInProgress."""
+    token = uuid.uuid4().hex
+    if not cache.add(REINDEX_LOCK_KEY, token, ttl):
+        raise ReindexInProgress("another reindex is already running")
+    return token
+
+
+def release_reindex_lock(token: str) -> None:
+    try:
+        # 자기 토큰일 때만 해제 (TTL 만료 후 다른 작업이 잡은 락은 건드리지 않음)
+        if cache.get(REINDEX_LOCK_KEY) == token:
+            cache.delete(REINDEX_LOCK_KEY)
+    except Exception as e:
+        logger.warning(f"reindex lock release failed: {e}")
+
+
+@contextmanager
+def reindex_lock(ttl: int = REINDEX_LOCK_TTL):
+    """두 재색인 작업이 동시에 돌지 않도록 락을 잡는다 (관리 명령용)."""
+    token = acquire_reindex_lock(ttl)
+    try:
+        yield token
+    finally:
+        release_reindex_lock(token)
+
+
+def reindex_running() -> bool:
+    try:
+        return cache.get(REINDEX_LOCK_KEY) is not None
+    except Exception:
+        return False
+
+
+def alias_targets(client, alias: str = CATALOG_ALIAS) -> List[str]:
+    """alias 가 가리키는 인덱스 목록 (alias 가 없으면 빈 리스트)."""
+    try:
+        return sorted(client.indices.get_alias(name=alias).keys())
+    except os_exceptions.NotFoundError:
+        return []
+
+
+def generation_indices(client, alias: str = CATALOG_ALIAS) -> Dict[int, str]:
+    """{generation: 인덱스명} — financial-products-v* 인덱스 전체."""
+    try:
+        names = client.indices.get(index=f"{alias}-v*").keys()
+    except os_exceptions.NotFoundError:
+        return {}
+    found = {}
+    for name in names:
+        gen = parse_generation(name, alias)
+        if gen is not None:
+            found[gen] = name
+    return found
+
+
+def next_generation(client, alias: str = CATALOG_ALIAS) -> int:
+    """존재하는 인덱스와 Redis 게시값 중 큰 것 + 1 (둘 중 하나가 초기화돼도 단조 증가)."""
+    existing = generation_indices(client, alias)
+    return max([catalog_generation(), *existing.keys()], default=0) + 1
+
+
+def create_generation_index(client, index_name: str) -> None:
+    """색인용 새 인덱스 생성 — 처음부터 refresh 비활성화 상태로 만든다."""
+    body = copy.deepcopy(INDEX_BODY)
+    body["settings"]["index"]["refresh_interval"] = "-1"
+    client.indices.create(index=index_name, body=body)
+
+
+def finalize_index(client, index_name: str) -> None:
+    """색인이 끝난 인덱스의 refresh 를 복원하고 즉시 refresh 해 검증 가능하게 만든다."""
+    client.indices.put_settings(index=index_name, body={"index": {"refresh_interval": "1s"}})
+    client.indices.refresh(index=index_name)
+
+
+def table_counts(client, index_name: str) -> Dict[str, int]:
+    body = {
+        "size": 0,
+        "track_total_hits": True,
+        "aggs": {"tables": {"terms": {"field": "table", "size": len(TABLES) + 10}}},
+    }
+    resp = client.search(index=index_name, body=body)
+    return {b["key"]: b["doc_count"] for b in resp["aggregations"]["tables"]["buckets"]}
+
+
+def validate_counts(client, index_name: str, expected: Dict[str, int]) -> Dict[str, int]:
+    """table 별 문서 수가 원본 행 수와 정확히 같아야 통과. 실제 집계를 반환한다."""
+    actual = table_counts(client, index_name)
+    problems = [
+        f"{tbl}: expected {n}, got {actual.get(tbl, 0)}"
+        for tbl, n in expected.items()
+        if actual.get(tbl, 0) != n
+    ]
+    if problems:
+        raise ValidationFailed("; ".join(problems))
+    return actual
+
+
+def swap_alias(client, new_index: str, alias: str = CATALOG_ALIAS) -> List[str]:
+    """
+    alias 를 new_index 로 원자적으로 옮긴다. 이전 대상 인덱스 목록을 반환.
+    alias 와 같은 이름의 실제 인덱스가 있으면 (alias 도입 이전 구조) 같은 요청에서 삭제한다.
+    """
+    previous = alias_targets(client, alias)
+    actions = [{"remove": {"index": old, "alias": alias}} for old in previous if old != new_index]
+    if not previous and client.indices.exists(index=alias):
+        actions.append({"remove_index": {"index": alias}})
+        previous = [alias]
+    actions.append({"add": {"index": new_index, "alias": alias}})
+    client.indices.update_aliases(body={"actions": actions})
+    return previous
+
+
+def prune_generations(client, keep: int = KEEP_GENERATIONS, alias: str = CATALOG_ALIAS) -> List[str]:
+    """alias 가 가리키지 않는 generation 중 최신 keep 개를 남기고 삭제한다."""
+    live = set(alias_targets(client, alias))
+    stale = [name for _, name in sorted(generation_indices(client, alias).items()) if name not in live]
+    doomed = stale[:-keep] if keep > 0 else stale
+    for name in doomed:
+        client.indices.delete(index=name, ignore=[404])
+    return doomed
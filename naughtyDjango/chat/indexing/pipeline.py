@@ -0,0 +1,596 @@
+# chat/indexing/pipeline.py
+"""
+index_to_opensearch 스트리밍 파이프라인.
+
+SSCursor(서버 사이드 커서) → 텍스트 생성 → 배치 임베딩 → helpers.streaming_bulk
+
+- 각 단계는 백그라운드 스레드에서 돌고, 단계 사이는 크기 제한 Queue 로 연결한다.
+  (메모리 사용량 ≈ 큐 크기 × 배치 크기 로 고정 — 카탈로그 행 수와 무관)
+- fetchall()/전체 actions 리스트를 만들지 않으므로 첫 배치가 임베딩되는 즉시 색인이 시작된다.
+- 임베딩은 큐 안에서 float32 ndarray 로 들고 있다가 bulk 직전에만 리스트로 바꾼다.
+- EmbeddingStore 를 넘기면 증분 모드: 텍스트 해시가 같은 행은 임베딩/bulk 를 건너뛰고
+  DB 에서 사라진 행은 인덱스에서 삭제한다.
+- embed_workers > 1 이면 임베딩 요청을 스레드 풀로 동시에 보내고(TPM 한도 준수),
+  bulk_workers > 1 이면 helpers.parallel_bulk + 적응형 청크 크기로 쓴다.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pymysql
+from opensearchpy import helpers
+
+from chat.gpt.openai_client import get_openai_client
+from chat.indexing.documents import readable_text, coerce_numeric_fields, build_action, doc_id
+from chat.indexing.embedding_store import content_hash
+from chat.indexing.factors import FACTOR_COLUMNS, MarketFactors
+from chat.indexing.throttle import AdaptiveChunk, TokenBudget, count_tokens
+
+EMBED_MODEL = "text-embedding-3-small"
+FETCH_SIZE = int(os.getenv("INDEX_FETCH_SIZE", 1000))
+EMBED_BATCH_SIZE = int(os.getenv("INDEX_EMBED_BATCH_SIZE", 500))
+BULK_CHUNK_SIZE = int(os.getenv("INDEX_BULK_CHUNK_SIZE", 100))
+QUEUE_MAXSIZE = int(os.getenv("INDEX_QUEUE_MAXSIZE", 2))
+# Celery 분할 색인 시 하위 작업 하나가 맡는 PK 구간 크기
+RANGE_SIZE = int(os.getenv("INDEX_RANGE_SIZE", 5000))
+EMBED_WORKERS = int(os.getenv("INDEX_EMBED_WORKERS", 1))
+BULK_WORKERS = int(os.getenv("INDEX_BULK_WORKERS", 1))
+# text-embedding-3-small 기본 tier 한도. 0 이면 제한 없음
+EMBED_TOKENS_PER_MINUTE = int(os.getenv("INDEX_EMBED_TPM", 1_000_000))
+BULK_MAX_RETRIES = 5
+
+
+def db_config(streaming: bool = True) -> dict:
+    """RDS 접속 정보. streaming=True 면 서버 사이드 커서(SSDictCursor)를 사용."""
+    return {
+        "host": os.getenv("DB_HOST"),
+        "port": int(os.getenv("DB_PORT", 3306)),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "database": os.getenv("DB_NAME"),
+        "cursorclass": pymysql.cursors.SSDictCursor if streaming else pymysql.cursors.DictCursor,
+    }
+
+
+# --------------------------------------------------------------------
+# 단계 연결: 백그라운드 스레드 + bounded queue
+# --------------------------------------------------------------------
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def staged(iterable: Iterable, maxsize: int = QUEUE_MAXSIZE, name: str = "stage") -> Iterator:
+    """
+    iterable 을 별도 스레드에서 소비해 크기 제한 큐로 넘겨준다.
+    - 소비자가 느리면 생산자는 큐가 빌 때까지 대기 (backpressure)
+    - 생산자 예외는 소비자 쪽에서 다시 발생
+    - 소비자가 중간에 멈추면(close/예외) 생산자도 정리된다
+    """
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _worker():
+        try:
+            for item in iterable:
+                if not _put(item):
+                    return
+        except BaseException as e:
+            _put(_StageError(e))
+            return
+        _put(_DONE)
+
+    thread = threading.Thread(target=_worker, name=f"index-{name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+
+
+# --------------------------------------------------------------------
+# 진행 통계
+# --------------------------------------------------------------------
+class PipelineStats:
+    """단계별 처리 건수와 소요 시간."""
+
+    # 단계 → 처리량 계산에 쓰는 건수 키
+    STAGE_COUNTS = {"read": "read", "embed": "embedded", "bulk": "indexed"}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.counts = {"read": 0, "embedded": 0, "reused": 0, "indexed": 0, "skipped": 0, "deleted": 0, "failed": 0}
+        self.seconds = {"read": 0.0, "embed": 0.0, "bulk": 0.0}
+        # 단계별 첫 시작 ~ 마지막 종료 (동시 실행 시 seconds 합은 벽시계 시간보다 크다)
+        self.spans = {}
+
+    def add(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def timed(self, name: str, seconds: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            start, end = self.spans.get(name, (now - seconds, now))
+            self.spans[name] = (min(start, now - seconds), max(end, now))
+
+    def throughput(self) -> dict:
+        """단계별 초당 처리 건수 (단계가 실제로 돌았던 구간 기준)."""
+        with self._lock:
+            rates = {}
+            for stage, key in self.STAGE_COUNTS.items():
+                start, end = self.spans.get(stage, (0.0, 0.0))
+                span = end - start
+                rates[stage] = round(self.counts.get(key, 0) / span, 1) if span > 0 else 0.0
+            return rates
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = time.monotonic() - self.started_at
+            data = dict(self.counts)
+            data["elapsed"] = round(elapsed, 2)
+            data["rows_per_sec"] = round(self.counts["indexed"] / elapsed, 1) if elapsed else 0.0
+            return data
+
+
+class Watermark:
+    """
+    PK 순서로 내보낸 문서 중 앞에서부터 연속으로 처리(bulk 응답)된 마지막 PK.
+    parallel_bulk 는 응답 순서가 섞이므로 체크포인트는 이 값까지만 전진시킨다.
+    """
+
+    def __init__(self, start: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._order = deque()
+        self._acked = set()
+        self.value = start
+
+    def issue(self, key: str, pk) -> None:
+        with self._lock:
+            self._order.append((key, pk))
+
+    def ack(self, key: str) -> None:
+        with self._lock:
+            self._acked.add(key)
+
+    def advance(self):
+        with self._lock:
+            while self._order and self._order[0][0] in self._acked:
+                key, pk = self._order.popleft()
+                self._acked.discard(key)
+                self.value = pk
+            return self.value
+
+
+# --------------------------------------------------------------------
+# 단계 구현
+# --------------------------------------------------------------------
+def table_id_ranges(tbl: str, range_size: int = RANGE_SIZE) -> List[Tuple[int, int]]:
+    """PK(id) 값 구간 [lo, hi) 목록. 테이블이 비어 있으면 빈 리스트."""
+    with pymysql.connect(**db_config(streaming=False)) as conn, conn.cursor() as cur:
+        cur.execute(f"SELECT MIN(id) AS lo, MAX(id) AS hi FROM {tbl};")
+        row = cur.fetchone() or {}
+    lo, hi = row.get("lo"), row.get("hi")
+    if lo is None:
+        return []
+    return [(start, min(start + range_size, hi + 1)) for start in range(int(lo), int(hi) + 1, range_size)]
+
+
+def mysql_row_counts(tables: Iterable[str]) -> Dict[str, int]:
+    """재색인 마지막 대조(reconciliation)용 테이블별 행 수."""
+    counts = {}
+    with pymysql.connect(**db_config(streaming=False)) as conn, conn.cursor() as cur:
+        for tbl in tables:
+            cur.execute(f"SELECT COUNT(*) AS n FROM {tbl};")
+            counts[tbl] = int(cur.fetchone()["n"])
+    return counts
+
+
+def load_market_factors(tbl: str) -> Optional[MarketFactors]:
+    """주식 테이블 전체의 PER/PBR/EPS 분포 (Celery 구간 색인도 같은 분포를 쓰도록 항상 전체 테이블)."""
+    columns = FACTOR_COLUMNS.get(tbl)
+    if columns is None:
+        return None
+    cols = ", ".join(f"`{c}`" for c in columns.values())
+    with pymysql.connect(**db_config(streaming=False)) as conn, conn.cursor() as cur:
+        cur.execute(f"SELECT {cols} FROM {tbl};")
+        rows = [coerce_numeric_fields(r) for r in cur.fetchall()]
+    return MarketFactors(tbl, rows)
+
+
+def read_row_batches(tbl: str, fetch_size: int = FETCH_SIZE, stats: Optional[PipelineStats] = None,
+                     id_range: Optional[Tuple[int, int]] = None,
+                     after_id: Optional[int] = None,
+                     upto_id: Optional[int] = None) -> Iterator[List[dict]]:
+    """
+    서버 사이드 커서로 PK 순서대로 행을 fetch_size 단위로 읽는다.
+    - id_range=(lo, hi): lo <= id < hi
+    - after_id: 체크포인트 이후(id > after_id)부터 재개
+    - upto_id : id <= upto_id 까지만 (체크포인트 이전 구간 재생용)
+    """
+    where, params = [], []
+    if id_range:
+        where.append("id >= %s AND id < %s")
+        params.extend(id_range)
+    if after_id is not None:
+        where.append("id > %s")
+        params.append(after_id)
+    if upto_id is not None:
+        where.append("id <= %s")
+        params.append(upto_id)
+    sql = f"SELECT * FROM {tbl}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    with pymysql.connect(**db_config(streaming=True)) as conn, conn.cursor() as cur:
+        cur.execute(sql + " ORDER BY id;", params)
+        while True:
+            t0 = time.monotonic()
+            rows = cur.fetchmany(fetch_size)
+            if stats:
+                stats.timed("read", time.monotonic() - t0)
+            if not rows:
+                return
+            if stats:
+                stats.add("read", len(rows))
+            yield rows
+
+
+def build_documents(row_batches: Iterable[List[dict]], tbl: str, korean: str,
+                    batch_size: int = EMBED_BATCH_SIZE,
+                    model: str = EMBED_MODEL,
+                    factors: Optional[MarketFactors] = None) -> Iterator[List[Tuple[dict, str, str]]]:
+    """
+    행 → (row, 텍스트, content hash) 로 바꾸고 임베딩 배치 크기로 다시 묶는다.
+    factors 가 있으면 팩터 필드(백분위/z-score/종합 점수)를 행에 더한다 (텍스트·해시에는 영향 없음).
+    """
+    pending: List[Tuple[dict, str, str]] = []
+    for rows in row_batches:
+        for row in rows:
+            text = readable_text(row, tbl, korean)
+            row = coerce_numeric_fields(row)
+            if factors is not None:
+                factors.annotate(row)
+            pending.append((row, text, content_hash(text, model)))
+            if len(pending) >= batch_size:
+                yield pending
+                pending = []
+    if pending:
+        yield pending
+
+
+def embed_texts(texts: List[str], model: str = EMBED_MODEL) -> np.ndarray:
+    resp = get_openai_client().embeddings.create(model=model, input=texts)
+    return np.asarray([e.embedding for e in resp.data], dtype=np.float32)
+
+
+def _embed_batch(docs: List[Tuple[dict, str, str]],
+                 embed_fn: Callable[[List[str]], np.ndarray],
+                 stats: Optional[PipelineStats],
+                 log: Optional[Callable[[str], None]],
+                 store,
+                 budget: Optional[TokenBudget]) -> Tuple[List[Tuple[dict, str, str]], np.ndarray]:
+    known = store.get_vectors(h for _, _, h in docs) if store is not None else {}
+    # 배치 안의 중복 텍스트는 한 번만 요청
+    missing = list(dict.fromkeys(h for _, _, h in docs if h not in known))
+    if missing:
+        texts = {h: text for _, text, h in docs}
+        inputs = [texts[h] for h in missing]
+        if budget is not None:
+            tokens = count_tokens(inputs)
+            budget.acquire(tokens)
+            if stats:
+                stats.add("embed_tokens", tokens)
+        if log:
+            log(f" ▶️ Embedding batch of {len(missing)} (reused {len(docs) - len(missing)}) …")
+        t0 = time.monotonic()
+        fresh = embed_fn(inputs)
+        if stats:
+            stats.timed("embed", time.monotonic() - t0)
+            stats.add("embedded", len(missing))
+        fetched = dict(zip(missing, fresh))
+        if store is not None:
+            store.put_vectors(fetched.items())
+        known.update(fetched)
+    if stats and len(docs) > len(missing):
+        stats.add("reused", len(docs) - len(missing))
+    return docs, np.stack([known[h] for _, _, h in docs]).astype(np.float32, copy=False)
+
+
+def embed_documents(doc_batches: Iterable[List[Tuple[dict, str, str]]],
+                    embed_fn: Callable[[List[str]], np.ndarray] = embed_texts,
+                    stats: Optional[PipelineStats] = None,
+                    log: Callable[[str], None] = None,
+                    store=None,
+                    workers: int = EMBED_WORKERS,
+                    budget: Optional[TokenBudget] = None) -> Iterator[Tuple[List[Tuple[dict, str, str]], np.ndarray]]:
+    """
+    문서 배치를 임베딩해 (문서들, float32 행렬) 로 넘긴다.
+    store 가 있으면 같은 해시의 임베딩을 재사용하고, 없는 것만 API 로 요청한다.
+    workers > 1 이면 최대 workers 개의 요청을 동시에 보내되 결과는 입력 순서대로 넘긴다.
+    """
+    if workers <= 1:
+        for docs in doc_batches:
+            yield _embed_batch(docs, embed_fn, stats, log, store, budget)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="index-embed-worker")
+    pending = deque()
+    try:
+        for docs in doc_batches:
+            pending.append(pool.submit(_embed_batch, docs, embed_fn, stats, log, store, budget))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def to_actions(embedded: Iterable[Tuple[List[Tuple[dict, str, str]], np.ndarray]], tbl: str, korean: str,
+               index_name: str, local_writer=None,
+               store=None, run_id: str = None, full: bool = True,
+               inflight: Optional[dict] = None,
+               stats: Optional[PipelineStats] = None,
+               watermark: Optional[Watermark] = None) -> Iterator[dict]:
+    """
+    임베딩 배치 → bulk 액션 (필요 시 로컬 벡터 인덱스에도 함께 기록).
+    증분 모드(store, full=False)에서는 마지막 색인 해시와 같은 문서를 건너뛴다.
+    로컬 인덱스는 매번 전체를 새로 쓰므로 건너뛴 문서도 기록한다.
+    """
+    for docs, vectors in embedded:
+        if local_writer is not None:
+            local_writer.add(vectors, [
+                {"id": doc_id(tbl, row), "text": text, "product_type": korean, "table": tbl}
+                for row, text, _ in docs
+            ])
+
+        ids = [doc_id(tbl, row) for row, _, _ in docs]
+        indexed = {}
+        if store is not None:
+            indexed = store.indexed_hashes(ids)
+            # DB 에 아직 있는 문서 표시 (bulk 가 실패해도 삭제 대상으로 오인하지 않도록)
+            store.mark_seen(indexed.keys(), run_id)
+
+        for _id, (row, text, h), vec in zip(ids, docs, vectors):
+            if watermark is not None:
+                watermark.issue(_id, row["id"])
+            if not full and indexed.get(_id) == h:
+                if stats:
+                    stats.add("skipped")
+                if watermark is not None:
+                    watermark.ack(_id)
+                continue
+            if inflight is not None:
+                inflight[_id] = h
+            yield build_action(row, tbl, korean, text, vec.tolist(), index_name)
+
+
+def _bulk(client, actions: Iterable[dict], chunk_size: int):
+    # streaming_bulk: 청크 단위로 전송, 429 는 지수 백오프로 재시도
+    return helpers.streaming_bulk(
+        client,
+        actions,
+        chunk_size=chunk_size,
+        max_retries=BULK_MAX_RETRIES,
+        initial_backoff=1,
+        max_backoff=30,
+        raise_on_error=False,
+        request_timeout=60,
+    )
+
+
+def _parallel_bulk(client, actions: Iterable[dict], workers: int, chunk: AdaptiveChunk,
+                   log: Callable[[str], None] = None,
+                   initial_backoff: float = 1, max_backoff: float = 30):
+    """
+    helpers.parallel_bulk 를 (청크 크기 × workers) 단위 윈도로 나눠 호출한다.
+    - 윈도 안에서 429 를 받은 문서만 모아 지수 백오프 후 재전송하고 청크 크기를 절반으로
+    - 429 없이 끝난 윈도 뒤에는 청크 크기를 조금씩 키운다
+    streaming_bulk 와 같은 (ok, item) 을 내보낸다.
+    """
+    it = iter(actions)
+    while True:
+        window = list(islice(it, chunk.size * workers))
+        if not window:
+            return
+        attempt = 0
+        while window:
+            by_id = {a["_id"]: a for a in window}
+            throttled = []
+            for ok, item in helpers.parallel_bulk(
+                client,
+                window,
+                thread_count=workers,
+                chunk_size=chunk.size,
+                raise_on_error=False,
+                raise_on_exception=False,
+                request_timeout=60,
+            ):
+                result = next(iter(item.values()), {})
+                if not ok and result.get("status") == 429 and attempt < BULK_MAX_RETRIES:
+                    throttled.append(by_id[result["_id"]])
+                else:
+                    yield ok, item
+            if not throttled:
+                chunk.grow()
+                break
+            attempt += 1
+            chunk.backoff()
+            delay = min(max_backoff, initial_backoff * 2 ** (attempt - 1))
+            if log:
+                log(f" ⏳ {len(throttled)} docs throttled (429), retry in {delay}s with chunk={chunk.size}")
+            time.sleep(delay)
+            window = throttled
+
+
+def delete_stale_documents(client, tbl: str, index_name: str, store, run_id: str,
+                           stats: Optional[PipelineStats] = None,
+                           log: Callable[[str], None] = None,
+                           chunk_size: int = BULK_CHUNK_SIZE) -> int:
+    """이번 run 에서 보이지 않은 (DB 에서 삭제된) 문서를 인덱스와 저장소에서 지운다. 삭제 수 반환."""
+    stats = stats or PipelineStats()
+    stale = store.stale_doc_ids(tbl, run_id)
+    if not stale:
+        return 0
+    if log:
+        log(f" 🗑️ Removing {len(stale)} deleted rows from {tbl}")
+    actions = ({"_op_type": "delete", "_index": index_name, "_id": _id} for _id in stale)
+    removed = []
+    for ok, item in _bulk(client, actions, chunk_size):
+        result = item.get("delete", {})
+        # 이미 없는 문서(404)도 삭제된 것으로 본다
+        if ok or result.get("status") == 404:
+            removed.append(result.get("_id"))
+        else:
+            stats.add("failed")
+            if log:
+                log(f"⚠️ bulk delete failed: {item}")
+    store.forget(removed)
+    stats.add("deleted", len(removed))
+    return len(removed)
+
+
+def index_table(client, tbl: str, korean: str, index_name: str,
+                stats: Optional[PipelineStats] = None,
+                local_writer=None,
+                log: Callable[[str], None] = None,
+                chunk_size: int = BULK_CHUNK_SIZE,
+                store=None,
+                run_id: str = None,
+                full: bool = True,
+                embed_workers: int = EMBED_WORKERS,
+                bulk_workers: int = BULK_WORKERS,
+                budget: Optional[TokenBudget] = None,
+                chunk: Optional[AdaptiveChunk] = None,
+                id_range: Optional[Tuple[int, int]] = None,
+                delete_stale: bool = True,
+                progress: Optional[Callable[[dict], None]] = None,
+                after_id: Optional[int] = None,
+                checkpoint: Optional[Callable[[int], None]] = None) -> int:
+    """
+    테이블 하나를 스트리밍으로 색인한다. 반환값은 성공 문서 수.
+    읽기/임베딩은 백그라운드 스레드, bulk 는 호출 스레드에서 진행.
+
+    store/run_id 를 넘기면 임베딩을 재사용하고 색인 해시를 기록한다.
+    full=False 이면 변경된 행만 쓴다. 삭제된 행은 두 경우 모두 인덱스에서 지운다.
+    budget(TPM 한도)/chunk(적응형 청크 크기) 는 테이블 간에 공유하도록 호출 측에서 넘긴다.
+    id_range 로 PK 구간만 색인할 때는 delete_stale=False (다른 구간의 문서를 삭제 대상으로 오인).
+    progress 는 bulk 청크마다 stats.snapshot() 으로 호출된다.
+    after_id 를 주면 그 PK 다음부터 읽고, checkpoint(pk) 는 bulk 응답까지 끝난 연속 구간의
+    마지막 PK 가 전진할 때마다 (색인 해시 기록 이후) 호출된다.
+    주식 테이블은 팩터 필드를 붙이며, 백분위는 다른 행이 바뀌어도 달라지므로 항상 전체를 다시 쓴다
+    (임베딩은 저장소에서 재사용).
+    """
+    stats = stats or PipelineStats()
+    factors = load_market_factors(tbl)
+    if factors is not None:
+        full = True
+    inflight = {} if store is not None else None
+    watermark = Watermark(after_id) if checkpoint else None
+    rows = staged(read_row_batches(tbl, stats=stats, id_range=id_range, after_id=after_id), name=f"{tbl}-read")
+    docs = build_documents(rows, tbl, korean, factors=factors)
+    embedded = staged(
+        embed_documents(docs, stats=stats, log=log, store=store, workers=embed_workers, budget=budget),
+        # 동시 요청 수만큼은 결과를 쌓아둘 수 있어야 풀이 쉬지 않는다
+        maxsize=max(QUEUE_MAXSIZE, embed_workers),
+        name=f"{tbl}-embed",
+    )
+    actions = to_actions(embedded, tbl, korean, index_name, local_writer=local_writer,
+                         store=store, run_id=run_id, full=full, inflight=inflight, stats=stats,
+                         watermark=watermark)
+
+    if bulk_workers > 1:
+        chunk = chunk or AdaptiveChunk(chunk_size)
+        results = _parallel_bulk(client, actions, bulk_workers, chunk, log=log)
+    else:
+        results = _bulk(client, actions, chunk_size)
+
+    success = 0
+    done = []
+    committed = after_id
+
+    def _flush():
+        nonlocal done, committed
+        if done:
+            store.mark_indexed(done, run_id)
+            done = []
+        # 색인 해시가 저장된 뒤에만 체크포인트를 전진 (실패 문서는 건너뛰고 failed 로 집계)
+        if watermark is not None:
+            pk = watermark.advance()
+            if pk is not None and pk != committed:
+                checkpoint(pk)
+                committed = pk
+
+    t0 = time.monotonic()
+    for n, (ok, item) in enumerate(results, 1):
+        result = next(iter(item.values()), {})
+        _id = result.get("_id")
+        _hash = inflight.pop(_id, None) if inflight is not None else None
+        if ok:
+            success += 1
+            stats.add("indexed")
+            if _hash:
+                done.append((_id, tbl, _hash))
+        else:
+            stats.add("failed")
+            if log:
+                log(f"⚠️ bulk item failed: {item}")
+        if watermark is not None:
+            watermark.ack(_id)
+        if n % chunk_size == 0:
+            _flush()
+            if progress:
+                progress(stats.snapshot())
+    _flush()
+
+    if store is not None and delete_stale:
+        delete_stale_documents(client, tbl, index_name, store, run_id, stats, log, chunk_size)
+    stats.timed("bulk", time.monotonic() - t0)
+    if progress:
+        progress(stats.snapshot())
+    return success
+
+
+def replay_local_index(tbl: str, korean: str, local_writer, store,
+                       id_range: Optional[Tuple[int, int]] = None,
+                       upto_id: Optional[int] = None,
+                       stats: Optional[PipelineStats] = None) -> int:
+    """
+    체크포인트 이전에 이미 색인된 구간을 로컬 벡터 인덱스에만 다시 기록한다.
+    임베딩은 저장소에서 꺼내므로 API 호출 없이 끝난다 (저장소에 없을 때만 새로 요청).
+    """
+    rows = read_row_batches(tbl, id_range=id_range, upto_id=upto_id)
+    written = 0
+    for docs, vectors in embed_documents(build_documents(rows, tbl, korean), store=store, stats=stats, workers=1):
+        local_writer.add(vectors, [
+            {"id": doc_id(tbl, row), "text": text, "product_type": korean, "table": tbl}
+            for row, text, _ in docs
+        ])
+        written += len(docs)
+    return written
@@ -0,0 +1,69 @@
+# chat/indexing/progress.py
+"""
+Celery chord 재색인의 진행 상황 집계.
+
+index_financial_products 는 하위 작업 id 목록(parts)과 마무리 작업 id(finalize_id)를
+결과로 남기고 바로 끝난다. 조회 시 각 하위 작업의 PROGRESS meta / 결과를 모아 합산한다.
+"""
+import time
+from typing import Dict
+
+from celery.result import AsyncResult
+
+COUNT_KEYS = ("read", "embedded", "reused", "indexed", "failed")
+
+
+def _part_info(task_id: str):
+    r = AsyncResult(task_id)
+    info = r.info if r.state in ("PROGRESS", "SUCCESS") and isinstance(r.info, dict) else {}
+    return r.state, info
+
+
+def reindex_progress(run: dict) -> dict:
+    """run: index_financial_products 의 반환값 → 구조화된 진행 상황."""
+    totals: Dict[str, int] = {k: 0 for k in COUNT_KEYS}
+    tables: Dict[str, dict] = {}
+    states: Dict[str, int] = {}
+
+    for part in run.get("parts", []):
+        state, info = _part_info(part["id"])
+        states[state] = states.get(state, 0) + 1
+        table = tables.setdefault(part["table"], {k: 0 for k in COUNT_KEYS} | {"parts": 0, "done": 0})
+        table["parts"] += 1
+        table["done"] += state == "SUCCESS"
+        for k in COUNT_KEYS:
+            n = int(info.get(k, 0) or 0)
+            totals[k] += n
+            table[k] += n
+
+    final_state, final_info = "PENDING", None
+    if run.get("finalize_id"):
+        r = AsyncResult(run["finalize_id"])
+        final_state = r.state
+        if r.successful():
+            final_info = r.result
+        elif r.failed():
+            final_info = {"error": str(r.result)}
+
+    if final_state == "SUCCESS":
+        status = "succeeded"
+    elif final_state == "FAILURE" or states.get("FAILURE"):
+        status = "failed"
+    elif run.get("parts") and states.get("SUCCESS", 0) == len(run["parts"]):
+        status = "finalizing"
+    else:
+        status = "running"
+
+    elapsed = max(time.time() - run.get("started_at", time.time()), 0.0)
+    return {
+        "status": status,
+        "generation": run.get("generation"),
+        "index": run.get("index"),
+        "in_place": run.get("in_place"),
+        "parts": {"total": len(run.get("parts", [])), "states": states},
+        "totals": totals,
+        "tables": tables,
+        "elapsed": round(elapsed, 1),
+        "rows_per_sec": round(totals["indexed"] / elapsed, 1) if elapsed else 0.0,
+        "result": final_info,
+    }
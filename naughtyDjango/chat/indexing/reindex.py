@@ -0,0 +1,148 @@
+# chat/indexing/reindex.py
+"""
+재색인 실행 단계 (관리 명령과 Celery chord 가 공유).
+
+begin_generation → (테이블/구간별 index_table) → complete_generation
+                                               ↘ 실패 시 discard_generation
+
+plan 은 Celery 인자로 넘길 수 있도록 JSON 직렬화 가능한 dict 로 유지한다.
+저장소(EmbeddingStore)가 있으면 plan 을 runs 테이블에 기록해 중단된 run 을 resume_generation 으로 이어받는다.
+"""
+import logging
+import os
+import uuid
+from typing import Callable, Dict, Optional
+
+from opensearchpy import OpenSearch
+
+from chat.catalog import CATALOG_ALIAS, versioned_index_name, publish_generation
+from chat.indexing.generations import (
+    ValidationFailed, alias_targets, next_generation, create_generation_index, finalize_index,
+    validate_counts, swap_alias, prune_generations,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_index_client():
+    """ENVIRONMENT=local 이면 SSH 터널, 그 외에는 IAM 서명 싱글턴 클라이언트."""
+    if os.getenv("ENVIRONMENT", "production") == "local":
+        return OpenSearch(
+            hosts=[{"host": "localhost", "port": 9200}],
+            http_auth=(os.getenv("OPENSEARCH_USER"), os.getenv("OPENSEARCH_PASS")),
+            use_ssl=True,
+            verify_certs=False,
+            ssl_assert_hostname=False,
+            timeout=60
+        )
+    from chat.opensearch_client import OPENSEARCH_CLIENT
+    return OPENSEARCH_CLIENT
+
+
+def begin_generation(client, store=None, in_place: bool = False, full: bool = False,
+                     log: Callable[[str], None] = None) -> dict:
+    """
+    색인 대상 인덱스를 정한다.
+    - 기본: 새 generation 인덱스 생성 (항상 전체 색인)
+    - in_place: 현재 alias 대상에 변경분만 (alias 가 아직 없으면 새 generation 으로 대체)
+    """
+    alias = CATALOG_ALIAS
+    if store is not None:
+        abandon_runs(client, store)
+    if in_place and not client.indices.exists(index=alias):
+        if log:
+            log(f"'{alias}' does not exist yet — building a new generation instead.")
+        in_place = False
+
+    generation = next_generation(client, alias)
+    if in_place:
+        # 색인 중에도 검색 중인 인덱스이므로 refresh 는 끄지 않는다
+        index_name = alias
+        full = bool(full) or store is None
+    else:
+        index_name = versioned_index_name(generation, alias)
+        if log:
+            log(f"Creating k-NN index '{index_name}' …")
+        create_generation_index(client, index_name)
+        # 새 인덱스는 비어 있으므로 이전 색인 기록은 무효 (임베딩은 그대로 재사용)
+        if store is not None:
+            store.reset_documents()
+        full = True
+
+    plan = {
+        "alias": alias,
+        "generation": generation,
+        "index": index_name,
+        "in_place": in_place,
+        "full": full,
+        "run_id": uuid.uuid4().hex,
+    }
+    if store is not None:
+        store.save_run(plan)
+    return plan
+
+
+def resume_generation(client, store) -> Optional[dict]:
+    """중단된 마지막 run 의 plan (대상 인덱스가 사라졌으면 None)."""
+    plan = store.latest_run("running")
+    if plan is None:
+        return None
+    if not plan["in_place"] and not client.indices.exists(index=plan["index"]):
+        store.set_run_status(plan["run_id"], "abandoned")
+        return None
+    return plan
+
+
+def abandon_runs(client, store) -> None:
+    """새 run 을 시작하면 이어받지 않은 이전 run 의 generation 은 버린다."""
+    for plan in store.runs_with_status("running"):
+        discard_generation(client, plan, store=store)
+        store.set_run_status(plan["run_id"], "abandoned")
+
+
+def complete_generation(client, plan: dict, expected: Dict[str, int],
+                        log: Callable[[str], None] = None, store=None) -> dict:
+    """
+    expected 는 MySQL 테이블별 행 수 (reconciliation 기준).
+    블루/그린: refresh 복원 → 문서 수 검증 → alias 교체 → 이전 generation 정리.
+    in-place : 문서 수 대조 결과만 기록 (live 인덱스라 되돌릴 대상이 없음).
+    어느 모드든 마지막에 generation 을 게시해 다운스트림 캐시를 무효화한다.
+    """
+    summary = {"generation": plan["generation"], "index": plan["index"]}
+    if plan["in_place"]:
+        client.indices.refresh(index=plan["index"])
+        try:
+            summary["counts"] = validate_counts(client, plan["index"], expected)
+        except ValidationFailed as e:
+            summary["reconcile_error"] = str(e)
+            logger.warning(f"in-place reindex count mismatch: {e}")
+            if log:
+                log(f"⚠️ Reconciliation mismatch: {e}")
+    else:
+        finalize_index(client, plan["index"])
+        summary["counts"] = validate_counts(client, plan["index"], expected)
+        if log:
+            log(f"▶️ Validated document counts: {summary['counts']}")
+        summary["previous"] = swap_alias(client, plan["index"], plan["alias"])
+        if log:
+            log(f"✅ Alias '{plan['alias']}' → '{plan['index']}' (was {summary['previous'] or 'none'})")
+        summary["pruned"] = prune_generations(client, alias=plan["alias"])
+        if log:
+            for name in summary["pruned"]:
+                log(f"🗑️ Deleted old generation '{name}'")
+    publish_generation(plan["generation"])
+    if store is not None:
+        store.set_run_status(plan["run_id"], "done")
+    return summary
+
+
+def discard_generation(client, plan: dict, store=None) -> None:
+    """검증 실패/중단된 generation 은 버리고 live alias 는 그대로 둔다."""
+    if store is not None:
+        store.set_run_status(plan["run_id"], "discarded")
+    # 이미 alias 가 옮겨진 generation 은 live 이므로 절대 지우지 않는다
+    if plan["in_place"] or plan["index"] in alias_targets(client, plan["alias"]):
+        return
+    client.indices.delete(index=plan["index"], ignore=[404])
+    if store is not None:
+        store.reset_documents()
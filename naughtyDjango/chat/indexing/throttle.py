@@ -0,0 +1,163 @@
+# chat/indexing/throttle.py
+"""
+색인 파이프라인 동시성 제어.
+
+- TokenBudget      : 임베딩 API 분당 토큰(TPM) 한도를 넘지 않도록 요청 전에 대기 (프로세스 안)
+- RedisTokenBudget : 같은 한도를 Redis 로 모든 워커가 나눠 쓴다 (Celery 분할 색인)
+- AdaptiveChunk : bulk 청크 크기 AIMD 조절 (429 → 절반, 성공 → 조금씩 증가)
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import List
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - requirements.txt 에 포함
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    # text-embedding-3-* 는 cl100k_base 토크나이저 사용
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception:
+                    _encoding = False  # 인코딩 파일을 받을 수 없으면 추정치 사용
+    return _encoding or None
+
+
+def count_tokens(texts: List[str]) -> int:
+    """임베딩 입력의 토큰 수. tiktoken 을 못 쓰면 UTF-8 바이트 기준으로 넉넉히 추정."""
+    enc = _get_encoding()
+    if enc is not None:
+        return sum(len(ids) for ids in enc.encode_batch(texts, disallowed_special=()))
+    return sum(len(t.encode("utf-8")) // 2 + 1 for t in texts)
+
+
+class TokenBudget:
+    """
+    최근 60초 동안 사용한 토큰 합이 tokens_per_minute 를 넘지 않도록 acquire() 에서 대기한다.
+    여러 임베딩 스레드가 같은 인스턴스를 공유한다.
+    """
+
+    WINDOW = 60.0
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self._events = deque()  # (timestamp, tokens)
+        self._used = 0
+        self._cond = threading.Condition()
+        self.waited = 0.0
+
+    def _expire(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= self.WINDOW:
+            _, n = self._events.popleft()
+            self._used -= n
+
+    def acquire(self, tokens: int) -> None:
+        if self.tokens_per_minute <= 0:
+            return
+        with self._cond:
+            started = time.monotonic()
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                # 한도보다 큰 단일 요청은 창이 비었을 때 단독으로 허용
+                if self._used + tokens <= self.tokens_per_minute or not self._events:
+                    self._events.append((now, tokens))
+                    self._used += tokens
+                    self.waited += now - started
+                    return
+                wait = self.WINDOW - (now - self._events[0][0])
+                self._cond.wait(timeout=max(wait, 0.05))
+
+
+# 최근 window 초 사용량(멤버 "<tokens>:<uuid>", score=Redis 시각) 합이 한도 안이면 기록하고 0,
+# 아니면 가장 오래된 기록이 창에서 빠질 때까지 남은 초를 돌려준다
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local window, limit, tokens = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local entries = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+local used = 0
+for i = 1, #entries, 2 do
+  used = used + tonumber(string.match(entries[i], '^(%d+):'))
+end
+if used + tokens <= limit or #entries == 0 then
+  redis.call('ZADD', KEYS[1], now, tokens .. ':' .. ARGV[4])
+  redis.call('EXPIRE', KEYS[1], math.ceil(window) + 1)
+  return '0'
+end
+return tostring(tonumber(entries[2]) + window - now)
+"""
+
+
+class RedisTokenBudget(TokenBudget):
+    """
+    TokenBudget 과 같은 인터페이스로, 사용량을 Redis sorted set 하나에 기록해
+    여러 Celery 하위 작업/호스트가 INDEX_EMBED_TPM 한도 하나를 함께 쓴다.
+    Redis 를 쓸 수 없으면 프로세스 안 TokenBudget 으로 동작한다.
+    """
+
+    KEY = "index:embed:tpm"
+
+    def __init__(self, tokens_per_minute: int, key: str = KEY):
+        super().__init__(tokens_per_minute)
+        self.key = key
+        self._script = None
+
+    def _acquire_script(self):
+        if self._script is None:
+            from django_redis import get_redis_connection
+            self._script = get_redis_connection("default").register_script(_ACQUIRE_SCRIPT)
+        return self._script
+
+    def acquire(self, tokens: int) -> None:
+        if self.tokens_per_minute <= 0:
+            return
+        started = time.monotonic()
+        try:
+            script = self._acquire_script()
+            while True:
+                wait = float(script(keys=[self.key], args=[self.WINDOW, self.tokens_per_minute, tokens, uuid.uuid4().hex]))
+                if wait <= 0:
+                    break
+                time.sleep(max(wait, 0.05))
+        except Exception as e:
+            logger.warning(f"redis token budget unavailable, using local budget: {e}")
+            super().acquire(tokens)
+            return
+        with self._cond:
+            self.waited += time.monotonic() - started
+
+
+class AdaptiveChunk:
+    """bulk 청크 크기 AIMD: 429 면 절반으로, 문제없이 끝나면 step 만큼 증가."""
+
+    def __init__(self, initial: int, minimum: int = 10, maximum: int = 1000, step: int = None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.size = max(minimum, min(initial, maximum))
+        self.step = step or max(1, self.size // 4)
+        self.backoffs = 0
+
+    def backoff(self) -> int:
+        self.size = max(self.minimum, self.size // 2)
+        self.backoffs += 1
+        return self.size
+
+    def grow(self) -> int:
+        self.size = min(self.maximum, self.size + self.step)
+        return self.size
@@ -1,9 +1,10 @@
-import os
 import json
 from django.core.management.base import BaseCommand
-from openai import OpenAI
+from chat.gpt.openai_client import get_openai_client
+from chat.embedding_cache import embed_query
 from chat.gpt_service import fine_tuned_model
 from chat.opensearch_client import OPENSEARCH_CLIENT as os_client
+from chat.catalog import CATALOG_ALIAS
 
 class Command(BaseCommand):
     help = """
@@ -26,7 +27,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--index',
             type=str,
-            default=os.getenv('OPENSEARCH_INDEX', 'financial-products'),
+            default=CATALOG_ALIAS,
             help='검색할 OpenSearch 인덱스명'
         )
 
@@ -35,13 +36,8 @@ class Command(BaseCommand):
         top_k      = options['top_k']
         index_name = options['index']
 
-        # 1) OpenAI 임베딩 생성
-        openai = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        resp   = openai.embeddings.create(
-            model='text-embedding-3-small',
-            input=[query]
-        )
-        emb = resp.data[0].embedding
+        # 1) OpenAI 임베딩 생성 (검색과 같은 질의 임베딩 캐시 공유)
+        emb = embed_query(query)
 
         # 2) k-NN 검색 실행
         body = {
@@ -66,7 +62,7 @@ class Command(BaseCommand):
                 "text":  hit["_source"].get("text", "").replace("\n", " ")
             })
 
-        chat_resp = openai.chat.completions.create(
+        chat_resp = get_openai_client().chat.completions.create(
             model=fine_tuned_model,
             messages=[
                 {
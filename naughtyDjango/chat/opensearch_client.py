@@ -1,12 +1,28 @@
 # chat/opensearch_client.py
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
 from opensearchpy import OpenSearch, RequestsHttpConnection
 from requests_aws4auth import AWS4Auth
 import boto3
 
+import logging
+
+from chat.embedding_cache import embed_query
+from chat.vector_index import LOCAL_VECTOR_INDEX
+from chat.singleflight import single_flight, make_flight_key
+from chat.catalog import CATALOG_ALIAS
+from chat.deadline import attempt_timeout
+
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+# 상품 k-NN 백엔드: opensearch(기본) | local(메모리 매핑 인덱스)
+# opensearch 호출이 실패하면 로컬 인덱스가 있을 경우 degraded 모드로 대신 응답
+VECTOR_SEARCH_BACKEND = os.getenv("VECTOR_SEARCH_BACKEND", "opensearch")
+
+# 동일 검색을 기다리는 follower 의 최대 대기 시간(초)
+SEARCH_SINGLEFLIGHT_WAIT = float(os.getenv("SEARCH_SINGLEFLIGHT_WAIT", 5))
+OPENSEARCH_MAX_RETRIES = 3
 
 # ── AWS 자격증명 & SigV4 설정 ──
 session = boto3.Session()
@@ -34,55 +50,86 @@ OPENSEARCH_CLIENT = OpenSearch(
     pool_maxsize=25,
     # ↓ 타임아웃·재시도 옵션
     timeout=30,
-    max_retries=3,
+    max_retries=OPENSEARCH_MAX_RETRIES,
     retry_on_timeout=True,
     # ↓ HTTP 헤더에 Keep‑Alive 명시
     headers={"Connection": "keep-alive"},
 )
 
-def search_financial_products(query: str, top_k: int = 5, index_name: str = None, product_type: str = None):
-    openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    resp = openai.embeddings.create(model="text-embedding-3-small", input=[query])
-    emb = resp.data[0].embedding
+def search_params() -> dict:
+    """
+    요청 마감(chat.deadline)이 있으면 transport 재시도까지 모두 남은 시간 안에 끝나도록 request_timeout 을 준다.
+    search/msearch/mget 등에 **search_params() 로 넘긴다. 마감이 없으면 클라이언트 기본값(30초).
+    """
+    timeout = attempt_timeout("search", OPENSEARCH_MAX_RETRIES + 1)
+    return {} if timeout is None else {"request_timeout": timeout}
+
+
+def _flight_wait() -> float:
+    left = attempt_timeout("search", 1)
+    return SEARCH_SINGLEFLIGHT_WAIT if left is None else min(SEARCH_SINGLEFLIGHT_WAIT, left)
 
-    client = OPENSEARCH_CLIENT
-    index = index_name or os.getenv("OPENSEARCH_INDEX")
 
+def search_financial_products(query: str, top_k: int = 5, index_name: str = None, product_type=None):
+    """
+    질의 임베딩 + k-NN 검색. 여러 워커에서 같은 검색이 동시에 들어오면
+    single-flight 로 한 번만 실행하고 결과를 공유한다.
+
+    product_type 에 리스트를 넘기면 임베딩 1회 + _msearch 1회로 유형별 검색을 수행하고
+    {유형: hits} 딕셔너리를 반환한다.
+    """
+    if isinstance(product_type, (list, tuple)):
+        filter_sets = {pt: {"term": {"product_type": pt}} for pt in product_type}
+        return search_financial_products_multi(query, filter_sets, top_k=top_k, index_name=index_name)
+
+    index = index_name or CATALOG_ALIAS
+    key = make_flight_key("search", query, top_k, index, product_type)
+    return single_flight(
+        key,
+        lambda: _search_financial_products(query, top_k, index, product_type),
+        wait_timeout=_flight_wait(),
+    )
+
+
+def search_financial_products_multi(query: str, filter_sets: dict, top_k: int = 5, index_name: str = None) -> dict:
+    """
+    하나의 질의 벡터로 여러 필터 조합을 한 번의 _msearch 로 검색한다.
+    - filter_sets: {이름: OpenSearch filter 절(dict) 또는 None}
+    - 반환: {이름: hits 리스트}
+    """
+    index = index_name or CATALOG_ALIAS
+    key = make_flight_key("msearch", query, top_k, index, filter_sets)
+    return single_flight(
+        key,
+        lambda: _msearch_financial_products(query, filter_sets, top_k, index),
+        wait_timeout=_flight_wait(),
+    )
+
+
+def _knn_body(emb, top_k: int, flt: dict = None) -> dict:
     # 1) 신형 방식: knn 내부 filter (OpenSearch 2.4+)
-    if product_type:
-        body_knn_with_filter = {
-            "size": top_k,
-            "query": {
-                "knn": {
-                    "embedding": {
-                        "vector": emb,
-                        "k": top_k,
-                        "filter": {"term": {"product_type": product_type}}
-                    }
-                }
+    knn = {"vector": emb, "k": top_k}
+    if flt:
+        knn["filter"] = flt
+    return {"size": top_k, "query": {"knn": {"embedding": knn}}}
+
+
+def _bool_knn_body(emb, top_k: int, flt: dict) -> dict:
+    # 2) 구형 호환: bool.must(knn) + bool.filter(term)
+    return {
+        "size": top_k,
+        "query": {
+            "bool": {
+                "filter": [flt],
+                "must": [
+                    {"knn": {"embedding": {"vector": emb, "k": top_k}}}
+                ]
             }
         }
-        try:
-            result = client.search(index=index, body=body_knn_with_filter)
-        except Exception:
-            # 2) 구형 호환: bool.must(knn) + bool.filter(term)
-            body_bool_must_knn = {
-                "size": top_k,
-                "query": {
-                    "bool": {
-                        "filter": [{"term": {"product_type": product_type}}],
-                        "must": [
-                            {"knn": {"embedding": {"vector": emb, "k": top_k}}}
-                        ]
-                    }
-                }
-            }
-            result = client.search(index=index, body=body_bool_must_knn)
-    else:
-        # 필터 없을 때는 기본 knn
-        body = {"size": top_k, "query": {"knn": {"embedding": {"vector": emb, "k": top_k}}}}
-        result = client.search(index=index, body=body)
+    }
 
+
+def _format_hits(result: dict) -> list:
     return [
         {
             "id": hit["_id"],
@@ -92,4 +139,106 @@ def search_financial_products(query: str, top_k: int = 5, index_name: str = None
             "table": hit["_source"].get("table"),
         }
         for hit in result.get("hits", {}).get("hits", [])
-    ]
\ No newline at end of file
+    ]
+
+
+def _local_product_types(flt: dict):
+    """로컬 인덱스가 처리할 수 있는 필터(product_type term)만 허용. 그 외는 ValueError."""
+    if not flt:
+        return None
+    term = flt.get("term", {}) if isinstance(flt, dict) else {}
+    if len(flt) == 1 and list(term.keys()) == ["product_type"]:
+        return [term["product_type"]]
+    raise ValueError(f"local vector index cannot apply filter: {flt}")
+
+
+def _use_local_backend() -> bool:
+    return VECTOR_SEARCH_BACKEND == "local" and LOCAL_VECTOR_INDEX.available()
+
+
+def _search_financial_products(query: str, top_k: int, index: str, product_type: str = None):
+    # 질의 임베딩은 L1(LRU)/L2(Redis) 캐시를 거친다
+    emb = embed_query(query)
+    product_types = [product_type] if product_type else None
+
+    if _use_local_backend():
+        return LOCAL_VECTOR_INDEX.search(emb, top_k=top_k, product_types=product_types)
+
+    try:
+        return _opensearch_knn(emb, top_k, index, product_type)
+    except Exception as e:
+        if not LOCAL_VECTOR_INDEX.available():
+            raise
+        logger.warning(f"OpenSearch k-NN failed, serving from local vector index: {e}")
+        return LOCAL_VECTOR_INDEX.search(emb, top_k=top_k, product_types=product_types)
+
+
+def _opensearch_knn(emb, top_k: int, index: str, product_type: str = None):
+    client = OPENSEARCH_CLIENT
+
+    if product_type:
+        flt = {"term": {"product_type": product_type}}
+        try:
+            result = client.search(index=index, body=_knn_body(emb, top_k, flt), **search_params())
+        except Exception:
+            result = client.search(index=index, body=_bool_knn_body(emb, top_k, flt), **search_params())
+    else:
+        # 필터 없을 때는 기본 knn
+        result = client.search(index=index, body=_knn_body(emb, top_k), **search_params())
+
+    return _format_hits(result)
+
+
+def _msearch_financial_products(query: str, filter_sets: dict, top_k: int, index: str) -> dict:
+    emb = embed_query(query)
+
+    if _use_local_backend():
+        try:
+            return _local_multi(emb, filter_sets, top_k)
+        except ValueError:
+            pass  # 로컬에서 표현할 수 없는 필터 → OpenSearch 로
+
+    try:
+        return _opensearch_msearch(emb, filter_sets, top_k, index)
+    except Exception as e:
+        if not LOCAL_VECTOR_INDEX.available():
+            raise
+        logger.warning(f"OpenSearch _msearch failed, serving from local vector index: {e}")
+        return _local_multi(emb, filter_sets, top_k)
+
+
+def _local_multi(emb, filter_sets: dict, top_k: int) -> dict:
+    types = {name: _local_product_types(flt) for name, flt in filter_sets.items()}
+    return {
+        name: LOCAL_VECTOR_INDEX.search(emb, top_k=top_k, product_types=pts)
+        for name, pts in types.items()
+    }
+
+
+def _opensearch_msearch(emb, filter_sets: dict, top_k: int, index: str) -> dict:
+    client = OPENSEARCH_CLIENT
+    names = list(filter_sets.keys())
+
+    def _msearch(bodies):
+        lines = []
+        for body in bodies:
+            lines.append({"index": index})
+            lines.append(body)
+        return client.msearch(body=lines, **search_params()).get("responses", [])
+
+    responses = _msearch([_knn_body(emb, top_k, filter_sets[n]) for n in names])
+
+    results, retry = {}, []
+    for name, resp in zip(names, responses):
+        if resp.get("error") and filter_sets[name]:
+            retry.append(name)
+        else:
+            results[name] = _format_hits(resp)
+
+    # knn 내부 filter 를 지원하지 않는 클러스터: 실패한 항목만 bool 방식으로 재요청
+    if retry:
+        fallback = _msearch([_bool_knn_body(emb, top_k, filter_sets[n]) for n in retry])
+        for name, resp in zip(retry, fallback):
+            results[name] = [] if resp.get("error") else _format_hits(resp)
+
+    return {name: results.get(name, []) for name in names}
@@ -6,19 +6,37 @@
 - create_*_tool 팩토리로 만든 도구들을 등록.
 - OpenAI Functions 제약: tool.name 은 ^[a-zA-Z0-9_-]+$ 여야 하므로
   빌더에서 자동으로 이름을 정규화(_sanitize_tool_names)한다.
+- LLM 클라이언트/도구/AgentExecutor 는 상태가 없으므로 프로세스당 한 번만 만든다 (get_finrec_agent).
+  세션에 묶인 도구는 실행 시 bind_session 으로 넘긴 세션 ID 를 ContextVar 에서 읽는다.
+- 요청 마감(chat.deadline): LLM 호출마다 남은 시간으로 timeout/재시도 수를 다시 정하고(stage_budget,
+  마감이 없으면 DEADLINE_AGENT_LLM_TIMEOUT), 매 LLM/도구 호출 직전 남은 시간을 확인해
+  부족하면 반복을 멈추고 대체 응답을 돌려준다.
+- 작업 스트림(chat.stream_events)이 묶여 있으면 LLM 토큰을 token 이벤트로 흘려보낸다
+  (함수 호출 단계는 본문이 비어 있으므로 사실상 최종 답변만 나간다).
 """
 
 import os
 import re
+import threading
+from typing import Optional
+import httpx
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain.agents import initialize_agent, AgentType
+from langchain_core.callbacks import BaseCallbackHandler
+
+from chat.gpt.openai_client import OPENAI_CONNECT_TIMEOUT, get_openai_client
+from chat.deadline import (
+    DeadlineExceeded, DEADLINE_FALLBACK_MESSAGE, STAGE_TIMEOUTS, check as check_deadline, remaining, stage_budget,
+)
+from chat.stream_events import emit as emit_stream_event, streaming_enabled
 
 # 기존 Tool 팩토리 재사용
 from .profile_tool import create_profile_summary_tool
 from .screener_tool import create_stock_recommender_tool
 from .lookup_tool import create_stock_lookup_tool
 from .retriever_chain import create_self_query_rag_tool
+from .session_context import bind_session
 
 load_dotenv()
 
@@ -28,6 +46,8 @@ SYSTEM_MSG = (
     "`financial_product_recommender`, `stock_screener`. "
     "결과는 한국어로 친절하고 간결하게 정리하세요."
 )
+# 에이전트 LLM 한 번 호출의 최대 재시도 수 (남은 마감 안에 들어가는 만큼만 허용)
+AGENT_LLM_MAX_RETRIES = 1
 
 def _sanitize_tool_names(tools):
     """
@@ -52,16 +72,65 @@ def _sanitize_tool_names(tools):
         sanitized.append(t)
     return sanitized
 
-def build_finrec_agent(session_id: str):
+class DeadlineCompletions:
+    """
+    ChatOpenAI(client=...) 에 넣는 chat.completions 대리자.
+    에이전트는 프로세스 공용이라 생성 시점의 timeout 을 쓸 수 없으므로, 호출마다 남은 마감으로
+    timeout/max_retries 를 정해 공용 클라이언트의 with_options 사본(같은 커넥션 풀)으로 보낸다.
+    """
+
+    def create(self, **kwargs):
+        budget = stage_budget("agent_llm", AGENT_LLM_MAX_RETRIES)
+        timeout, retries = budget or (STAGE_TIMEOUTS["agent_llm"], AGENT_LLM_MAX_RETRIES)
+        client = get_openai_client().with_options(
+            timeout=httpx.Timeout(timeout, connect=min(OPENAI_CONNECT_TIMEOUT, timeout)),
+            max_retries=retries,
+        )
+        return client.chat.completions.create(**kwargs)
+
+class DeadlineGuard(BaseCallbackHandler):
+    """
+    매 LLM/도구 호출 직전 요청 마감을 확인 (raise_error=True 라 예외가 에이전트 밖으로 전파된다).
+    LLM 은 스트리밍으로 호출하므로 HTTP timeout 이 조각 사이에만 걸린다 → 토큰마다 마감을 확인해 끊는다.
+    """
+
+    raise_error = True
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        check_deadline("agent_llm")
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        check_deadline("agent_llm")
+
+    def on_llm_new_token(self, token, **kwargs):
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded("agent_llm_stream", left)
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        check_deadline("search")
+
+class StreamTokens(BaseCallbackHandler):
+    """LLM 토큰 조각을 작업 스트림의 token 이벤트로 전달."""
+
+    def on_llm_new_token(self, token, **kwargs):
+        if token:
+            emit_stream_event("token", {"delta": token})
+
+_AGENT = None
+_AGENT_LOCK = threading.Lock()
+
+def build_finrec_agent(session_id: Optional[str] = None):
     """
     금융 상담 에이전트 인스턴스를 생성한다.
     - 함수콜 기반 에이전트(OPENAI_FUNCTIONS)로 Tool 사용 신뢰성을 높임
     - 반복 폭주 방지를 위해 max_iterations 제한
     - Tool 이름 자동 정규화
+    - session_id 를 주면 세션 도구를 그 세션에 고정, 없으면 실행 시 세션 컨텍스트를 읽는다
     """
     tools = [
         create_profile_summary_tool(session_id),
-        create_stock_recommender_tool(),
+        create_stock_recommender_tool(session_id),
         create_stock_lookup_tool(),
         create_self_query_rag_tool(),
     ]
@@ -71,6 +140,11 @@ def build_finrec_agent(session_id: str):
         model=os.getenv("OPENAI_AGENT_MODEL", "gpt-4o-mini"),
         temperature=0.2,
         openai_api_key=os.getenv("OPENAI_API_KEY"),
+        # 호출마다 남은 마감으로 timeout/재시도를 정해 공용 클라이언트(커넥션 풀)로 보낸다
+        # (마감 확인은 DeadlineGuard)
+        client=DeadlineCompletions(),
+        # 토큰 콜백(StreamTokens)을 받기 위해 스트리밍으로 호출 (결과는 동일하게 모아서 반환)
+        streaming=True,
     )
 
     agent = initialize_agent(
@@ -85,16 +159,37 @@ def build_finrec_agent(session_id: str):
     )
     return agent
 
+def get_finrec_agent():
+    """프로세스 공용 에이전트 (최초 호출 시 한 번 생성)."""
+    global _AGENT
+    if _AGENT is None:
+        with _AGENT_LOCK:
+            if _AGENT is None:
+                _AGENT = build_finrec_agent()
+    return _AGENT
+
+def reset_finrec_agent() -> None:
+    """환경 변수(모델 등)를 바꾼 뒤 다시 만들 때 사용."""
+    global _AGENT
+    with _AGENT_LOCK:
+        _AGENT = None
+
 def run_agent(query: str, session_id: str) -> str:
     """
     외부에서 호출하는 진입점.
     - 서비스 레이어(RecommendationService)에서 이 함수를 호출한다.
     """
-    agent = build_finrec_agent(session_id)
     try:
-        result = agent.invoke({"input": query})
+        agent = get_finrec_agent()
+        callbacks = [DeadlineGuard()]
+        if streaming_enabled():
+            callbacks.append(StreamTokens())
+        with bind_session(session_id):
+            result = agent.invoke({"input": query}, config={"callbacks": callbacks})
         if isinstance(result, dict):
             return (result.get("output") or "").strip()
         return str(result).strip()
+    except DeadlineExceeded:
+        return DEADLINE_FALLBACK_MESSAGE
     except Exception as e:
         return f"에이전트를 실행하는 중 오류가 발생했어요: {e}"
\ No newline at end of file
@@ -0,0 +1,243 @@
+# chat/rag/autocomplete.py
+"""
+상품/종목 이름 자동완성 (인메모리 접두어 색인).
+
+index_to_opensearch 가 읽는 카탈로그 테이블(chat.indexing.documents.TABLES)에서
+상품명(fin_prdt_nm)/금융회사(kor_co_nm), 종목 약식명(prdt_abrv_name), 종목코드/티커를 읽어
+정렬된 키 배열 하나로 들고 있고, 질의마다 bisect 로 접두어 구간을 찾아 그 구간에서 순위 상위만 고른다 (OpenSearch 미사용).
+
+- 키는 공백 제거 + 소문자. 이름의 각 단어 시작 위치부터의 접미어도 키로 넣어
+  'KB Star 정기예금' 을 '정기' 로도 찾는다 (단어 중간 일치는 순위가 낮다)
+- 한글은 초성 키도 함께 넣는다: 'ㅅㅅㅈㅈ' → 삼성전자. 질의에 자음(ㄱ~ㅎ)이 섞이면 초성 키로 찾는다
+- 상품 유형별 키 배열을 따로 두어 유형 필터가 있어도 구간 스캔 한 번으로 끝난다
+- 구간은 사전순이라 앞부분만 잘라 보면 '삼' 에서 '삼가…' 수백 건에 밀려 '삼성' 이 빠진다.
+  구간 전체를 순위로 비교하고 limit 개만 힙으로 고른다
+- 카탈로그 generation 이 바뀌면(= 재색인 alias 교체) 다시 읽는다
+"""
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pymysql
+
+from chat.catalog import catalog_generation
+from chat.indexing.documents import TABLES
+from chat.indexing.pipeline import db_config
+from chat.rag.screener_engine import SCREENER_GENERATION_CHECK, SCREENER_RETRY_AFTER
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_DEFAULT_LIMIT = int(os.getenv("AUTOCOMPLETE_DEFAULT_LIMIT", 10))
+AUTOCOMPLETE_MAX_LIMIT = 20
+
+# 테이블 → (표시 이름 필드, [(키 필드, 종류)]) — 종류 순서가 같은 일치 품질 안에서의 우선순위
+AUTOCOMPLETE_FIELDS = {
+    "deposit": ("fin_prdt_nm", [("fin_prdt_nm", "name"), ("kor_co_nm", "company")]),
+    "savings": ("fin_prdt_nm", [("fin_prdt_nm", "name"), ("kor_co_nm", "company")]),
+    "annuity": ("fin_prdt_nm", [("fin_prdt_nm", "name"), ("kor_co_nm", "company")]),
+    "krx_stock_info": ("prdt_abrv_name", [("prdt_abrv_name", "name"), ("stck_shrn_iscd", "code")]),
+    "nasdaq_stock_info": ("prdt_abrv_name", [("prdt_abrv_name", "name"), ("code", "code")]),
+}
+# 응답에 함께 싣는 보조 필드
+AUTOCOMPLETE_EXTRA = {
+    "deposit": ["kor_co_nm"],
+    "savings": ["kor_co_nm"],
+    "annuity": ["kor_co_nm"],
+    "krx_stock_info": ["stck_shrn_iscd", "bstp_kor_isnm"],
+    "nasdaq_stock_info": ["code", "e_icod"],
+}
+_KIND_RANK = {"name": 0, "code": 1, "company": 2}
+
+# 일치 품질: 키 전체 일치 < 이름 맨 앞 접두어 < 단어 시작 접두어
+_EXACT, _PREFIX, _WORD = 0, 1, 2
+
+CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_CHOSUNG_SET = frozenset(CHOSUNG)
+# 조합형 초성(U+1100~) 입력도 호환 자모로 맞춘다
+_JAMO_TO_COMPAT = {0x1100 + i: ch for i, ch in enumerate(CHOSUNG)}
+
+
+def _compact(text: str) -> str:
+    return "".join((text or "").split()).lower().translate(_JAMO_TO_COMPAT)
+
+
+def chosung(text: str) -> str:
+    """한글 음절 → 초성, 나머지 문자는 그대로. '삼성전자' → 'ㅅㅅㅈㅈ'."""
+    return "".join(
+        CHOSUNG[(ord(ch) - 0xAC00) // 588] if "가" <= ch <= "힣" else ch
+        for ch in text
+    )
+
+
+def _word_starts(text: str) -> List[int]:
+    """공백을 뺀 문자열 기준 각 단어(공백/괄호 뒤)의 시작 위치."""
+    starts, pos, boundary = [], 0, True
+    for ch in text or "":
+        if ch.isspace():
+            boundary = True
+            continue
+        if boundary and ch not in "()[]":
+            starts.append(pos)
+            boundary = False
+        if ch in "([":
+            boundary = True
+        pos += 1
+    return starts
+
+
+class PrefixIndex:
+    """스냅샷 하나에 대한 정렬 키 배열 (전체 + 상품 유형별)."""
+
+    def __init__(self, rows_by_table: Dict[str, List[dict]]):
+        self.entries: List[dict] = []
+        pairs: Dict[Optional[str], List[Tuple[str, int, int, int]]] = {None: []}
+
+        for tbl, rows in rows_by_table.items():
+            label_field, key_fields = AUTOCOMPLETE_FIELDS[tbl]
+            product_type = TABLES[tbl]
+            bucket = pairs.setdefault(product_type, [])
+            seen = set()
+            for row in rows:
+                label = (row.get(label_field) or "").strip()
+                if not label:
+                    continue
+                # 예금/적금은 저축기간 옵션마다 행이 있으므로 (상품명, 회사) 기준으로 한 번만
+                dedupe_key = (label, row.get("kor_co_nm"))
+                if dedupe_key in seen:
+                    continue
+                seen.add(dedupe_key)
+
+                entry_no = len(self.entries)
+                entry = {"label": label, "product_type": product_type, "table": tbl, "id": row.get("id")}
+                for field in AUTOCOMPLETE_EXTRA[tbl]:
+                    if row.get(field):
+                        entry[field] = row[field]
+                self.entries.append(entry)
+
+                for field, kind in key_fields:
+                    value = row.get(field)
+                    if not value:
+                        continue
+                    for key, quality in self._keys_for(str(value)):
+                        item = (key, quality, _KIND_RANK[kind], entry_no)
+                        pairs[None].append(item)
+                        bucket.append(item)
+
+        self._keys: Dict[Optional[str], List[str]] = {}
+        self._refs: Dict[Optional[str], List[Tuple[int, int, int]]] = {}
+        for scope, items in pairs.items():
+            items.sort()
+            self._keys[scope] = [item[0] for item in items]
+            self._refs[scope] = [item[1:] for item in items]
+        self.size = len(self._keys[None])
+
+    @staticmethod
+    def _keys_for(value: str) -> List[Tuple[str, int]]:
+        compact = _compact(value)
+        keys = []
+        for start in _word_starts(value):
+            suffix = compact[start:]
+            quality = _PREFIX if start == 0 else _WORD
+            keys.append((suffix, quality))
+            initials = chosung(suffix)
+            if initials != suffix:
+                keys.append((initials, quality))
+        return keys
+
+    def suggest(self, query: str, limit: int = AUTOCOMPLETE_DEFAULT_LIMIT,
+                product_type: Optional[str] = None) -> List[dict]:
+        prefix = _compact(query)
+        if not prefix:
+            return []
+        # 자음이 하나라도 있으면 초성 질의 ('삼성ㅈ' 처럼 섞여 있어도 전체를 초성으로 바꿔 비교)
+        if any(ch in _CHOSUNG_SET for ch in prefix):
+            prefix = chosung(prefix)
+        keys = self._keys.get(product_type)
+        if keys is None:
+            return []
+        refs = self._refs[product_type]
+
+        # prefix 로 시작하는 키 구간 [start, end) — 끝은 마지막 글자를 하나 올린 문자열의 위치
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+
+        best: Dict[int, Tuple[int, int, int, str]] = {}
+        for i in range(start, end):
+            quality, kind_rank, entry_no = refs[i]
+            if quality == _PREFIX and len(keys[i]) == len(prefix):
+                quality = _EXACT
+            # 같은 품질/종류 안에서는 짧은 키 → 사전순 (코드 접두어는 코드 순서가 된다)
+            rank = (quality, kind_rank, len(keys[i]), keys[i])
+            if entry_no not in best or rank < best[entry_no]:
+                best[entry_no] = rank
+
+        ordered = heapq.nsmallest(limit, best.items(), key=lambda kv: kv[1])
+        return [self.entries[entry_no] for entry_no, _ in ordered]
+
+
+def load_catalog_names() -> Dict[str, List[dict]]:
+    """MySQL 카탈로그 테이블에서 자동완성에 쓰는 컬럼만 읽는다."""
+    rows_by_table = {}
+    with pymysql.connect(**db_config(streaming=False)) as conn, conn.cursor() as cur:
+        for tbl in TABLES:
+            label_field, key_fields = AUTOCOMPLETE_FIELDS[tbl]
+            columns = dict.fromkeys(["id", label_field, *(f for f, _ in key_fields), *AUTOCOMPLETE_EXTRA[tbl]])
+            cur.execute(f"SELECT {', '.join(f'`{c}`' for c in columns)} FROM {tbl} ORDER BY id")
+            rows_by_table[tbl] = cur.fetchall()
+    return rows_by_table
+
+
+class Autocomplete:
+    """프로세스 단일 접두어 색인 + generation 기반 재적재 (COLUMNAR_SCREENER 와 같은 주기)."""
+
+    def __init__(self, loader=load_catalog_names):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._index: Optional[PrefixIndex] = None
+        self._generation = None
+        self._checked_at = 0.0
+        self._failed_at = 0.0
+
+    def index(self) -> PrefixIndex:
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < SCREENER_GENERATION_CHECK:
+            return self._index
+        if self._index is None and self._failed_at and now - self._failed_at < SCREENER_RETRY_AFTER:
+            raise RuntimeError("autocomplete index unavailable (recent load failure)")
+
+        generation = catalog_generation()
+        if self._index is not None and generation == self._generation:
+            self._checked_at = now
+            return self._index
+
+        with self._lock:
+            if self._index is not None and generation == self._generation:
+                return self._index
+            started = time.perf_counter()
+            try:
+                index = PrefixIndex(self._loader())
+            except Exception:
+                self._failed_at = now
+                if self._index is None:
+                    raise
+                logger.exception("autocomplete index reload failed, keeping previous index")
+                self._checked_at = now
+                return self._index
+            self._index, self._generation, self._checked_at = index, generation, now
+            logger.info(
+                f"autocomplete index built: generation={generation}, entries={len(index.entries)}, "
+                f"keys={index.size}, {time.perf_counter() - started:.2f}s"
+            )
+            return index
+
+    def suggest(self, query: str, limit: int = AUTOCOMPLETE_DEFAULT_LIMIT,
+                product_type: Optional[str] = None) -> List[dict]:
+        return self.index().suggest(query, limit, product_type)
+
+
+# 프로세스 단일 인스턴스
+AUTOCOMPLETE = Autocomplete()
@@ -0,0 +1,288 @@
+# chat/rag/entity_index.py
+"""
+종목명/티커 사전 기반 엔티티 추출기.
+
+컬럼 스냅샷(chat.rag.screener_engine)을 읽을 때마다 종목명(bstp_kor_isnm, prdt_abrv_name),
+종목코드(stck_shrn_iscd), 티커(code)로 사전을 만든다.
+
+- Aho–Corasick 오토마톤으로 질의 한 번 훑어 모든 언급을 찾는다 (leftmost-longest, 겹침 제거)
+- 언급 앞은 단어 경계여야 하고(뒤에는 조사 허용, 영문/숫자 패턴은 뒤도 경계),
+  2글자 이하 티커는 원문이 대문자일 때만 인정
+  (예: 'it', 'on', 'a' 같은 일반 단어 오인 방지)
+- 사전 일치가 없으면 문자 bigram 역색인으로 Dice 유사도가 가장 높은 이름을 찾는다 (오타 대응)
+  퍼지 대상 말은 ENTITY_FUZZY_MIN_LENGTH 글자 이상, 영문/숫자만의 말은 대문자로 쓴
+  ENTITY_FUZZY_MIN_ASCII_LENGTH 글자 이상일 때만 ('PER' → PERI, 'sale' → ALEC 같은 오인 방지),
+  2글자 이하 티커는 퍼지로 고르지 않는다
+- 한 이름이 여러 종목에 걸리면 약식명 → 티커/코드 → 업종명 필드 순으로 우선
+"""
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+
+from chat.rag.screener_engine import COLUMNAR_SCREENER
+
+logger = logging.getLogger(__name__)
+
+# n-gram 유사도 하한 (0~1). 낮추면 오타에 관대하지만 엉뚱한 종목을 고를 수 있다
+ENTITY_FUZZY_THRESHOLD = float(os.getenv("ENTITY_FUZZY_THRESHOLD", 0.6))
+# 퍼지 매칭에 쓰는 말의 최소 길이 (공백 제외). 영문/숫자만의 말은 PER·EPS 같은 약어가 많아 더 길게
+ENTITY_FUZZY_MIN_LENGTH = int(os.getenv("ENTITY_FUZZY_MIN_LENGTH", 3))
+ENTITY_FUZZY_MIN_ASCII_LENGTH = int(os.getenv("ENTITY_FUZZY_MIN_ASCII_LENGTH", 4))
+# 이 길이 이하의 영문 티커는 원문이 대문자일 때만 사전 일치로 인정하고 퍼지로는 고르지 않는다
+SHORT_TICKER_LENGTH = 2
+
+# 테이블 → [(필드, 우선순위)] (작을수록 우선)
+ENTITY_FIELDS = {
+    "krx_stock_info": [("prdt_abrv_name", 0), ("stck_shrn_iscd", 1), ("bstp_kor_isnm", 2)],
+    "nasdaq_stock_info": [("prdt_abrv_name", 0), ("code", 1)],
+}
+# 이 우선순위의 이름을 여러 종목이 공유하면 모호한 것으로 보고 쓰지 않는다
+ENTITY_AMBIGUOUS_PRIORITY = 2
+
+_WS_RE = re.compile(r"\s+")
+# 퍼지 매칭 전에 떼어내는 질의 표현/조사
+_NOISE_RE = re.compile(r"현재가|주가|시세|정보|얼마|알려\s*줘|알려\s*주세요|어때|어떄|요$|\?")
+_PARTICLE_RE = re.compile(r"(은|는|이|가|의|을|를|도|랑|이랑|하고|과|와)$")
+
+
+def _normalize(text: str) -> str:
+    return _WS_RE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+def _is_short_ticker(pattern: str) -> bool:
+    return pattern.isascii() and len(pattern) <= SHORT_TICKER_LENGTH
+
+
+def _fuzzy_term_ok(term: str) -> bool:
+    """퍼지 매칭에 쓸 만한 말인지 (원문 대소문자 기준)."""
+    compact = term.replace(" ", "")
+    if compact.isascii():
+        # 영문은 티커처럼 대문자로 쓴 말만 (일반 영단어/소문자 약어 배제)
+        return len(compact) >= ENTITY_FUZZY_MIN_ASCII_LENGTH and compact.upper() == compact
+    return len(compact) >= ENTITY_FUZZY_MIN_LENGTH
+
+
+def _bigrams(text: str) -> List[str]:
+    compact = text.replace(" ", "")
+    if len(compact) < 2:
+        return [compact] if compact else []
+    return [compact[i:i + 2] for i in range(len(compact) - 1)]
+
+
+class AhoCorasick:
+    """소문자 정규화 문자열용 다중 패턴 매처. find_all 은 (start, end, pattern_id)."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int]]] = [[]]  # (pattern_id, 길이)
+
+    def add(self, pattern: str, pattern_id: int) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((pattern_id, len(pattern)))
+
+    def build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        node, found = 0, []
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern_id, length in self._out[node]:
+                found.append((i + 1 - length, i + 1, pattern_id))
+        return found
+
+
+class EntityIndex:
+    """
+    스냅샷 하나에 대한 종목 사전.
+    entity = {"product_type", "table", "row"(스냅샷 행 번호), "id"(MySQL PK), "name"}
+    """
+
+    def __init__(self, markets: Dict[str, object]):
+        self._markets = markets
+        self.entities: List[dict] = []
+        self.patterns: List[str] = []
+        self._targets: List[List[Tuple[int, int]]] = []  # pattern_id → [(우선순위, entity 번호)]
+        pattern_ids: Dict[str, int] = {}
+        self._matcher = AhoCorasick()
+        self._postings: Dict[str, set] = defaultdict(set)
+        self._gram_counts: List[int] = []
+
+        for market in markets.values():
+            fields = ENTITY_FIELDS.get(market.table)
+            if not fields:
+                continue
+            name_field = fields[0][0]
+            for row in range(market.size):
+                entity_no = len(self.entities)
+                self.entities.append({
+                    "product_type": market.product_type,
+                    "table": market.table,
+                    "row": row,
+                    "id": int(market.ids[row]),
+                    "name": market.text[name_field][row],
+                })
+                for field, priority in fields:
+                    value = market.text[field][row]
+                    if not value:
+                        continue
+                    pattern = _normalize(str(value)).lower()
+                    # 공백뿐인 값(업종명이 비어 있는 외국 기업 등)은 빈 패턴이 되므로 건너뛴다
+                    if not pattern or (len(pattern) < 2 and not pattern.isascii()):
+                        continue
+                    pid = pattern_ids.get(pattern)
+                    if pid is None:
+                        pid = pattern_ids[pattern] = len(self.patterns)
+                        self.patterns.append(pattern)
+                        self._targets.append([])
+                        self._matcher.add(pattern, pid)
+                        grams = set(_bigrams(pattern))
+                        self._gram_counts.append(len(grams))
+                        for gram in grams:
+                            self._postings[gram].add(pid)
+                    self._targets[pid].append((priority, entity_no))
+        self._matcher.build()
+        for targets in self._targets:
+            targets.sort()
+
+    def _pick(self, pid: int) -> Optional[int]:
+        """패턴 → 가장 우선인 entity 번호. 업종명처럼 여러 종목이 공유하는 하위 필드 이름은 모호하므로 None."""
+        targets = self._targets[pid]
+        if len(targets) > 1 and targets[0][0] == targets[1][0] == ENTITY_AMBIGUOUS_PRIORITY:
+            return None
+        return targets[0][1]
+
+    def _accept(self, original: str, lowered: str, start: int, end: int) -> bool:
+        pattern = lowered[start:end]
+        # 왼쪽은 한글 포함 단어 경계 필요 ('가입대상' 의 '대상' 배제), 오른쪽은 조사 허용
+        if start > 0 and lowered[start - 1].isalnum():
+            return False
+        if _is_word_char(pattern[-1]) and end < len(lowered) and _is_word_char(lowered[end]):
+            return False
+        if _is_short_ticker(pattern) and len(original) == len(lowered):
+            return original[start:end].isupper() or original[start:end].isdigit()
+        return True
+
+    def extract(self, query: str) -> List[dict]:
+        """질의 속 모든 종목 언급 → [{"text", "start", "end", "entity"}] (등장 순서)."""
+        original = _normalize(query)
+        lowered = original.lower()
+        matches = [
+            (start, end, pid) for start, end, pid in self._matcher.find_all(lowered)
+            if self._accept(original, lowered, start, end)
+        ]
+        # leftmost-longest, 겹치는 짧은 일치는 버린다
+        matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        mentions, cursor, seen = [], 0, set()
+        for start, end, pid in matches:
+            if start < cursor:
+                continue
+            entity_no = self._pick(pid)
+            if entity_no is None:
+                continue
+            cursor = end
+            if entity_no in seen:
+                continue
+            seen.add(entity_no)
+            mentions.append({
+                "text": original[start:end], "start": start, "end": end,
+                "entity": self.entities[entity_no],
+            })
+        return mentions
+
+    def fuzzy(self, term: str, threshold: float = ENTITY_FUZZY_THRESHOLD) -> Optional[Tuple[dict, float]]:
+        """bigram Dice 유사도가 가장 높은 종목 (threshold 미만이거나 너무 짧은 말이면 None)."""
+        term = _normalize(term)
+        if not _fuzzy_term_ok(term):
+            return None
+        grams = set(_bigrams(term.lower()))
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for pid in self._postings.get(gram, ()):
+                shared[pid] += 1
+        best, best_score = None, 0.0
+        for pid, n in shared.items():
+            if _is_short_ticker(self.patterns[pid]) or self._pick(pid) is None:
+                continue
+            score = 2.0 * n / (len(grams) + self._gram_counts[pid])
+            if score > best_score or (score == best_score and best is not None
+                                      and self._targets[pid][0] < self._targets[best][0]):
+                best, best_score = pid, score
+        if best is None or best_score < threshold:
+            return None
+        return self.entities[self._pick(best)], round(best_score, 3)
+
+    def source(self, entity: dict) -> dict:
+        """이 사전을 만든 스냅샷에서 종목 행을 _source 형태로 읽는다."""
+        return self._markets[entity["product_type"]].source(entity["row"], None)
+
+    def resolve(self, query: str) -> List[dict]:
+        """사전 일치 → (없으면) 질의 토큰별 퍼지 일치. 반환은 entity 목록."""
+        mentions = self.extract(query)
+        if mentions:
+            return [m["entity"] for m in mentions]
+        candidates = [_NOISE_RE.sub(" ", _normalize(query))]
+        candidates += [_PARTICLE_RE.sub("", tok) for tok in candidates[0].split()]
+        best = None
+        for term in filter(None, (c.strip() for c in candidates)):
+            hit = self.fuzzy(term)
+            if hit and (best is None or hit[1] > best[1]):
+                best = hit
+        return [best[0]] if best else []
+
+
+class EntityResolver:
+    """스냅샷이 바뀔 때(= 카탈로그 generation 변경) 사전을 다시 만든다."""
+
+    def __init__(self, screener=COLUMNAR_SCREENER):
+        self._screener = screener
+        self._lock = threading.Lock()
+        self._built_from = None
+        self._index: Optional[EntityIndex] = None
+
+    def index(self) -> EntityIndex:
+        markets = self._screener.markets()
+        if markets is not self._built_from:
+            with self._lock:
+                if markets is not self._built_from:
+                    self._index = EntityIndex(markets)
+                    self._built_from = markets
+                    logger.info(f"entity index built: {len(self._index.entities)} stocks, "
+                                f"{len(self._index.patterns)} patterns")
+        return self._index
+
+    def resolve(self, query: str) -> List[dict]:
+        return self.index().resolve(query)
+
+
+# 프로세스 단일 인스턴스
+ENTITY_RESOLVER = EntityResolver()
@@ -0,0 +1,261 @@
+# chat/rag/intent_router.py
+"""
+에이전트 앞단의 결정적 의도 라우터.
+
+OPENAI_FUNCTIONS 에이전트는 어떤 도구를 부를지 정하는 데 LLM 왕복 1회, 답을 다듬는 데 1회를 더 쓴다.
+의도가 분명한 질의는 여기서 바로 도구로 보낸다 (LLM 계획 호출 없음).
+
+1) 규칙: 정규식/키워드 + 스크리너 조건 파서(screener_plan.parse_conditions) + 종목 사전 정확 일치(entity_index)
+2) 규칙이 애매하면 의도별 예시 문장 임베딩의 중심(centroid)과 질의 임베딩의 코사인 유사도
+   (임베딩은 chat.embedding_cache 캐시를 거치므로 예시 문장은 사실상 한 번만 임베딩)
+3) 둘 다 확신이 낮으면 "agent" → 기존 에이전트로 위임
+
+결정/신뢰도/근거는 매번 로그(chat.router)로 남겨 임계값을 조정할 수 있게 한다.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from chat.embedding_cache import embed_queries, embed_query, normalize_query
+from chat.gpt_service import handle_chitchat
+from chat.rag.entity_index import ENTITY_RESOLVER
+from chat.rag.lookup_tool import run_specific_stock_lookup
+from chat.rag.profile_tool import get_profile_summary
+from chat.rag.retriever_chain import run_rag_chain
+from chat.rag.screener_plan import parse_conditions
+from chat.rag.screener_tool import run_stock_screener
+
+logger = logging.getLogger("chat.router")
+
+ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "1").lower() not in ("0", "false", "no")
+ROUTER_USE_EMBEDDINGS = os.getenv("INTENT_ROUTER_EMBEDDINGS", "1").lower() not in ("0", "false", "no")
+# 규칙 점수가 이 이상이고 2순위와 차이가 RULE_MARGIN 이상이면 규칙으로 확정
+ROUTER_RULE_THRESHOLD = float(os.getenv("INTENT_ROUTER_RULE_THRESHOLD", 0.8))
+ROUTER_RULE_MARGIN = 0.1
+# centroid 코사인 유사도 하한 / 1·2순위 차이 하한
+ROUTER_EMBED_THRESHOLD = float(os.getenv("INTENT_ROUTER_EMBED_THRESHOLD", 0.55))
+ROUTER_EMBED_MARGIN = float(os.getenv("INTENT_ROUTER_EMBED_MARGIN", 0.05))
+
+INTENTS = ("screener", "lookup", "profile", "rag", "chitchat")
+AGENT = "agent"
+
+# 의도별 예시 문장 (centroid 용)
+INTENT_EXAMPLES = {
+    "screener": [
+        "PER 10 이하 국내주식 상위 5개",
+        "PBR 1 미만 저평가 종목 추천해줘",
+        "EPS 높은 해외주식 10개 골라줘",
+        "장기적으로 안정적인 국내주식 추천",
+        "성장주 위주로 미국 주식 추천해줘",
+        "보증이율 2% 이상 연금 상품",
+    ],
+    "lookup": [
+        "삼성전자 정보 알려줘",
+        "애플 PER 얼마야",
+        "SK하이닉스 지표 보여줘",
+        "테슬라 어때?",
+        "카카오 종목 정보",
+    ],
+    "profile": [
+        "내 투자 성향 뭐야?",
+        "내가 알려준 정보 기억해?",
+        "지금까지 입력한 내용 요약해줘",
+        "내 프로필 보여줘",
+    ],
+    "rag": [
+        "금리 높은 정기예금 추천해줘",
+        "청년이 가입할 수 있는 적금 알려줘",
+        "우대조건 쉬운 예금 상품 찾아줘",
+        "노후 대비 연금저축 상품 추천",
+        "비대면 가입 가능한 적금 있어?",
+    ],
+    "chitchat": [
+        "안녕 반가워",
+        "고마워 도움이 됐어",
+        "PBR이 무슨 뜻이야?",
+        "주식이란 뭐야?",
+        "오늘 기분이 좋아",
+    ],
+}
+
+_PROFILE_RE = re.compile(
+    r"내\s*(?:정보|프로필|투자\s*성향|성향|나이|소득)"
+    r"|(?:입력한|입력했던|알려\s*준|말한|말했던)\s*(?:정보|내용)"
+    r"|기억\s*(?:해|하니|하고|나)"
+)
+_GREETING_RE = re.compile(r"^(?:안녕|고마|감사|반가|하이|ㅎㅇ|수고|잘\s*있|좋은\s*(?:아침|하루))")
+_DEFINITION_RE = re.compile(
+    r"(?:무슨\s*뜻|뜻이|의미|뭐야|뭔가요|무엇인가요|무엇이야|뭐예요|뭐에요|이란\??$|란\??$|차이(?:가|점)?)"
+)
+_RECOMMEND_RE = re.compile(r"추천|골라|찾아|뽑아|상위|top\s*\d*|\d+\s*개|리스트|목록|순위|있어\?|있나요")
+_STOCK_RE = re.compile(r"주식|종목|나스닥|코스피|코스닥|성장주|가치주|저평가|배당")
+# 시장 표현은 예금/적금에도 붙으므로 ("국내 적금") 예·적금 단어가 없을 때만 주식 신호로 본다
+_MARKET_RE = re.compile(r"국내|해외|미국")
+_DEPOSIT_RE = re.compile(r"예금|적금|저축")
+_PRODUCT_RE = re.compile(r"예금|적금|연금|irp|저축|금리|이율|우대")
+_LOOKUP_RE = re.compile(r"정보|지표|어때|어떄|얼마|알려|per|pbr|eps|상세")
+
+
+def _rule_scores(query: str) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """의도별 규칙 점수(0~1)와 근거."""
+    q = normalize_query(query).lower()
+    scores: Dict[str, float] = {}
+    reasons: Dict[str, str] = {}
+
+    def hit(intent: str, score: float, reason: str) -> None:
+        if score > scores.get(intent, 0.0):
+            scores[intent], reasons[intent] = score, reason
+
+    recommend = bool(_RECOMMEND_RE.search(q))
+    stock = bool(_STOCK_RE.search(q) or (_MARKET_RE.search(q) and not _DEPOSIT_RE.search(q)))
+    product = bool(_PRODUCT_RE.search(q))
+
+    if _PROFILE_RE.search(q):
+        hit("profile", 0.95, "profile_phrase")
+
+    if _GREETING_RE.search(q) and len(q) <= 15 and not (recommend or stock or product):
+        hit("chitchat", 0.9, "greeting")
+    if _DEFINITION_RE.search(q) and not recommend and "profile" not in scores:
+        hit("chitchat", 0.85, "definition")
+
+    conditions, sorts = parse_conditions(q)
+    if conditions or sorts:
+        hit("screener", 0.9, "numeric_condition")
+    elif stock and recommend and not product:
+        hit("screener", 0.8, "stock_recommend")
+
+    try:
+        mentions = ENTITY_RESOLVER.index().extract(query)
+    except Exception as e:
+        logger.warning(f"router: entity index unavailable: {e}")
+        mentions = []
+    if mentions:
+        if recommend or conditions or sorts:
+            # '삼성전자 같은 종목 추천' 처럼 종목명 + 추천 → 어느 쪽도 확정하지 않는다
+            hit("lookup", 0.5, "entity_with_recommend")
+            if reasons.get("screener") == "stock_recommend":
+                scores["screener"] = 0.6
+        else:
+            hit("lookup", 0.9 if _LOOKUP_RE.search(q) or len(mentions) > 1 else 0.85, "entity_exact")
+
+    if product and not stock:
+        hit("rag", 0.85 if recommend else 0.6, "product_keyword")
+
+    return scores, reasons
+
+
+class CentroidClassifier:
+    """의도별 예시 문장 임베딩의 정규화 평균(centroid)과의 코사인 유사도."""
+
+    def __init__(self, examples: Dict[str, list] = INTENT_EXAMPLES):
+        self._examples = examples
+        self._lock = threading.Lock()
+        self._labels = None
+        self._centroids: Optional[np.ndarray] = None
+
+    def _ensure(self) -> None:
+        if self._centroids is not None:
+            return
+        with self._lock:
+            if self._centroids is not None:
+                return
+            labels = list(self._examples)
+            texts = [t for label in labels for t in self._examples[label]]
+            vectors = np.asarray(embed_queries(texts), dtype=np.float32)
+            centroids, pos = [], 0
+            for label in labels:
+                n = len(self._examples[label])
+                mean = vectors[pos:pos + n].mean(axis=0)
+                centroids.append(mean / (np.linalg.norm(mean) or 1.0))
+                pos += n
+            self._labels, self._centroids = labels, np.stack(centroids)
+
+    def scores(self, query: str) -> Dict[str, float]:
+        self._ensure()
+        vec = np.asarray(embed_query(query), dtype=np.float32)
+        vec /= np.linalg.norm(vec) or 1.0
+        sims = self._centroids @ vec
+        return {label: round(float(s), 4) for label, s in zip(self._labels, sims)}
+
+
+CENTROID_CLASSIFIER = CentroidClassifier()
+
+
+def _top2(scores: Dict[str, float]) -> Tuple[Optional[str], float, float]:
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    if not ranked:
+        return None, 0.0, 0.0
+    second = ranked[1][1] if len(ranked) > 1 else 0.0
+    return ranked[0][0], ranked[0][1], second
+
+
+def route_intent(query: str) -> dict:
+    """
+    질의 → {"intent": screener|lookup|profile|rag|chitchat|agent, "confidence", "source": rule|embedding|fallback, ...}
+    어떤 단계가 실패해도 예외 대신 agent 로 넘긴다.
+    """
+    started = time.perf_counter()
+    decision = {"intent": AGENT, "confidence": 0.0, "source": "fallback"}
+    rules, reasons, embedding = {}, {}, {}
+    try:
+        if not ROUTER_ENABLED:
+            decision["source"] = "disabled"
+            return decision
+
+        rules, reasons = _rule_scores(query)
+        intent, score, second = _top2(rules)
+        if intent and score >= ROUTER_RULE_THRESHOLD and round(score - second, 4) >= ROUTER_RULE_MARGIN:
+            decision.update(intent=intent, confidence=score, source="rule", reason=reasons[intent])
+            return decision
+
+        if ROUTER_USE_EMBEDDINGS:
+            embedding = CENTROID_CLASSIFIER.scores(query)
+            intent, sim, second = _top2(embedding)
+            # 규칙이 같은 의도를 약하게라도 가리키면 margin 조건을 면제
+            agrees = intent is not None and rules.get(intent, 0.0) >= 0.5
+            if intent and sim >= ROUTER_EMBED_THRESHOLD and (agrees or sim - second >= ROUTER_EMBED_MARGIN):
+                decision.update(intent=intent, confidence=sim, source="embedding",
+                                margin=round(sim - second, 4), rule_agrees=agrees)
+        return decision
+    except Exception as e:
+        logger.warning(f"router failed, falling back to agent: {e}")
+        decision["error"] = repr(e)
+        return decision
+    finally:
+        decision["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(
+            f"intent route: intent={decision['intent']} confidence={decision['confidence']} "
+            f"source={decision['source']} rules={rules} embedding={embedding} "
+            f"elapsed_ms={decision['elapsed_ms']}",
+            extra={"router": {**decision, "rules": rules, "reasons": reasons, "embedding": embedding}},
+        )
+
+
+def _looks_failed(text: str) -> bool:
+    """도구가 예외를 문자열로 돌려준 경우 ('[Lookup Error] ...', '[Screening Error] ...')."""
+    return not text or (text.startswith("[") and "Error]" in text[:24])
+
+
+def dispatch(intent: str, query: str, session_id: str) -> Optional[str]:
+    """라우팅된 의도의 도구를 바로 실행. 실패하면 None (호출 측이 에이전트로 넘긴다)."""
+    if intent == "screener":
+        text = run_stock_screener(query, session_id=session_id)
+    elif intent == "lookup":
+        text = run_specific_stock_lookup(query)
+    elif intent == "profile":
+        text = get_profile_summary(query, session_id=session_id)
+    elif intent == "rag":
+        text = run_rag_chain(query)
+    elif intent == "chitchat":
+        text = handle_chitchat(query)
+    else:
+        return None
+    if _looks_failed(text):
+        logger.warning(f"routed tool failed, falling back to agent: intent={intent} output={text[:120]!r}")
+        return None
+    return text
@@ -1,13 +1,26 @@
 # chat/rag/lookup_tool.py
+import logging
 import os
+from typing import List
 from langchain.tools import Tool
 from opensearchpy import OpenSearch
-from chat.opensearch_client import OPENSEARCH_CLIENT as default_os_client
+from chat.opensearch_client import OPENSEARCH_CLIENT as default_os_client, search_params
+from chat.catalog import CATALOG_ALIAS
+from chat.embedding_cache import normalize_query
+from chat.indexing.documents import doc_id
+from chat.rag.entity_index import ENTITY_RESOLVER
+from chat.rag.result_cache import cached_result
+from chat.rag.screener_tool import SCREENER_BACKEND
 
-INDEX = os.getenv("OPENSEARCH_INDEX", "financial-products")
+logger = logging.getLogger(__name__)
+
+# 항상 alias 로 읽는다 (재색인 중에는 이전 generation 인덱스를 계속 조회)
+INDEX = CATALOG_ALIAS
 
 BANK_TABLES = {"deposit": "예금", "savings": "적금", "annuity": "연금"}
 STOCK_TABLES = {"krx_stock_info": "국내주식", "nasdaq_stock_info": "해외주식"}
+# 한 질의에서 함께 조회할 최대 종목 수 ("삼성전자랑 SK하이닉스 주가")
+LOOKUP_MAX_ENTITIES = int(os.getenv("LOOKUP_MAX_ENTITIES", 3))
 
 def _get_os_client():
     # screener_tool.py의 _get_os_client와 동일하게 정리
@@ -25,12 +38,42 @@ def _get_os_client():
 
 
 def run_specific_stock_lookup(query: str) -> str:
-    """사용자 질문에서 종목명을 추출하여 OpenSearch에서 해당 종목의 상세 정보를 찾습니다."""
-    # 간단한 종목명 추출 (실제로는 LLM을 사용하면 더 정교해짐)
-    # 예: "삼성전자 현재가" -> "삼성전자"
-    # 지금은 간단하게 query 전체를 종목명으로 가정합니다.
-    stock_name = query.replace("현재가", "").replace("주가", "").strip()
+    """사용자 질문에서 종목명/티커를 추출하여 해당 종목(들)의 상세 정보를 찾습니다."""
+    # 예: "삼성전자 현재가" -> "삼성전자" (사전 일치/퍼지 일치가 모두 실패할 때만 쓰는 검색어)
+    stock_name = normalize_query(query.replace("현재가", "").replace("주가", ""))
+
+    try:
+        # 종목 사전(Aho–Corasick + n-gram)으로 질의 속 모든 종목을 한 번에 찾는다
+        index = ENTITY_RESOLVER.index()
+        entities = index.resolve(query)[:LOOKUP_MAX_ENTITIES]
+    except Exception as e:
+        logger.warning(f"entity index unavailable, falling back to match query: {e}")
+        index, entities = None, []
+
+    try:
+        if entities:
+            ids = [doc_id(e["table"], e) for e in entities]
+            # 같은 종목 조합 조회는 카탈로그 generation 이 바뀌기 전까지 결과를 재사용
+            return cached_result("stock_lookup", {"ids": ids}, lambda: _lookup_entities(index, entities, ids))
+        return cached_result("stock_lookup", {"name": stock_name.lower()}, lambda: _lookup_by_name(stock_name))
+    except Exception as e:
+        return f"[Lookup Error] {e}"
 
+
+def _lookup_entities(index, entities: List[dict], ids: List[str]) -> str:
+    """확정된 종목은 검색 없이 id 로 바로 읽는다 (local: 컬럼 스냅샷, opensearch: mget)."""
+    if SCREENER_BACKEND == "local":
+        sources = [index.source(e) for e in entities]
+    else:
+        res = _get_os_client().mget(index=INDEX, body={"ids": ids}, **search_params())
+        sources = [d.get("_source") for d in res.get("docs", []) if d.get("found")]
+    lines = [_format_stock(src, src.get("table")) for src in sources if src]
+    if not lines:
+        return f"'{entities[0]['name']}'에 대한 정보를 찾을 수 없습니다."
+    return "\n".join(lines)
+
+
+def _lookup_by_name(stock_name: str) -> str:
     client = _get_os_client()
     body = {
         "size": 1,
@@ -45,34 +88,32 @@ def run_specific_stock_lookup(query: str) -> str:
         }
     }
 
-    try:
-        res = client.search(index=INDEX, body=body)
-        hits = res.get("hits", {}).get("hits", [])
-        if not hits:
-            return f"'{stock_name}'에 대한 정보를 찾을 수 없습니다."
-
-        source = hits[0].get("_source", {})
-
-        # 국내 주식/해외 주식 구분하여 정보 포맷팅
-        if source.get("table") == "krx_stock_info":
-            name = source.get("bstp_kor_isnm")
-            price = source.get("stck_prpr")
-            pbr = source.get("pbr")
-            per = source.get("per")
-            eps = source.get("eps")
-            return f"{name}의 정보는 다음과 같습니다: 현재가 {price}원, PBR {pbr}, PER {per}, EPS {eps}"
-        elif source.get("table") == "nasdaq_stock_info":
-            name = source.get("prdt_abrv_name")
-            price = source.get("last")
-            pbr = source.get("pbrx")
-            per = source.get("perx")
-            epsx = source.get("epsx")
-            return f"{name}의 정보는 다음과 같습니다: 현재가 {price}달러, PBR {pbr}, PER {per}, EPS {epsx}"
-        else:
-            return f"'{stock_name}'에 대한 정보를 찾았지만, 주식 정보가 아닙니다."
+    res = client.search(index=INDEX, body=body, **search_params())
+    hits = res.get("hits", {}).get("hits", [])
+    if not hits:
+        return f"'{stock_name}'에 대한 정보를 찾을 수 없습니다."
 
-    except Exception as e:
-        return f"[Lookup Error] {e}"
+    source = hits[0].get("_source", {})
+    if source.get("table") not in STOCK_TABLES:
+        return f"'{stock_name}'에 대한 정보를 찾았지만, 주식 정보가 아닙니다."
+    return _format_stock(source, source.get("table"))
+
+
+def _format_stock(source: dict, table: str) -> str:
+    # 국내 주식/해외 주식 구분하여 정보 포맷팅
+    if table == "krx_stock_info":
+        name = source.get("prdt_abrv_name") or source.get("bstp_kor_isnm")
+        price = source.get("stck_prpr")
+        pbr = source.get("pbr")
+        per = source.get("per")
+        eps = source.get("eps")
+        return f"{name}의 정보는 다음과 같습니다: 현재가 {price}원, PBR {pbr}, PER {per}, EPS {eps}"
+    name = source.get("prdt_abrv_name")
+    price = source.get("last")
+    pbr = source.get("pbrx")
+    per = source.get("perx")
+    epsx = source.get("epsx")
+    return f"{name}의 정보는 다음과 같습니다: 현재가 {price}달러, PBR {pbr}, PER {per}, EPS {epsx}"
 
 
 def create_stock_lookup_tool():
@@ -81,7 +122,8 @@ def create_stock_lookup_tool():
         func=run_specific_stock_lookup,
         description="""
         # 사용해야 할 때:
-        - 사용자가 '삼성전자'나 '애플'처럼 **특정 회사 이름 하나**를 언급하며 '현재가', '주가', 'PBR', '정보' 등을 물어볼 때 사용합니다.
+        - 사용자가 '삼성전자'나 '애플'처럼 **특정 회사 이름(또는 티커/종목코드)**을 언급하며 '현재가', '주가', 'PBR', '정보' 등을 물어볼 때 사용합니다.
+        - 질문에 여러 종목이 나오면(최대 3개) 한 번에 모두 조회합니다.
 
         # 사용하면 안 될 때:
         - 'PBR 낮은 주식'처럼 여러 종목을 찾아달라는 요청에는 사용하지 마세요.
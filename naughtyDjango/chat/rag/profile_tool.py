@@ -1,15 +1,22 @@
 # chat/rag/profile_tool.py
 
+from typing import Optional
+
 from langchain.tools import Tool
 from chat.gpt.session_store import get_session_data
 from chat.constants.fields import QUESTION_KO
+from chat.rag.session_context import current_session_id
 
 
-def get_profile_summary(query: str, session_id: str) -> str:
+def get_profile_summary(query: str, session_id: Optional[str] = None) -> str:
     """
     현재 세션에 저장된 사용자 프로필 정보를 요약하여 반환합니다.
     query 인자는 Tool 표준을 위해 받지만 사용하지 않습니다.
+    session_id 가 없으면 호출 시점의 세션 컨텍스트(bind_session)를 사용합니다.
     """
+    session_id = session_id or current_session_id()
+    if not session_id:
+        return "아직 수집된 사용자 정보가 없습니다."
     profile_data = get_session_data(session_id)
     if not profile_data:
         return "아직 수집된 사용자 정보가 없습니다."
@@ -23,13 +30,19 @@ def get_profile_summary(query: str, session_id: str) -> str:
     return "\n".join(summary_lines)
 
 
-def create_profile_summary_tool(session_id: str) -> Tool:
-    """세션 ID를 컨텍스트로 가지는 프로필 요약 Tool을 생성합니다."""
-
-    # partial을 사용해 session_id를 함수에 미리 바인딩합니다.
-    from functools import partial
+def create_profile_summary_tool(session_id: Optional[str] = None) -> Tool:
+    """
+    프로필 요약 Tool을 생성합니다.
+    session_id 를 주면 그 세션에 고정하고, 없으면 호출 시점의 세션 컨텍스트를 읽습니다
+    (에이전트와 함께 프로세스당 한 번만 만들어 재사용).
+    """
+    if session_id:
+        # partial을 사용해 session_id를 함수에 미리 바인딩합니다.
+        from functools import partial
 
-    func = partial(get_profile_summary, session_id=session_id)
+        func = partial(get_profile_summary, session_id=session_id)
+    else:
+        func = get_profile_summary
 
     return Tool(
         name="User Profile Summary",
@@ -0,0 +1,100 @@
+# chat/rag/result_cache.py
+"""
+스크리너/종목 조회 도구 결과 캐시.
+
+에이전트는 같은 도구를 같은 입력으로 여러 번(여러 사용자에 걸쳐) 부르므로
+정규화된 실행 plan 기준으로 최종 응답 문자열을 캐시한다.
+
+- 키: 도구명 + 카탈로그 generation + plan(JSON 정규화)의 SHA-256
+  → 재색인으로 alias 가 바뀌면(generation 증가) 이전 항목은 자연히 쓰이지 않는다
+- L1: 프로세스 내 LRU (TTL), L2: Redis(django cache, TTL) — Celery 워커는 작업마다 새 프로세스라 L2 가 주력
+- 도구별 hit/miss 카운터는 Redis 에 누적해 모든 워커의 합계를 조회한다
+- 예외는 캐시하지 않는다 (compute 가 던진 예외는 그대로 전파)
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable
+
+from django.core.cache import cache
+
+from chat.catalog import catalog_generation
+from chat.lru import LRUCache
+from chat.stats import incr_counter
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_PREFIX = "tool:result:v1"
+RESULT_STATS_PREFIX = "tool:result:stats"
+RESULT_CACHE_TTL = int(os.getenv("TOOL_RESULT_CACHE_TTL", 600))
+RESULT_CACHE_L1_SIZE = int(os.getenv("TOOL_RESULT_CACHE_L1_SIZE", 512))
+RESULT_CACHE_L1_TTL = float(os.getenv("TOOL_RESULT_CACHE_L1_TTL", 60))
+
+CACHED_TOOLS = ("stock_screener", "stock_lookup")
+
+_l1 = LRUCache(RESULT_CACHE_L1_SIZE, RESULT_CACHE_L1_TTL)
+
+
+def result_cache_key(tool: str, plan: Any, generation: int) -> str:
+    canonical = json.dumps(plan, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return f"{RESULT_CACHE_PREFIX}:{tool}:g{generation}:{digest}"
+
+
+def _bump(tool: str, name: str) -> None:
+    incr_counter(f"{RESULT_STATS_PREFIX}:{tool}:{name}")
+
+
+def cached_result(tool: str, plan: Any, compute: Callable[[], str], ttl: int = RESULT_CACHE_TTL) -> str:
+    """plan 이 같고 카탈로그 generation 이 같으면 compute() 결과를 재사용한다."""
+    key = result_cache_key(tool, plan, catalog_generation())
+
+    value = _l1.get(key)
+    if value is not None:
+        _bump(tool, "l1_hits")
+        return value
+    try:
+        value = cache.get(key)
+    except Exception as e:
+        logger.warning(f"tool result cache get failed: {e}")
+        value = None
+    if value is not None:
+        _l1.set(key, value)
+        _bump(tool, "l2_hits")
+        return value
+
+    _bump(tool, "misses")
+    value = compute()
+    _l1.set(key, value)
+    try:
+        cache.set(key, value, ttl)
+    except Exception as e:
+        logger.warning(f"tool result cache set failed: {e}")
+    return value
+
+
+def result_cache_stats(tools: Iterable[str] = CACHED_TOOLS) -> Dict[str, dict]:
+    """도구별 전체 워커 누적 L1/L2 적중·미스와 적중률."""
+    stats = {}
+    for tool in tools:
+        counts = {
+            name: cache.get(f"{RESULT_STATS_PREFIX}:{tool}:{name}") or 0
+            for name in ("l1_hits", "l2_hits", "misses")
+        }
+        hits = counts["l1_hits"] + counts["l2_hits"]
+        total = hits + counts["misses"]
+        counts["hit_rate"] = round(hits / total, 4) if total else 0.0
+        stats[tool] = counts
+    stats["l1_size"] = len(_l1)
+    return stats
+
+
+def reset_result_cache_stats(tools: Iterable[str] = CACHED_TOOLS) -> None:
+    cache.delete_many([
+        f"{RESULT_STATS_PREFIX}:{tool}:{name}" for tool in tools for name in ("l1_hits", "l2_hits", "misses")
+    ])
+
+
+def clear_local_result_cache() -> None:
+    _l1.clear()
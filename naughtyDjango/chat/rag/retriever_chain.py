@@ -7,7 +7,6 @@ import re
 from typing import Optional
 
 from dotenv import load_dotenv
-from openai import OpenAI
 
 from langchain.chains.query_constructor.base import AttributeInfo
 from langchain.retrievers.self_query.base import SelfQueryRetriever
@@ -16,8 +15,13 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import OpenSearchVectorSearch
 from langchain.tools import Tool
 
+from chat.gpt.openai_client import budgeted_openai_client
+from chat.stream_events import stream_chat_completion
+from chat.deadline import DeadlineExceeded, DEADLINE_FALLBACK_MESSAGE, check as check_deadline
+from chat.embedding_cache import embed_query
 from chat.opensearch_client import search_financial_products
 from chat.opensearch_client import OPENSEARCH_CLIENT as os_client
+from chat.catalog import CATALOG_ALIAS
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -124,12 +128,20 @@ SCHEMA_DEFS = {
     },
 }
 
+# --------------------------------------------------------------------
+# Embeddings: 질의 임베딩은 검색 경로와 같은 캐시(chat.embedding_cache)를 사용
+# --------------------------------------------------------------------
+class CachedOpenAIEmbeddings(OpenAIEmbeddings):
+    def embed_query(self, text: str) -> list:
+        return embed_query(text, model=self.model)
+
+
 # --------------------------------------------------------------------
 # Eager init (safe): try once at import; if it fails, lazy init will retry
 # --------------------------------------------------------------------
 try:
     _llm = LangChainOpenAI(temperature=0, openai_api_key=os.getenv("OPENAI_API_KEY"))
-    _embeddings = OpenAIEmbeddings(
+    _embeddings = CachedOpenAIEmbeddings(
         openai_api_key=os.getenv("OPENAI_API_KEY"),
         model="text-embedding-3-small",  # ✅ 인덱싱과 동일 모델로 통일
     )
@@ -137,7 +149,7 @@ try:
     ENVIRONMENT = os.getenv("ENVIRONMENT", "production")
     if ENVIRONMENT == "local":
         _vectorstore = OpenSearchVectorSearch(
-            index_name=os.getenv("OPENSEARCH_INDEX", "financial-products"),
+            index_name=CATALOG_ALIAS,
             embedding_function=_embeddings,
             opensearch_url="https://localhost:9200",
             http_auth=(os.getenv("OPENSEARCH_USER"), os.getenv("OPENSEARCH_PASS")),
@@ -149,7 +161,7 @@ try:
         )
     else:
         _vectorstore = OpenSearchVectorSearch(
-            index_name=os.getenv("OPENSEARCH_INDEX", "financial-products"),
+            index_name=CATALOG_ALIAS,
             embedding_function=_embeddings,
             opensearch_client=os_client,
             vector_field="embedding",
@@ -180,7 +192,7 @@ def _ensure_retriever():
         return
     try:
         llm = LangChainOpenAI(temperature=0, openai_api_key=os.getenv("OPENAI_API_KEY"))
-        embeddings = OpenAIEmbeddings(
+        embeddings = CachedOpenAIEmbeddings(
             openai_api_key=os.getenv("OPENAI_API_KEY"),
             model="text-embedding-3-small",
         )
@@ -188,7 +200,7 @@ def _ensure_retriever():
         env = os.getenv("ENVIRONMENT", "production")
         if env == "local":
             vectorstore = OpenSearchVectorSearch(
-                index_name=os.getenv("OPENSEARCH_INDEX", "financial-products"),
+                index_name=CATALOG_ALIAS,
                 embedding_function=embeddings,
                 opensearch_url="https://localhost:9200",
                 http_auth=(os.getenv("OPENSEARCH_USER"), os.getenv("OPENSEARCH_PASS")),
@@ -200,7 +212,7 @@ def _ensure_retriever():
             )
         else:
             vectorstore = OpenSearchVectorSearch(
-                index_name=os.getenv("OPENSEARCH_INDEX", "financial-products"),
+                index_name=CATALOG_ALIAS,
                 embedding_function=embeddings,
                 opensearch_client=os_client,
                 vector_field="embedding",
@@ -236,13 +248,19 @@ def run_rag_chain(query: str) -> str:
         # Fast path for explicit product type queries
         if pt in {"예금", "적금", "연금", "국내주식", "해외주식", "주식"}:
             target_types = ["국내주식", "해외주식"] if pt == "주식" else [pt]
+            # 임베딩 1회 + _msearch 1회로 유형별 결과를 한 번에 가져옴
+            hits_by_type = search_financial_products(query=query, top_k=5, product_type=target_types) or {}
             hits = []
             for t in target_types:
-                _hits = search_financial_products(query=query, top_k=5, product_type=t) or []
-                for h in _hits:
+                for h in hits_by_type.get(t, []):
                     h.setdefault("product_type", t)
-                hits.extend(_hits)
+                    hits.append(h)
             if hits:
+                try:
+                    llm_client = budgeted_openai_client("llm")
+                except DeadlineExceeded:
+                    # 요약 LLM 을 부를 시간이 없으면 검색 결과를 그대로 보여준다
+                    return _plain_answer((h.get("product_type") or h.get("type"), h.get("text")) for h in hits)
                 context = json.dumps(hits, ensure_ascii=False, indent=2)
                 prompt = f"""당신은 금융상담사입니다.
 아래 검색 결과를 바탕으로 사용자의 질문에 답하세요.
@@ -253,15 +271,17 @@ def run_rag_chain(query: str) -> str:
 {context}
 [사용자질문]
 {query}"""
-                chat = OpenAI(api_key=os.getenv("OPENAI_API_KEY")).chat.completions.create(
+                # 작업 스트림이 묶여 있으면 토큰 단위로 SSE 에 흘려보낸다
+                return stream_chat_completion(
+                    llm_client,
                     model="gpt-3.5-turbo",
                     temperature=0.2,
                     max_tokens=1200,
                     messages=[{"role": "user", "content": prompt}],
                 )
-                return chat.choices[0].message.content
 
-        # Self-query retriever path
+        # Self-query retriever path (질의 구성 LLM + 검색)
+        check_deadline("llm")
         retrieved_docs = SELF_QUERY_RETRIEVER.invoke(query)
         if not retrieved_docs:
             return "죄송하지만, 문의하신 조건에 맞는 정보를 찾을 수 없었습니다."
@@ -290,6 +310,11 @@ def run_rag_chain(query: str) -> str:
 [질문]
 {question}
 """
+        try:
+            llm_client = budgeted_openai_client("llm")
+        except DeadlineExceeded:
+            return _plain_answer((d.metadata.get("product_type"), d.page_content) for d in retrieved_docs)
+
         context_str = json.dumps(payload, ensure_ascii=False, indent=2)
         final_prompt = RAG_PROMPT_TEMPLATE.format(
             schema_explanation=schema_explanation,
@@ -297,14 +322,17 @@ def run_rag_chain(query: str) -> str:
             question=query,
         )
 
-        chat = OpenAI(api_key=os.getenv("OPENAI_API_KEY")).chat.completions.create(
+        return stream_chat_completion(
+            llm_client,
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": final_prompt}],
             temperature=0.2,
             max_tokens=2000,
         )
-        return chat.choices[0].message.content
 
+    except DeadlineExceeded as e:
+        logger.warning(f"run_rag_chain deadline: {e}")
+        return DEADLINE_FALLBACK_MESSAGE
     except Exception as e:
         logger.error(f"❗ run_rag_chain error: {e}")
         return "죄송합니다, 질문을 처리하는 중 오류가 발생했습니다. 더 간단한 질문으로 다시 시도해주세요."
@@ -335,6 +363,14 @@ def create_self_query_rag_tool():
 # --------------------------------------------------------------------
 # Helpers
 # --------------------------------------------------------------------
+def _plain_answer(items, limit: int = 5) -> str:
+    """LLM 요약 없이 검색 결과 텍스트를 그대로 나열 (마감 임박 시 대체 응답)."""
+    lines = ["시간 관계상 검색된 상품을 요약 없이 보여드릴게요:"]
+    for product_type, text in list(items)[:limit]:
+        text = " ".join((text or "").split())
+        lines.append(f"- [{product_type or '상품'}] {text[:200]}")
+    return "\n".join(lines)
+
 def _detect_product_type_ko(query: str) -> Optional[str]:
     q = query.lower()
     if "연금" in q:
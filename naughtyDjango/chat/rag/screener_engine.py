@@ -0,0 +1,251 @@
+# chat/rag/screener_engine.py
+"""
+인메모리 컬럼형 스크리너.
+
+스크리너 대상은 krx_stock_info / nasdaq_stock_info (+ 수익률 조건용 annuity) 테이블의
+숫자 컬럼 몇 개뿐이라 프로세스마다 시장(product_type)별로 컬럼 배열(NumPy)을 들고 있으면
+OpenSearch 왕복 없이 필터(벡터화 마스크) + 다중 키 정렬(argpartition → lexsort)로 끝난다.
+
+- 필터/정렬은 screener_plan 이 만드는 OpenSearch 스펙(term/range, {field: {"order"}})을 그대로 해석
+- 결과는 OpenSearch 검색 응답과 같은 {"hits": {"hits": [{"_source": ...}]}} 형태
+- 스냅샷은 MySQL 원본에서 읽고, 카탈로그 generation 이 바뀌면(= 재색인 alias 교체) 다시 읽는다
+- 해석할 수 없는 절이 오면 ValueError → 호출 측이 OpenSearch 로 넘긴다
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pymysql
+
+from chat.catalog import catalog_generation
+from chat.indexing.documents import coerce_numeric_fields
+from chat.indexing.factors import FACTOR_COLUMNS, MarketFactors
+from chat.indexing.pipeline import db_config
+
+logger = logging.getLogger(__name__)
+
+# generation 확인 주기(초) — 매 호출마다 Redis 를 보지 않도록
+SCREENER_GENERATION_CHECK = float(os.getenv("SCREENER_GENERATION_CHECK", 5))
+# 스냅샷 적재 실패 후 재시도까지 대기(초) — 그동안은 바로 OpenSearch 로 넘긴다
+SCREENER_RETRY_AFTER = float(os.getenv("SCREENER_RETRY_AFTER", 60))
+
+# 테이블 → (product_type, 숫자 컬럼, 문자열 컬럼)
+SCREENER_COLUMNS = {
+    "krx_stock_info": (
+        "국내주식",
+        ["per", "pbr", "eps", "stck_prpr"],
+        ["bstp_kor_isnm", "prdt_abrv_name", "stck_shrn_iscd"],
+    ),
+    "nasdaq_stock_info": (
+        "해외주식",
+        ["perx", "pbrx", "epsx", "last"],
+        ["prdt_abrv_name", "code", "e_icod"],
+    ),
+    "annuity": (
+        "연금",
+        ["avg_prft_rate", "btrm_prft_rate1", "guar_rate"],
+        ["fin_prdt_nm", "kor_co_nm"],
+    ),
+}
+
+_RANGE_OPS = {"gt": np.greater, "gte": np.greater_equal, "lt": np.less, "lte": np.less_equal}
+
+
+def _to_float(value) -> float:
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        value = value.replace(",", "").strip()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class MarketColumns:
+    """한 시장(테이블)의 컬럼 배열. 숫자는 float64(결측 NaN), 문자열은 object 배열."""
+
+    def __init__(self, table: str, product_type: str, rows: List[dict],
+                 numeric: List[str], text: List[str]):
+        self.table = table
+        self.product_type = product_type
+        self.size = len(rows)
+        self.ids = np.array([r.get("id") for r in rows], dtype=np.int64)
+        self.numeric = {c: np.array([_to_float(r.get(c)) for r in rows], dtype=np.float64) for c in numeric}
+        self.text = {c: np.array([r.get(c) for r in rows], dtype=object) for c in text}
+
+    def column(self, field: str) -> np.ndarray:
+        """숫자 컬럼. 이 시장에 없는 필드는 전부 결측 (OpenSearch 에서 필드가 없는 문서와 동일)."""
+        col = self.numeric.get(field)
+        return col if col is not None else np.full(self.size, np.nan)
+
+    def source(self, i: int, fields: Optional[List[str]]) -> dict:
+        doc = {"product_type": self.product_type, "table": self.table}
+        for name, col in self.numeric.items():
+            if not np.isnan(col[i]):
+                doc[name] = float(col[i])
+        for name, col in self.text.items():
+            if col[i] is not None:
+                doc[name] = col[i]
+        if fields:
+            doc = {k: v for k, v in doc.items() if k in fields}
+        return doc
+
+
+def load_snapshot() -> Dict[str, MarketColumns]:
+    """MySQL 에서 스크리너 대상 테이블을 읽어 {product_type: MarketColumns} 를 만든다."""
+    markets = {}
+    conn = pymysql.connect(**db_config(streaming=False))
+    try:
+        with conn.cursor() as cur:
+            for tbl, (product_type, numeric, text) in SCREENER_COLUMNS.items():
+                cols = ", ".join(f"`{c}`" for c in ["id", *numeric, *text])
+                cur.execute(f"SELECT {cols} FROM {tbl} ORDER BY id")
+                # 색인과 같은 규칙으로 숫자 변환 (쉼표 제거, 변환 불가 → 결측)
+                rows = [coerce_numeric_fields(r) for r in cur.fetchall()]
+                market = MarketColumns(tbl, product_type, rows, numeric, text)
+                if tbl in FACTOR_COLUMNS:
+                    # 색인 문서와 같은 팩터 필드(백분위/z-score/종합 점수)를 컬럼으로 추가
+                    base = {col: market.numeric[col] for col in FACTOR_COLUMNS[tbl].values()}
+                    market.numeric.update(MarketFactors(tbl, rows).annotate_columns(base))
+                markets[product_type] = market
+    finally:
+        conn.close()
+    return markets
+
+
+class ColumnarScreener:
+    """프로세스 단일 스냅샷 + generation 기반 재적재."""
+
+    def __init__(self, loader=load_snapshot):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._markets: Optional[Dict[str, MarketColumns]] = None
+        self._generation = None
+        self._checked_at = 0.0
+        self._failed_at = 0.0
+
+    def markets(self) -> Dict[str, MarketColumns]:
+        """현재 스냅샷 (generation 이 바뀌었으면 다시 읽는다). 교체 시 새 dict 객체가 된다."""
+        now = time.monotonic()
+        if self._markets is not None and now - self._checked_at < SCREENER_GENERATION_CHECK:
+            return self._markets
+        if self._markets is None and self._failed_at and now - self._failed_at < SCREENER_RETRY_AFTER:
+            raise RuntimeError("columnar snapshot unavailable (recent load failure)")
+
+        generation = catalog_generation()
+        if self._markets is not None and generation == self._generation:
+            self._checked_at = now
+            return self._markets
+
+        with self._lock:
+            if self._markets is not None and generation == self._generation:
+                return self._markets
+            started = time.perf_counter()
+            try:
+                markets = self._loader()
+            except Exception:
+                self._failed_at = now
+                if self._markets is None:
+                    raise
+                # 재적재 실패 시에는 이전 스냅샷으로 계속 응답
+                logger.exception("columnar snapshot reload failed, keeping previous snapshot")
+                self._checked_at = now
+                return self._markets
+            self._markets, self._generation, self._checked_at = markets, generation, now
+            logger.info(
+                f"columnar screener snapshot loaded: generation={generation}, "
+                f"rows={ {k: m.size for k, m in markets.items()} }, {time.perf_counter() - started:.2f}s"
+            )
+            return markets
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def search(self, filters: List[dict], sorts: List[dict], fields: Optional[List[str]], top_n: int) -> dict:
+        markets = self.markets()
+
+        market, clauses = None, []
+        for clause in filters:
+            term = clause.get("term") if len(clause) == 1 else None
+            if term and list(term.keys()) == ["product_type"]:
+                market = markets.get(term["product_type"])
+                if market is None:
+                    return {"hits": {"hits": []}}
+            else:
+                clauses.append(clause)
+        if market is None:
+            raise ValueError("columnar screener needs a product_type term filter")
+
+        idx = np.nonzero(_filter_mask(market, clauses))[0]
+        idx = _top_n(market, idx, sorts, top_n)
+        return {"hits": {"hits": [{"_source": market.source(i, fields)} for i in idx]}}
+
+
+def _filter_mask(market: MarketColumns, clauses: List[dict]) -> np.ndarray:
+    mask = np.ones(market.size, dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for clause in clauses:
+            if len(clause) != 1:
+                raise ValueError(f"unsupported filter clause: {clause}")
+            kind, spec = next(iter(clause.items()))
+            if kind == "range":
+                for field, bounds in spec.items():
+                    col = market.column(field)
+                    for op, value in bounds.items():
+                        if op not in _RANGE_OPS:
+                            raise ValueError(f"unsupported range operator: {op}")
+                        # NaN 비교는 False → 결측 문서는 range 에 걸리지 않음 (OpenSearch 와 동일)
+                        mask &= _RANGE_OPS[op](col, float(value))
+            elif kind == "term":
+                for field, value in spec.items():
+                    if field == "table":
+                        mask &= market.table == value
+                    elif field in market.text:
+                        mask &= market.text[field] == value
+                    else:
+                        mask &= market.column(field) == _to_float(value)
+            else:
+                raise ValueError(f"unsupported filter clause: {clause}")
+    return mask
+
+
+def _sort_keys(market: MarketColumns, idx: np.ndarray, sorts: List[dict]) -> List[np.ndarray]:
+    """정렬 키 목록 (우선순위 순, 오름차순 기준). 결측은 asc/desc 모두 맨 뒤 (OpenSearch missing=_last)."""
+    keys = []
+    for spec in sorts:
+        if isinstance(spec, str):
+            field, order = spec, "asc"
+        else:
+            field, opts = next(iter(spec.items()))
+            order = opts.get("order", "asc") if isinstance(opts, dict) else opts
+        values = market.column(field)[idx]
+        if order == "desc":
+            values = -values
+        keys.append(np.where(np.isnan(values), np.inf, values))
+    return keys
+
+
+def _top_n(market: MarketColumns, idx: np.ndarray, sorts: List[dict], top_n: int) -> np.ndarray:
+    if not len(idx) or top_n <= 0:
+        return idx[:0]
+    if not sorts:
+        return idx[:top_n]
+
+    keys = _sort_keys(market, idx, sorts)
+    if len(idx) > top_n:
+        # 1순위 키로 argpartition 해 후보를 줄인 뒤 (동점 포함) 나머지 키로 정렬
+        kth = keys[0][np.argpartition(keys[0], top_n - 1)[top_n - 1]]
+        keep = keys[0] <= kth
+        idx, keys = idx[keep], [k[keep] for k in keys]
+    # lexsort 는 마지막 키가 1순위, 안정 정렬이라 동점은 PK 순서
+    order = np.lexsort(keys[::-1])
+    return idx[order[:top_n]]
+
+
+# 프로세스 단일 인스턴스
+COLUMNAR_SCREENER = ColumnarScreener()
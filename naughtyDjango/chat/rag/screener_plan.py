@@ -0,0 +1,427 @@
+# chat/rag/screener_plan.py
+"""
+스크리너 질의 → 필터/정렬 plan 컴파일러 (LLM 없이 결정적으로).
+
+"PER 10 이하, EPS 1000 이상, PBR 0.5~1 국내 10개" 같은 숫자 조건을
+OpenSearch bool.filter / sort 스펙으로 바꾼다. plan 은 OpenSearch 와
+인메모리 컬럼 엔진(chat.rag.screener_engine) 양쪽에서 그대로 실행된다.
+
+- 인식 컬럼: PER / PBR / EPS / 현재가 (국내·해외 주식), 수익률 / 전년도 수익률 / 보증이율 (연금)
+- 인식 조건: 이하·이내·까지 / 미만 / 이상 / 초과·넘는 / ~ 범위 / 비교기호 / 양수·음수 / 흑자·적자(EPS)
+- 인식 정렬: "낮은 순", "높은 순", "가장 낮은 PBR", "저PER", 오름차순/내림차순
+- 숫자 조건이 없으면 기존 프리셋(장기·안정 / 가치 / 성장 / 기본)을 그대로 쓴다
+  조건이 하나라도 있으면 프리셋 범위/정렬은 걸지 않는다 (키워드는 종합 점수 가중치에만 쓴다)
+- 같은 질의는 정규화(NFKC·공백·소문자) 후 LRU 에 캐시된 plan 을 재사용한다
+- 종합 점수 모드(기본): 명시 정렬이 없는 주식 plan 은 색인 시점에 계산된 score_<profile> 하나로
+  정렬한다. 가중치 프로필은 프리셋(장기·안정/가치/성장) → 사용자 프로필(value_growth,
+  risk_acceptance_level) → balanced 순으로 정한다 (apply_score_profile)
+"""
+import copy
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from chat.embedding_cache import normalize_query
+from chat.indexing.factors import WEIGHT_PROFILES, score_field
+
+SCREENER_PLAN_CACHE_SIZE = int(os.getenv("SCREENER_PLAN_CACHE_SIZE", 1024))
+# 명시 정렬이 없을 때의 순위 방식: composite(종합 점수) | lexicographic(프리셋 정렬 그대로)
+SCREENER_RANKING = os.getenv("SCREENER_RANKING", "composite")
+
+STABLE_KEYWORDS = ["장기", "안정", "보수", "defensive", "바이앤홀드", "리스크 낮", "변동성 낮"]
+VALUE_KEYWORDS = ["가치", "저평가", "낮은 pbr", "value"]
+GROWTH_KEYWORDS = ["성장", "growth", "모멘텀"]
+COMPOSITE_KEYWORDS = ["종합", "점수", "스코어", "composite", "score", "균형"]
+
+# 논리 컬럼 → 시장별 실제 필드
+COLUMNS = {
+    "per": {"국내주식": "per", "해외주식": "perx"},
+    "pbr": {"국내주식": "pbr", "해외주식": "pbrx"},
+    "eps": {"국내주식": "eps", "해외주식": "epsx"},
+    "price": {"국내주식": "stck_prpr", "해외주식": "last"},
+    "return": {"연금": "avg_prft_rate"},
+    "prev_return": {"연금": "btrm_prft_rate1"},
+    "guar_rate": {"연금": "guar_rate"},
+}
+COLUMN_LABELS = {
+    "per": "PER", "pbr": "PBR", "eps": "EPS", "price": "현재가",
+    "return": "평균수익률", "prev_return": "전년도수익률", "guar_rate": "최저보증이율",
+}
+ANNUITY_COLUMNS = {"return", "prev_return", "guar_rate"}
+# 정렬 방향을 말하지 않았을 때 "좋은 쪽" 기준
+_NATURAL_ORDER = {"per": "asc", "pbr": "asc", "price": "asc",
+                  "eps": "desc", "return": "desc", "prev_return": "desc", "guar_rate": "desc"}
+
+# 같은 위치에서는 앞의 대안이 우선 (주가수익비율 → per, 그 다음에야 주가 → price)
+_LABEL_RE = re.compile(
+    r"(?P<per>주가\s*수익\s*비율|(?<![a-z])per(?![a-z]))"
+    r"|(?P<pbr>주가\s*순자산\s*비율|(?<![a-z])pbr(?![a-z]))"
+    r"|(?P<eps>주당\s*순이익|(?<![a-z])eps(?![a-z]))"
+    r"|(?P<prev_return>(?:전년도|작년|지난\s*해)\s*수익률)"
+    r"|(?P<return>(?:평균\s*)?수익률|(?<![a-z])returns?(?![a-z]))"
+    r"|(?P<guar_rate>(?:최저\s*)?보증\s*이율|guaranteed\s+rate)"
+    r"|(?P<price>현재가|주가|가격|(?<![a-z])price(?![a-z]))"
+)
+
+_NUM = r"(-?\$?\s*\d+(?:,\d{3})*(?:\.\d+)?)\s*(조|억|만|천|k|m|b)?\s*(?:%|배|원|달러|불)?"
+_UNITS = {"조": 1e12, "억": 1e8, "만": 1e4, "천": 1e3, "k": 1e3, "m": 1e6, "b": 1e9}
+
+_BETWEEN_RE = re.compile(_NUM + r"\s*(?:~|〜|–|-|에서|부터|to|and)\s*" + _NUM + r"\s*(?:까지|사이)?")
+_SYMBOL_RE = re.compile(r"(<=|>=|=<|=>|<|>)\s*" + _NUM)
+_SUFFIX_RE = re.compile(
+    _NUM + r"\s*(?P<op>이하|이내|까지|미만|이상|초과|넘는|넘게|넘|"
+           r"보다\s*(?:낮|작|적|싸)|보다\s*(?:높|크|큰|많|비싸))"
+)
+_PREFIX_RE = re.compile(
+    r"(?P<op>under|below|less\s+than|lower\s+than|at\s+most|max|over|above|more\s+than|"
+    r"greater\s+than|higher\s+than|at\s+least|min)\s*" + _NUM
+)
+_SIGN_RE = re.compile(r"양수|플러스|positive|음수|마이너스|negative")
+# 흑자/적자는 어느 라벨 뒤에 있든 EPS 부호 조건
+_PROFIT_RE = re.compile(r"흑자|적자")
+
+_ORDER_WORD = (r"(?:가장\s*)?(?P<w>낮은|작은|적은|싼|높은|큰|많은|비싼|오름차순|내림차순|"
+               r"lowest|low|cheapest|highest|high|largest|ascending|descending)")
+_ORDER_AFTER_RE = re.compile(r"\s*" + _ORDER_WORD)        # "PER 낮은 순"
+_ORDER_BEFORE_RE = re.compile(_ORDER_WORD + r"\s*$")      # "가장 낮은 PER"
+_ASC_WORDS = {"낮은", "작은", "적은", "싼", "오름차순", "lowest", "low", "cheapest", "ascending"}
+
+_SUFFIX_OPS = {
+    "이하": "lte", "이내": "lte", "까지": "lte", "미만": "lt",
+    "이상": "gte", "초과": "gt", "넘는": "gt", "넘게": "gt", "넘": "gt",
+}
+_PREFIX_OPS = {
+    "under": "lt", "below": "lt", "less than": "lt", "lower than": "lt", "at most": "lte", "max": "lte",
+    "over": "gt", "above": "gt", "more than": "gt", "greater than": "gt", "higher than": "gt",
+    "at least": "gte", "min": "gte",
+}
+_SYMBOL_OPS = {"<=": "lte", "=<": "lte", ">=": "gte", "=>": "gte", "<": "lt", ">": "gt"}
+
+
+# --- 유틸: 질의에서 시장/필드명 추론 (국내/해외에 따라 per/pbr 필드명이 다름) ---
+def _infer_market_and_fields(query: str) -> Dict[str, str]:
+    q = query.lower()
+    is_overseas = any(k in q for k in ["해외", "미국", "nasdaq", "us", "나스닥"])
+    if is_overseas:
+        return {
+            "product_type": "해외주식",
+            "pbr": "pbrx",
+            "per": "perx",
+            "eps": "epsx",
+            "name": "prdt_abrv_name",
+            "code": "code",
+            "extra_sector": "e_icod",
+        }
+    else:
+        return {
+            "product_type": "국내주식",
+            "pbr": "pbr",
+            "per": "per",
+            "eps": "eps",
+            # [수정] 두 가지 이름 필드를 모두 사용하도록 추가
+            "name": "bstp_kor_isnm",
+            "name_alt": "prdt_abrv_name",  # 종목 약식명 필드 추가
+            "code": "stck_shrn_iscd",
+            "extra_sector": None,
+        }
+
+
+# 연금 상품 표시용 필드 (스크리너 출력 형식만 다름)
+ANNUITY_FIELDS = {
+    "product_type": "연금",
+    "name": "fin_prdt_nm",
+    "code": "kor_co_nm",
+}
+
+
+# --- 유틸: Top N 추출 ---
+def _extract_topn(query: str, default_n: int = 5) -> int:
+    m = re.search(r"(상위|top)\s*(\d+)", query, flags=re.I)
+    if m:
+        return max(1, min(50, int(m.group(2))))  # 과도한 N 방지
+    m2 = re.search(r"(\d+)\s*개", query)
+    if m2:
+        return max(1, min(50, int(m2.group(1))))
+    return default_n
+
+
+def _preset_name(query: str) -> str:
+    q = query.lower()
+    if any(k in q for k in STABLE_KEYWORDS):
+        return "stable"
+    if any(k in q for k in VALUE_KEYWORDS):
+        return "value"
+    if any(k in q for k in GROWTH_KEYWORDS):
+        return "growth"
+    return "default"
+
+
+# --- 프리셋 규칙: 장기 안정/가치/성장 등 ---
+def _preset_from_query(query: str, fields: Dict[str, str]) -> Tuple[List[dict], List[dict]]:
+    """
+    반환: (filters, sorts)
+    - filters: OpenSearch bool.filter 배열 요소들
+    - sorts:   OpenSearch sort 스펙 배열
+    """
+    pbr_f, per_f, eps_f = fields["pbr"], fields["per"], fields["eps"]
+    preset = _preset_name(query)
+
+    # 1) 장기적으로 안정적인/보수적/배당/바이앤홀드 등 키워드
+    if preset == "stable":
+        filters = [
+            {"term": {"product_type": fields["product_type"]}},
+            {"range": {eps_f: {"gt": 0}}},                # 이익 양수
+            {"range": {pbr_f: {"gte": 0.5, "lte": 2.0}}}, # 과도하게 낮거나 높은 PBR 배제
+            {"range": {per_f: {"gte": 5, "lte": 20}}},    # 너무 낮은 PER(디스트레스)·너무 높은 PER(고성장) 배제
+        ]
+        sorts = [
+            {pbr_f: {"order": "asc"}},
+            {per_f: {"order": "asc"}},
+            {eps_f: {"order": "desc"}},
+        ]
+        return filters, sorts
+
+    # 2) 가치/저평가(PBR 낮은/1 미만 등)
+    if preset == "value":
+        filters = [
+            {"term": {"product_type": fields["product_type"]}},
+            {"range": {pbr_f: {"gte": 0, "lt": 1.0}}},
+            {"range": {eps_f: {"gt": 0}}},
+        ]
+        sorts = [
+            {pbr_f: {"order": "asc"}},
+            {per_f: {"order": "asc"}},
+            {eps_f: {"order": "desc"}},
+        ]
+        return filters, sorts
+
+    # 3) 성장주 선호 (PER 다소 높아도 수용)
+    if preset == "growth":
+        filters = [
+            {"term": {"product_type": fields["product_type"]}},
+            {"range": {eps_f: {"gt": 0}}},              # 실적 양수
+            {"range": {per_f: {"gte": 15, "lte": 40}}}, # 성장 프리미엄
+        ]
+        sorts = [
+            {per_f: {"order": "asc"}},  # 상대적으로 덜 비싼 성장
+            {pbr_f: {"order": "asc"}},
+            {eps_f: {"order": "desc"}},
+        ]
+        return filters, sorts
+
+    # 4) 기본값: 단순히 PBR 가장 낮은/정렬 요청
+    filters = [
+        {"term": {"product_type": fields["product_type"]}},
+        {"range": {pbr_f: {"gte": 0}}},
+    ]
+    sorts = [{pbr_f: {"order": "asc"}}, {per_f: {"order": "asc"}}]
+    return filters, sorts
+
+
+# --------------------------------------------------------------------
+# 숫자 조건 파서
+# --------------------------------------------------------------------
+def _number(raw: str, unit: Optional[str]) -> float:
+    value = float(raw.replace("$", "").replace(",", "").replace(" ", ""))
+    return value * _UNITS.get(unit or "", 1)
+
+
+def _parse_conditions(segment: str) -> Tuple[Dict[str, float], str]:
+    """
+    라벨 뒤 구간에서 조건을 뽑는다. ({op: value}, 조건을 지운 나머지 텍스트)
+    나머지 텍스트는 정렬 방향("낮은 순") 판별에 쓴다.
+    """
+    bounds: Dict[str, float] = {}
+
+    def take(m, ops):
+        nonlocal segment
+        for op, value in ops:
+            bounds[op] = value
+        segment = segment[:m.start()] + " " * (m.end() - m.start()) + segment[m.end():]
+
+    m = _BETWEEN_RE.search(segment)
+    if m:
+        lo, hi = _number(m.group(1), m.group(2)), _number(m.group(3), m.group(4))
+        take(m, [("gte", min(lo, hi)), ("lte", max(lo, hi))])
+    for m in list(_SYMBOL_RE.finditer(segment)):
+        take(m, [(_SYMBOL_OPS[m.group(1)], _number(m.group(2), m.group(3)))])
+    for m in list(_SUFFIX_RE.finditer(segment)):
+        op = m.group("op").replace(" ", "")
+        if op.startswith("보다"):
+            op = "lt" if op[2] in "낮작적싸" else "gt"
+        else:
+            op = _SUFFIX_OPS[op]
+        take(m, [(op, _number(m.group(1), m.group(2)))])
+    for m in list(_PREFIX_RE.finditer(segment)):
+        op = _PREFIX_OPS[re.sub(r"\s+", " ", m.group("op"))]
+        take(m, [(op, _number(m.group(2), m.group(3)))])
+    if not bounds:
+        m = _SIGN_RE.search(segment)
+        if m:
+            positive = m.group(0) in ("양수", "플러스", "positive")
+            take(m, [("gt" if positive else "lt", 0.0)])
+    return bounds, segment
+
+
+def _sort_order(m) -> Optional[str]:
+    if m is None:
+        return None
+    return "asc" if m.group("w") in _ASC_WORDS else "desc"
+
+
+def parse_conditions(query: str) -> Tuple[List[Tuple[str, str, float]], List[Tuple[str, str]]]:
+    """
+    질의 → (조건 [(논리 컬럼, op, 값)], 명시 정렬 [(논리 컬럼, asc|desc)]).
+    컬럼 라벨 사이 구간을 그 라벨의 조건으로 본다.
+    """
+    q = normalize_query(query).lower()
+    labels = [(m.lastgroup, m.start(), m.end()) for m in _LABEL_RE.finditer(q)]
+    conditions, sorts = [], []
+    consumed = False
+    for i, (column, start, end) in enumerate(labels):
+        stop = labels[i + 1][1] if i + 1 < len(labels) else len(q)
+        bounds, rest = _parse_conditions(q[end:stop])
+        for op, value in bounds.items():
+            conditions.append((column, op, value))
+
+        # 정렬: 라벨 바로 뒤 "낮은 순" → 라벨 바로 앞 "가장 낮은"/"저PER"
+        # (앞 라벨이 이미 가져간 정렬 단어는 다시 쓰지 않는다)
+        before = "" if consumed else q[labels[i - 1][2] if i else 0:start]
+        order = _sort_order(_ORDER_AFTER_RE.match(rest))
+        consumed = order is not None
+        if order is None:
+            order = _sort_order(_ORDER_BEFORE_RE.search(before))
+        if order is None and before.endswith(("저", "고")):
+            order = "asc" if before.endswith("저") else "desc"
+        if order and column not in (c for c, _ in sorts):
+            sorts.append((column, order))
+
+    m = _PROFIT_RE.search(q)
+    if m and not any(c == "eps" for c, _, _ in conditions):
+        conditions.append(("eps", "gt" if m.group(0) == "흑자" else "lt", 0.0))
+    return conditions, sorts
+
+
+# --------------------------------------------------------------------
+# plan
+# --------------------------------------------------------------------
+def _source_fields(fields: Dict[str, str], market: str) -> List[str]:
+    source = [fields.get("name"), fields.get("name_alt"), fields.get("code"), "product_type", "table"]
+    source += [cols[market] for cols in COLUMNS.values() if market in cols]
+    return [f for f in dict.fromkeys(source) if f]
+
+
+def _compile(q: str) -> dict:
+    conditions, explicit_sorts = parse_conditions(q)
+    columns = {c for c, _, _ in conditions} | {c for c, _ in explicit_sorts}
+
+    if columns & ANNUITY_COLUMNS and not columns & {"per", "pbr", "eps"}:
+        market, fields = "연금", dict(ANNUITY_FIELDS)
+    else:
+        fields = _infer_market_and_fields(q)
+        market = fields["product_type"]
+
+    # 이 시장에 없는 컬럼의 조건은 버린다 (예: 주식 질의의 보증이율)
+    conditions = [(c, op, v) for c, op, v in conditions if market in COLUMNS[c]]
+    explicit_sorts = [(c, o) for c, o in explicit_sorts if market in COLUMNS[c]]
+
+    keyword_preset = _preset_name(q)
+    if market == "연금":
+        filters, sorts = [{"term": {"product_type": market}}], [{"avg_prft_rate": {"order": "desc"}}]
+        preset = "custom"
+    elif conditions:
+        # 명시 조건이 있으면 프리셋 범위는 걸지 않는다 ("저평가 PER 10 이하" 에 PBR<1 이 붙지 않도록)
+        filters, sorts = [{"term": {"product_type": market}}], []
+        preset = "custom"
+    else:
+        filters, sorts = _preset_from_query(q, fields)
+        preset = keyword_preset
+
+    ranges: Dict[str, Dict[str, float]] = {}
+    for column, op, value in conditions:
+        ranges.setdefault(COLUMNS[column][market], {})[op] = value
+    filters += [{"range": {field: bounds}} for field, bounds in ranges.items()]
+
+    # 정렬: 명시 정렬 → (없으면) 첫 조건 컬럼의 자연 방향 → 프리셋 정렬
+    order = [(COLUMNS[c][market], o) for c, o in explicit_sorts]
+    if not order and conditions:
+        first = conditions[0][0]
+        order = [(COLUMNS[first][market], _NATURAL_ORDER[first])]
+    keys = {f for f, _ in order}
+    if market != "연금" and not sorts:
+        # 동점 정렬용 기본 키 (기본 프리셋과 같음)
+        sorts = [{fields["pbr"]: {"order": "asc"}}, {fields["per"]: {"order": "asc"}}]
+    sorts = [{f: {"order": o}} for f, o in order] + [s for s in sorts if next(iter(s)) not in keys]
+
+    ranking = "lexicographic"
+    if market != "연금" and not explicit_sorts and (
+            SCREENER_RANKING == "composite" or any(k in q for k in COMPOSITE_KEYWORDS)):
+        ranking = "composite"
+
+    return {
+        "market": market,
+        "preset": preset,
+        "ranking": ranking,
+        # 프리셋 키워드가 곧 가중치 프로필 (없으면 실행 시 사용자 프로필로 결정)
+        "score_profile": keyword_preset if market != "연금" and keyword_preset in WEIGHT_PROFILES else None,
+        "filters": filters,
+        "sorts": sorts,
+        "top_n": _extract_topn(q, default_n=5),
+        "fields": fields,
+        "source": _source_fields(fields, market),
+        "conditions": [[c, op, v] for c, op, v in conditions],
+    }
+
+
+@lru_cache(maxsize=SCREENER_PLAN_CACHE_SIZE)
+def _compile_cached(normalized: str) -> dict:
+    return _compile(normalized)
+
+
+def compile_plan(query: str) -> dict:
+    """질의 → plan dict (정규화 질의 기준 LRU 캐시, 호출자가 고쳐도 되도록 복사본 반환)."""
+    return copy.deepcopy(_compile_cached(normalize_query(query).lower()))
+
+
+def profile_weights(profile: Optional[dict]) -> str:
+    """사용자 프로필 → 가중치 프로필. 위험 수용 1~2 는 stable, 그 외에는 가치/성장 성향."""
+    profile = profile or {}
+    try:
+        risk = int(profile.get("risk_acceptance_level"))
+    except (TypeError, ValueError):
+        risk = None
+    if risk is not None and risk <= 2:
+        return "stable"
+    value_growth = str(profile.get("value_growth", "")).strip()
+    if value_growth in ("0", "가치"):
+        return "value"
+    if value_growth in ("1", "성장"):
+        return "growth"
+    return "balanced"
+
+
+def apply_score_profile(plan: dict, profile: Optional[dict] = None) -> dict:
+    """
+    종합 점수 모드 plan 에 정렬 키 score_<profile> desc 를 앞세운다 (기존 정렬은 동점 처리용).
+    unmapped_type 은 팩터 필드가 없는 이전 generation 인덱스에서도 정렬 오류가 나지 않게 한다.
+    """
+    if plan.get("ranking") != "composite":
+        return plan
+    name = plan.get("score_profile") or profile_weights(profile)
+    field = score_field(name)
+    plan["score_profile"] = name
+    plan["sorts"] = [{field: {"order": "desc", "unmapped_type": "float"}}] + [
+        s for s in plan["sorts"] if next(iter(s)) != field
+    ]
+    if field not in plan["source"]:
+        plan["source"].append(field)
+    return plan
+
+
+def describe_conditions(plan: dict) -> str:
+    """'PER ≤ 10, EPS ≥ 1000' 같은 사람이 읽는 조건 요약."""
+    symbols = {"lt": "<", "lte": "≤", "gt": ">", "gte": "≥"}
+    return ", ".join(
+        f"{COLUMN_LABELS[c]} {symbols[op]} {v:g}" for c, op, v in plan.get("conditions", [])
+    )
@@ -1,12 +1,26 @@
 # chat/rag/screener_tool.py
+import logging
 import os
-import re
-from typing import Dict, List, Tuple
+from functools import partial
+from typing import Dict, List, Optional
 from langchain.tools import Tool
-from chat.opensearch_client import OPENSEARCH_CLIENT as default_os_client
+from chat.opensearch_client import OPENSEARCH_CLIENT as default_os_client, search_params
 from opensearchpy import OpenSearch, exceptions as os_exceptions
+from chat.catalog import CATALOG_ALIAS
+from chat.rag.screener_engine import COLUMNAR_SCREENER
+from chat.rag.result_cache import cached_result
+from chat.gpt.session_store import get_session_data
+from chat.rag.session_context import current_session_id
+from chat.rag.screener_plan import compile_plan, describe_conditions, apply_score_profile
 
-INDEX = os.getenv("OPENSEARCH_INDEX", "financial-products")
+logger = logging.getLogger(__name__)
+
+# 항상 alias 로 읽는다 (재색인 중에는 이전 generation 인덱스를 계속 조회)
+INDEX = CATALOG_ALIAS
+
+# 스크리너 백엔드: local(기본, 인메모리 컬럼 스냅샷) | opensearch
+# local 이 처리할 수 없는 조건이거나 스냅샷을 못 읽으면 OpenSearch 로 넘긴다
+SCREENER_BACKEND = os.getenv("SCREENER_BACKEND", "local")
 
 def _get_os_client():
     env = os.getenv("ENVIRONMENT", "production")
@@ -20,109 +34,16 @@ def _get_os_client():
     # ✅ 서버(IAM 등)용 기본 클라이언트
     return default_os_client
 
-# --- 유틸: 질의에서 시장/필드명 추론 (국내/해외에 따라 per/pbr 필드명이 다름) ---
-def _infer_market_and_fields(query: str) -> Dict[str, str]:
-    q = query.lower()
-    is_overseas = any(k in q for k in ["해외", "미국", "nasdaq", "us", "나스닥"])
-    if is_overseas:
-        return {
-            "product_type": "해외주식",
-            "pbr": "pbrx",
-            "per": "perx",
-            "eps": "epsx",
-            "name": "prdt_abrv_name",
-            "code": "code",
-            "extra_sector": "e_icod",
-        }
-    else:
-        return {
-            "product_type": "국내주식",
-            "pbr": "pbr",
-            "per": "per",
-            "eps": "eps",
-            # [수정] 두 가지 이름 필드를 모두 사용하도록 추가
-            "name": "bstp_kor_isnm",
-            "name_alt": "prdt_abrv_name",  # 종목 약식명 필드 추가
-            "code": "stck_shrn_iscd",
-            "extra_sector": None,
-        }
-
-# --- 유틸: Top N 추출 ---
-def _extract_topn(query: str, default_n: int = 5) -> int:
-    m = re.search(r"(상위|top)\s*(\d+)", query, flags=re.I)
-    if m:
-        return max(1, min(50, int(m.group(2))))  # 과도한 N 방지
-    m2 = re.search(r"(\d+)\s*개", query)
-    if m2:
-        return max(1, min(50, int(m2.group(1))))
-    return default_n
-
-# --- 프리셋 규칙: 장기 안정/가치/성장 등 ---
-def _preset_from_query(query: str, fields: Dict[str, str]) -> Tuple[List[dict], List[dict]]:
-    """
-    반환: (filters, sorts)
-    - filters: OpenSearch bool.filter 배열 요소들
-    - sorts:   OpenSearch sort 스펙 배열
-    """
-    pbr_f, per_f, eps_f = fields["pbr"], fields["per"], fields["eps"]
-    q = query.lower()
-
-    # 1) 장기적으로 안정적인/보수적/배당/바이앤홀드 등 키워드
-    if any(k in q for k in ["장기", "안정", "보수", "defensive", "바이앤홀드", "리스크 낮", "변동성 낮"]):
-        filters = [
-            {"term": {"product_type": fields["product_type"]}},
-            {"range": {eps_f: {"gt": 0}}},                # 이익 양수
-            {"range": {pbr_f: {"gte": 0.5, "lte": 2.0}}}, # 과도하게 낮거나 높은 PBR 배제
-            {"range": {per_f: {"gte": 5, "lte": 20}}},    # 너무 낮은 PER(디스트레스)·너무 높은 PER(고성장) 배제
-        ]
-        sorts = [
-            {pbr_f: {"order": "asc"}},
-            {per_f: {"order": "asc"}},
-            {eps_f: {"order": "desc"}},
-        ]
-        return filters, sorts
-
-    # 2) 가치/저평가(PBR 낮은/1 미만 등)
-    if any(k in q for k in ["가치", "저평가", "pbr 1", "낮은 pbr", "value"]):
-        filters = [
-            {"term": {"product_type": fields["product_type"]}},
-            {"range": {pbr_f: {"gte": 0, "lt": 1.0}}},
-            {"range": {eps_f: {"gt": 0}}},
-        ]
-        sorts = [
-            {pbr_f: {"order": "asc"}},
-            {per_f: {"order": "asc"}},
-            {eps_f: {"order": "desc"}},
-        ]
-        return filters, sorts
-
-    # 3) 성장주 선호 (PER 다소 높아도 수용)
-    if any(k in q for k in ["성장", "growth", "모멘텀"]):
-        filters = [
-            {"term": {"product_type": fields["product_type"]}},
-            {"range": {eps_f: {"gt": 0}}},              # 실적 양수
-            {"range": {per_f: {"gte": 15, "lte": 40}}}, # 성장 프리미엄
-        ]
-        sorts = [
-            {per_f: {"order": "asc"}},  # 상대적으로 덜 비싼 성장
-            {pbr_f: {"order": "asc"}},
-            {eps_f: {"order": "desc"}},
-        ]
-        return filters, sorts
-
-    # 4) 기본값: 단순히 PBR 가장 낮은/정렬 요청
-    filters = [
-        {"term": {"product_type": fields["product_type"]}},
-        {"range": {pbr_f: {"gte": 0}}},
-    ]
-    sorts = [{pbr_f: {"order": "asc"}}, {per_f: {"order": "asc"}}]
-    return filters, sorts
-
-
-def _search_with_filters(filters: List[dict], sorts: List[dict], fields: Dict[str, str], top_n: int):
-    _source = [fields["name"], fields.get("name_alt"), fields["code"], fields["pbr"], fields["per"], fields["eps"],
-               "product_type", "table"]
+def _search_with_filters(filters: List[dict], sorts: List[dict], fields: Dict[str, str], top_n: int,
+                         source: Optional[List[str]] = None):
+    _source = source or [fields["name"], fields.get("name_alt"), fields["code"], fields["pbr"], fields["per"],
+                         fields["eps"], "product_type", "table"]
     _source = [f for f in _source if f]
+    if SCREENER_BACKEND == "local":
+        try:
+            return COLUMNAR_SCREENER.search(filters, sorts, _source, top_n)
+        except Exception as e:
+            logger.warning(f"columnar screener unavailable, falling back to OpenSearch: {e}")
     body = {
         "size": top_n,
         "_source": _source,
@@ -130,52 +51,90 @@ def _search_with_filters(filters: List[dict], sorts: List[dict], fields: Dict[st
         "sort": sorts,
     }
     client = _get_os_client()
-    return client.search(index=INDEX, body=body)
+    return client.search(index=INDEX, body=body, **search_params())
+
+
+def execute_plan(plan: dict):
+    """compile_plan 결과를 실행 (local 컬럼 엔진 → 실패 시 OpenSearch)."""
+    return _search_with_filters(plan["filters"], plan["sorts"], plan["fields"], plan["top_n"], plan["source"])
+
+
+_PROFILE_LABELS = {"value": "가치", "growth": "성장", "stable": "안정", "balanced": "균형"}
+
+_PRESET_HEADERS = {
+    "stable": "장기·안정 선호 기준으로 스크리닝한 후보입니다:\n",
+    "value": "가치(저평가) 기준으로 스크리닝한 후보입니다:\n",
+    "growth": "성장 선호 기준으로 스크리닝한 후보입니다:\n",
+    "default": "조건 기반으로 스크리닝한 상위 후보입니다:\n",
+}
+
+
+def _format_line(s: dict, fields: Dict[str, str], market: str, score_field: Optional[str] = None) -> str:
+    if market == "연금":
+        return (f"- {s.get('fin_prdt_nm', '(상품명없음)')}({s.get('kor_co_nm', '')}) | "
+                f"평균수익률 {s.get('avg_prft_rate')}%, 전년도수익률 {s.get('btrm_prft_rate1')}%, "
+                f"최저보증이율 {s.get('guar_rate')}%")
+    name = s.get(fields.get("name_alt")) or s.get(fields.get("name"), "(종목명없음)")
+    code = s.get(fields["code"], "")
+    pbr  = s.get(fields["pbr"])
+    per  = s.get(fields["per"])
+    eps  = s.get(fields["eps"])
+    line = f"- {name}({code}) | PBR {pbr}, PER {per}, EPS {eps}"
+    if score_field and s.get(score_field) is not None:
+        line += f", 종합점수 {s[score_field]:.2f}"
+    return line
+
+
+def _render_screen(plan: dict) -> str:
+    res = execute_plan(plan)
+    hits = res.get("hits", {}).get("hits", [])
+    if not hits:
+        return "조건에 맞는 종목을 찾지 못했습니다. (필터가 너무 엄격할 수 있어요)"
+
+    score = f"score_{plan['score_profile']}" if plan["ranking"] == "composite" else None
+    lines = [_format_line(h.get("_source", {}), plan["fields"], plan["market"], score) for h in hits]
+
+    # 추천 톤 가이드: 명시 조건이 있으면 조건을, 없으면 프리셋을 머리말에 반영
+    conditions = describe_conditions(plan)
+    if conditions:
+        header = f"{conditions} 조건으로 스크리닝한 {plan['market']} 후보입니다:\n"
+    else:
+        header = _PRESET_HEADERS.get(plan["preset"], _PRESET_HEADERS["default"])
+    if score:
+        label = _PROFILE_LABELS.get(plan["score_profile"], plan["score_profile"])
+        header = header.rstrip(":\n") + f" (PER·PBR·EPS 시장 내 백분위 종합 점수, {label} 가중):\n"
+
+    return header + "\n".join(lines)
+
 
-def run_stock_screener(query: str) -> str:
+def run_stock_screener(query: str, session_id: Optional[str] = None) -> str:
     try:
-        fields = _infer_market_and_fields(query)
-        top_n = _extract_topn(query, default_n=5)
-        filters, sorts = _preset_from_query(query, fields)
-
-        res = _search_with_filters(filters, sorts, fields, top_n)
-        hits = res.get("hits", {}).get("hits", [])
-        if not hits:
-            return "조건에 맞는 종목을 찾지 못했습니다. (필터가 너무 엄격할 수 있어요)"
-
-        lines = []
-        for h in hits:
-            s = h.get("_source", {})
-            name = s.get(fields.get("name_alt")) or s.get(fields.get("name"), "(종목명없음)")
-            code = s.get(fields["code"], "")
-            pbr  = s.get(fields["pbr"])
-            per  = s.get(fields["per"])
-            eps  = s.get(fields["eps"])
-            lines.append(f"- {name}({code}) | PBR {pbr}, PER {per}, EPS {eps}")
-
-        # 추천 톤 가이드: 장기/안정 키워드가 있으면 추천 코멘트에 반영
-        q = query.lower()
-        if any(k in q for k in ["장기", "안정", "보수", "defensive", "바이앤홀드", "리스크 낮", "변동성 낮"]):
-            header = "장기·안정 선호 기준으로 스크리닝한 후보입니다:\n"
-        elif any(k in q for k in ["가치", "저평가", "value"]):
-            header = "가치(저평가) 기준으로 스크리닝한 후보입니다:\n"
-        elif any(k in q for k in ["성장", "growth"]):
-            header = "성장 선호 기준으로 스크리닝한 후보입니다:\n"
-        else:
-            header = "조건 기반으로 스크리닝한 상위 후보입니다:\n"
-
-        return header + "\n".join(lines)
+        # 숫자 조건/정렬/프리셋 → filter·sort plan (정규화 질의 기준 캐시, LLM 불필요)
+        plan = compile_plan(query)
+        # 종합 점수 모드: 프리셋이 없으면 세션 프로필(value_growth/risk_acceptance_level)로 가중치 선택
+        profile = None
+        session_id = session_id or current_session_id()
+        if plan["ranking"] == "composite" and not plan["score_profile"] and session_id:
+            profile = get_session_data(session_id)
+        apply_score_profile(plan, profile)
+        # 표현만 다른 같은 질의/같은 가중치는 plan 이 같으므로 결과를 공유한다 (generation 별)
+        return cached_result("stock_screener", plan, lambda: _render_screen(plan))
 
     except Exception as e:
         return f"[Screening Error] {e}"
 
-def create_stock_recommender_tool():
+def create_stock_recommender_tool(session_id: Optional[str] = None):
+    # 세션이 있으면 종합 점수 가중치를 사용자 프로필에서 고른다
+    # (session_id 없이 만들면 호출 시점의 세션 컨텍스트를 쓴다 → 프로세스 공용 도구로 재사용 가능)
+    func = partial(run_stock_screener, session_id=session_id) if session_id else run_stock_screener
     return Tool(
         name="Stock Screener & Recommender (numeric filter/sort)",
-        func=run_stock_screener,
+        func=func,
         description=(
-            "PBR, PER, EPS 등 **숫자 조건/정렬**로 종목을 추려 추천 후보를 반환합니다. "
+            "PBR, PER, EPS, 현재가 등 **숫자 조건/정렬**로 종목을 추려 추천 후보를 반환합니다. "
+            "연금 수익률/보증이율 조건도 처리합니다. 질의를 그대로 넘기면 조건을 직접 해석합니다. "
             "예: '장기적으로 안정적인 국내주식 상위 5개', 'PBR 1 미만 저평가 국내 10개', "
-            "'해외 성장주 추천', 'PBR 가장 낮은 종목' 등."
+            "'PER 10 이하, EPS 1000 이상, PBR 0.5~1 국내 10개', '해외 성장주 추천', "
+            "'PBR 가장 낮은 종목', '보증이율 2% 이상 연금' 등."
         ),
     )
@@ -0,0 +1,27 @@
+# chat/rag/session_context.py
+"""
+에이전트 실행 중인 세션 ID 컨텍스트.
+
+에이전트/도구는 프로세스당 한 번만 만들어 재사용하므로(chat.rag.agent)
+세션에 묶인 도구(프로필 요약, 스크리너 가중치)는 생성 시점이 아니라
+호출 시점에 이 ContextVar 로 세션 ID 를 읽는다.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+CURRENT_SESSION_ID: ContextVar[Optional[str]] = ContextVar("finrec_session_id", default=None)
+
+
+def current_session_id() -> Optional[str]:
+    return CURRENT_SESSION_ID.get()
+
+
+@contextmanager
+def bind_session(session_id: Optional[str]) -> Iterator[None]:
+    """with 블록 안에서 실행되는 도구 호출에 session_id 를 묶는다."""
+    token = CURRENT_SESSION_ID.set(session_id)
+    try:
+        yield
+    finally:
+        CURRENT_SESSION_ID.reset(token)
@@ -0,0 +1,9 @@
+# chat/routing.py
+from django.urls import path
+
+from .consumers import ProfileChatConsumer
+
+websocket_urlpatterns = [
+    # 프로필 수집 대화 (세션당 연결 1개)
+    path('ws/chats/session/<str:session_id>/', ProfileChatConsumer.as_asgi()),
+]
@@ -5,9 +5,12 @@ from typing import Dict, Optional, Tuple
 from chat.gpt_service import handle_chitchat
 from chat.models import ChatMessage
 from main.models import User
-from chat.gpt.session_store import set_conflict_pending_cache
+from chat.gpt.session_store import get_session_data, pop_conflict_pending, set_conflict_pending_cache, set_session_data
 from chat.rag.agent import run_agent
+from chat.rag.intent_router import route_intent, dispatch
 from celery.result import AsyncResult
+from chat.catalog import catalog_generation
+from chat.indexing.progress import reindex_progress
 
 class ChatService:
     """Encapsulates business logic for chat interactions."""
@@ -54,6 +57,59 @@ class ChatService:
     def set_conflict_pending(field: str, value):
         set_conflict_pending_cache({field: value})
 
+    @staticmethod
+    def resolve_profile_conflict(session_id: str, choice: str, username: Optional[str] = None,
+                                 pending: Optional[dict] = None) -> str:
+        """
+        대기 중인 프로필 충돌에 대한 사용자 선택(yes/no)을 반영하고 안내 문구를 돌려준다.
+        yes 면 세션 캐시와 DB 프로필을 갱신한다 (HTTP 뷰/WebSocket 공용).
+        pending 은 호출 측이 들고 있는 충돌({field: value}, WebSocket 은 연결 상태).
+        주지 않으면 HTTP 뷰처럼 공용 캐시(pop_conflict_pending)에서 꺼낸다.
+        """
+        if pending is None:
+            pending = pop_conflict_pending() or {}
+
+        if choice == 'yes':
+            # 충돌 항목을 세션에 저장 (캐시)
+            current = get_session_data(session_id)
+            current.update(pending)
+            set_session_data(session_id, current)
+
+            try:
+                email = username
+                if not email:
+                    chat = ChatMessage.objects.filter(session_id=session_id).order_by('-timestamp').first()
+                    email = chat.username if chat else None
+                if email:
+                    user = User.objects.get(email=email)
+                    field_mapping = {
+                        'age': 'age',
+                        'monthly_income': 'income',
+                        'risk_tolerance': 'risk_tolerance',
+                        'income_stability': 'income_stability',
+                        'income_sources': 'income_source',
+                        'investment_horizon': 'period',
+                        'expected_return': 'expected_income',
+                        'expected_loss': 'expected_loss',
+                        'investment_purpose': 'purpose',
+                        'asset_allocation_type': 'asset_allocation_type',
+                        'value_growth': 'value_growth',
+                        'risk_acceptance_level': 'risk_acceptance_level',
+                        'investment_concern': 'investment_concern',
+                    }
+                    for field, value in pending.items():
+                        if field in field_mapping:
+                            setattr(user, field_mapping[field], value)
+                    user.save()
+            except Exception:
+                pass
+
+            message = "프로필이 성공적으로 업데이트되었습니다. 계속 진행할게요."
+        else:
+            message = "기존 프로필 정보를 유지합니다. 계속 진행할게요."
+
+        return message
+
 
 class ProfileService:
     """Handles reading/writing user investment profile details."""
@@ -107,12 +163,20 @@ class RecommendationService:
             ChatMessage.objects.create(session_id=session_id, username=username, product_type="realtime_refusal", role="assistant", message=msg)
             return msg, "quick_refusal"
 
-        # 3) 나머지는 에이전트(툴-퍼스트)에게 위임
-        response_text = run_agent(query=query, session_id=session_id)
-        intent = "agent_tool_first"
+        # 3) 결정적 라우터: 의도가 분명하면 에이전트 계획 LLM 호출 없이 도구로 직행
+        route = route_intent(query)
+        response_text = dispatch(route["intent"], query, session_id) if route["intent"] != "agent" else None
+        if response_text is not None:
+            intent = f"router_{route['intent']}"
+            product_type = "chitchat" if route["intent"] == "chitchat" else "recommend_or_general"
+        else:
+            # 4) 나머지는 에이전트(툴-퍼스트)에게 위임
+            response_text = run_agent(query=query, session_id=session_id)
+            intent = "agent_tool_first"
+            product_type = "recommend_or_general"
 
         ChatMessage.objects.create(session_id=session_id, username=username, role="user", message=query)
-        ChatMessage.objects.create(session_id=session_id, username=username, product_type="recommend_or_general", role="assistant", message=response_text)
+        ChatMessage.objects.create(session_id=session_id, username=username, product_type=product_type, role="assistant", message=response_text)
 
         return response_text, intent
 
@@ -120,19 +184,24 @@ class OpenSearchService:
     """Utility wrapper for OpenSearch indexing."""
 
     @staticmethod
-    def index_async() -> str:
+    def index_async(in_place: bool = False) -> str:
         """Enqueue indexing as a Celery task and return task_id."""
         from chat.tasks import index_financial_products
-        async_result = index_financial_products.delay()
+        async_result = index_financial_products.delay(in_place=in_place)
         return async_result.id
 
     @staticmethod
     def index_status(task_id: str) -> dict:
-        """Query celery task status/result."""
+        """Query celery task status and aggregate chord progress."""
         r = AsyncResult(task_id)
-        data = {"task_id": task_id, "state": r.state}
+        data = {"task_id": task_id, "state": r.state, "catalog_generation": catalog_generation()}
         if r.failed():
             data["error"] = str(r.result)
         elif r.successful():
-            data["result"] = r.result  # index_to_opensearch 출력
+            result = r.result
+            if isinstance(result, dict) and "parts" in result:
+                # 하위 작업들의 진행 상황 (rows read/embedded/indexed, rows/sec)
+                data["progress"] = reindex_progress(result)
+            else:
+                data["result"] = result  # locked 등
         return data
\ No newline at end of file
@@ -0,0 +1,123 @@
+# chat/singleflight.py
+"""
+Redis 락 기반 single-flight (동일 요청 합치기).
+
+여러 gunicorn/Celery 워커가 같은 키로 동시에 비싼 작업(LLM 호출, 벡터 검색)을 시작하면
+첫 호출자(leader)만 실제로 실행하고, 나머지(follower)는 leader 의 결과를 기다렸다가 재사용한다.
+
+- 락: cache.add(lock_key) (= Redis SET NX) 로 획득, 값은 이번 flight 의 토큰
+- 결과: "<key>:<token>" 에 짧은 TTL 로 저장 → 이전 flight 의 결과를 잘못 읽지 않음
+- follower 는 wait_timeout 안에 결과가 없거나 leader 가 실패하면 직접 실행(fallback)
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Callable
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SINGLEFLIGHT_PREFIX = "sf"
+SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT", 20))
+SINGLEFLIGHT_LOCK_TTL = int(os.getenv("SINGLEFLIGHT_LOCK_TTL", 60))
+SINGLEFLIGHT_RESULT_TTL = int(os.getenv("SINGLEFLIGHT_RESULT_TTL", 30))
+
+_POLL_MIN = 0.02
+_POLL_MAX = 0.2
+
+
+def make_flight_key(namespace: str, *parts) -> str:
+    """임의의 인자 조합으로 프로세스 독립적인 flight 키를 만든다."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return f"{namespace}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+
+def single_flight(
+    key: str,
+    fn: Callable[[], Any],
+    wait_timeout: float = SINGLEFLIGHT_WAIT_TIMEOUT,
+    lock_ttl: int = SINGLEFLIGHT_LOCK_TTL,
+    result_ttl: int = SINGLEFLIGHT_RESULT_TTL,
+) -> Any:
+    """
+    key 가 같은 동시 호출을 하나로 합친다.
+    fn 의 반환값은 캐시(pickle)에 저장 가능한 값이어야 한다.
+    """
+    lock_key = f"{SINGLEFLIGHT_PREFIX}:lock:{key}"
+    deadline = time.monotonic() + wait_timeout
+    delay = _POLL_MIN
+
+    while True:
+        token = uuid.uuid4().hex
+        try:
+            acquired = cache.add(lock_key, token, lock_ttl)
+        except Exception as e:
+            # Redis 장애 시에는 합치기 없이 그대로 실행
+            logger.warning(f"single_flight lock failed ({key}): {e}")
+            return fn()
+
+        if acquired:
+            return _run_as_leader(key, lock_key, token, fn, result_ttl)
+
+        leader_token = cache.get(lock_key)
+        if leader_token is None:
+            # leader 가 방금 끝났거나 락이 만료됨 → 다시 획득 시도
+            continue
+
+        outcome = _wait_for_leader(key, leader_token, deadline)
+        if outcome is not None:
+            if outcome.get("ok"):
+                return outcome.get("value")
+            # leader 실패: 같은 오류를 반복 전파하지 않고 직접 실행
+            logger.info(f"single_flight leader failed ({key}), running locally")
+            return fn()
+
+        if time.monotonic() >= deadline:
+            logger.info(f"single_flight wait timed out ({key}), running locally")
+            return fn()
+
+        time.sleep(delay)
+        delay = min(delay * 2, _POLL_MAX)
+
+
+def _result_key(key: str, token: str) -> str:
+    return f"{SINGLEFLIGHT_PREFIX}:result:{key}:{token}"
+
+
+def _run_as_leader(key: str, lock_key: str, token: str, fn: Callable[[], Any], result_ttl: int) -> Any:
+    try:
+        value = fn()
+    except Exception as e:
+        cache.set(_result_key(key, token), {"ok": False, "error": repr(e)}, result_ttl)
+        raise
+    else:
+        cache.set(_result_key(key, token), {"ok": True, "value": value}, result_ttl)
+        return value
+    finally:
+        # 내 토큰일 때만 락 해제 (만료 후 다른 leader 가 잡은 락은 건드리지 않음)
+        try:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        except Exception:
+            pass
+
+
+def _wait_for_leader(key: str, leader_token: str, deadline: float):
+    """leader 의 결과가 올라오거나 락이 사라질 때까지 기다린다. 결과 dict 또는 None."""
+    lock_key = f"{SINGLEFLIGHT_PREFIX}:lock:{key}"
+    result_key = _result_key(key, leader_token)
+    delay = _POLL_MIN
+    while time.monotonic() < deadline:
+        outcome = cache.get(result_key)
+        if outcome is not None:
+            return outcome
+        if cache.get(lock_key) != leader_token:
+            # 락이 풀렸는데 결과가 없으면 (해제 직후 경합) 한 번 더 확인
+            return cache.get(result_key)
+        time.sleep(delay)
+        delay = min(delay * 2, _POLL_MAX)
+    return None
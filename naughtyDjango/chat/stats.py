@@ -0,0 +1,15 @@
+# chat/stats.py
+"""모든 워커가 함께 쌓는 Redis 카운터 (완료 캐시, 도구 결과 캐시의 hit/miss 통계가 공유)."""
+from django.core.cache import cache
+
+
+def incr_counter(key: str, n: int = 1) -> None:
+    """key 를 n 만큼 증가. 카운터는 만료 없이 유지하고, 캐시 오류는 무시한다 (통계 때문에 요청이 실패하지 않도록)."""
+    try:
+        cache.incr(key, n)
+    except ValueError:
+        # 키가 없으면 만료 없이 생성 후 증가
+        cache.add(key, 0, None)
+        cache.incr(key, n)
+    except Exception:
+        pass
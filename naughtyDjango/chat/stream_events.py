@@ -0,0 +1,201 @@
+# chat/stream_events.py
+"""
+작업별 응답 스트림 (Redis Stream).
+
+Celery 작업이 LLM 토큰 조각을 "task:stream:<task_id>" 스트림에 XADD 하고,
+SSE 뷰(chat.views.stream_views)가 XREAD BLOCK 으로 도착하는 대로 클라이언트에 흘려보낸다.
+
+이벤트 (필드 event / data(JSON)):
+- token    {"delta": "..."}            답변 조각 (표시용, 최종 답은 done 의 result 가 기준)
+- done     {"result": {...}}           작업 결과 (task_postrun 에서 기록)
+- conflict {"field", "value", "message"} 프로필 충돌 (COMMON2001 과 같은 의미)
+- error    {"message": "..."}          작업 실패
+
+- 스트림은 TTL 동안 남아 있으므로 SSE 가 늦게 연결해도 처음(0)부터 다시 읽을 수 있다
+- 종료 이벤트는 항상 스트림 끝에 붙는다. 이미 받은 클라이언트의 재연결(Last-Event-ID)은 already_delivered 로
+  알아보고, 스트림에 종료 이벤트가 아예 없을 때만 결과 백엔드에서 한 번 다시 만든다(emit_missing_result)
+- 스트림이 묶여 있지 않으면(bind_stream 밖) 모든 함수가 기존처럼 한 번에 응답을 받는다
+- stream=True 에서는 HTTP timeout 이 조각 사이 간격에만 걸리므로, 조각마다 요청 마감(chat.deadline)을
+  확인해 지나면 스트림을 닫는다
+"""
+import json
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from django_redis import get_redis_connection
+
+from chat.deadline import DEADLINE_TRUNCATED_NOTE, DeadlineExceeded, remaining
+from chat.task_events import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+STREAM_PREFIX = "task:stream"
+TASK_STREAM_TTL_SECONDS = int(os.getenv("TASK_STREAM_TTL_SECONDS", 600))
+# 스트림 하나의 최대 길이 (근사 MAXLEN)
+TASK_STREAM_MAXLEN = 5000
+TERMINAL_EVENTS = ("done", "conflict", "error")
+# 종료 이벤트를 찾을 때 스트림 끝에서 볼 항목 수 (종료 이벤트 뒤에는 기록하지 않는다)
+TERMINAL_SCAN_COUNT = 10
+
+_STREAM: ContextVar[Optional[str]] = ContextVar("task_stream", default=None)
+
+
+def stream_key(task_id: str) -> str:
+    return f"{STREAM_PREFIX}:{task_id}"
+
+
+@contextmanager
+def bind_stream(task_id: Optional[str]) -> Iterator[None]:
+    token = _STREAM.set(task_id or None)
+    try:
+        yield
+    finally:
+        _STREAM.reset(token)
+
+
+def streaming_enabled() -> bool:
+    return _STREAM.get() is not None
+
+
+def emit(event: str, data: dict, task_id: Optional[str] = None) -> None:
+    """스트림에 이벤트 추가. task_id 를 주지 않으면 bind_stream 으로 묶인 작업, 둘 다 없으면 무시."""
+    task_id = task_id or _STREAM.get()
+    if not task_id:
+        return
+    key = stream_key(task_id)
+    try:
+        pipe = get_redis_connection("default").pipeline(transaction=False)
+        pipe.xadd(key, {"event": event, "data": json.dumps(data, ensure_ascii=False, default=str)},
+                  maxlen=TASK_STREAM_MAXLEN, approximate=True)
+        pipe.expire(key, TASK_STREAM_TTL_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"stream emit failed: task_id={task_id}, event={event}, {e}")
+
+
+def emit_task_result(task_id: str, state: str, retval) -> None:
+    """작업 종료 이벤트 (task_postrun). 충돌 결과는 conflict, 실패는 error, 나머지는 done."""
+    if state != "SUCCESS":
+        emit("error", {"message": str(retval) if retval is not None else state}, task_id=task_id)
+    elif isinstance(retval, dict) and retval.get("type") == "conflict_detected":
+        field, value = retval.get("field"), retval.get("value")
+        emit("conflict", {"field": field, "value": value,
+                          "message": f"프로필 변경이 감지되었습니다: {field} = {value}"}, task_id=task_id)
+    else:
+        emit("done", {"result": retval}, task_id=task_id)
+
+
+def terminal_event_id(task_id: str) -> Optional[str]:
+    """스트림에 기록된 종료 이벤트(done/conflict/error)의 ID. 없으면 None."""
+    entries = get_redis_connection("default").xrevrange(stream_key(task_id), count=TERMINAL_SCAN_COUNT)
+    return _terminal_id(entries)
+
+
+async def aterminal_event_id(task_id: str) -> Optional[str]:
+    entries = await get_async_redis().xrevrange(stream_key(task_id), count=TERMINAL_SCAN_COUNT)
+    return _terminal_id(entries)
+
+
+def _terminal_id(entries) -> Optional[str]:
+    for event_id, event, _data in _parse_entries([(None, entries)]):
+        if event in TERMINAL_EVENTS:
+            return event_id
+    return None
+
+
+def _id_key(event_id: str) -> Tuple[int, int]:
+    ms, _, seq = str(event_id).partition("-")
+    try:
+        return int(ms), int(seq or 0)
+    except ValueError:
+        return 0, 0
+
+
+def already_delivered(terminal_id: Optional[str], last_id: str) -> bool:
+    """클라이언트가 받은 마지막 ID(last_id)가 종료 이벤트 이후인지 — 그렇다면 더 보낼 것이 없다."""
+    return terminal_id is not None and _id_key(last_id) >= _id_key(terminal_id)
+
+
+def emit_missing_result(task_id: str, state: str, retval) -> bool:
+    """
+    스트림 기록이 유실된 채(예: Redis 재시작) 끝난 작업의 종료 이벤트를 결과 백엔드 값으로 다시 기록한다.
+    스트림에 종료 이벤트가 이미 있거나 다른 연결이 먼저 만들었으면(마커 SET NX) 아무것도 하지 않는다.
+    """
+    if terminal_event_id(task_id) is not None:
+        return False
+    marker = f"{stream_key(task_id)}:rebuilt"
+    if not get_redis_connection("default").set(marker, 1, nx=True, ex=TASK_STREAM_TTL_SECONDS):
+        return False
+    emit_task_result(task_id, state, retval)
+    return True
+
+
+def read_events(task_id: str, last_id: str = "0", block_ms: int = 0) -> List[Tuple[str, str, dict]]:
+    """last_id 이후 이벤트 [(id, event, data)]. block_ms > 0 이면 새 이벤트가 올 때까지 최대 그만큼 기다린다."""
+    conn = get_redis_connection("default")
+    response = conn.xread({stream_key(task_id): last_id}, count=200, block=block_ms or None)
+    return _parse_entries(response)
+
+
+async def aread_events(task_id: str, last_id: str = "0", block_ms: int = 0) -> List[Tuple[str, str, dict]]:
+    """read_events 의 async 판 (ASGI SSE 뷰용, redis.asyncio)."""
+    response = await get_async_redis().xread({stream_key(task_id): last_id}, count=200, block=block_ms or None)
+    return _parse_entries(response)
+
+
+def _parse_entries(response) -> List[Tuple[str, str, dict]]:
+    events = []
+    for _key, entries in response or []:
+        for entry_id, fields in entries:
+            entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+            fields = {(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+                      for k, v in fields.items()}
+            try:
+                data = json.loads(fields.get("data") or "{}")
+            except ValueError:
+                data = {}
+            events.append((entry_id, fields.get("event", "message"), data))
+    return events
+
+
+def stream_chat_completion(openai_client, **kwargs) -> str:
+    """
+    chat.completions.create 와 같은 인자로 호출해 답변 텍스트를 돌려준다.
+    스트림이 묶여 있으면 stream=True 로 받아 조각마다 token 이벤트를 보내고, 아니면 한 번에 받는다.
+    받는 도중 요청 마감이 지나면 스트림을 닫고 받은 부분 + 안내를 돌려준다 (받은 것이 없으면 DeadlineExceeded).
+    """
+    if not streaming_enabled():
+        response = openai_client.chat.completions.create(**kwargs)
+        return response.choices[0].message.content
+
+    parts = []
+    stream = openai_client.chat.completions.create(stream=True, **kwargs)
+    try:
+        for chunk in stream:
+            left = remaining()
+            if left is not None and left <= 0:
+                if not parts:
+                    raise DeadlineExceeded("llm_stream", left)
+                parts.append(DEADLINE_TRUNCATED_NOTE)
+                emit("token", {"delta": DEADLINE_TRUNCATED_NOTE})
+                break
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                emit("token", {"delta": delta})
+    finally:
+        stream.close()
+    return "".join(parts)
+
+
+def sse_message(event: str, data: dict, event_id: Optional[str] = None) -> str:
+    """SSE 프레임 한 개 (id 가 있으면 재연결 시 Last-Event-ID 로 이어 읽는다)."""
+    lines = [f"id: {event_id}"] if event_id else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,139 @@
+# chat/task_events.py
+"""
+Celery 작업 완료 알림 (Redis pub/sub).
+
+뷰가 AsyncResult 를 sleep 루프로 폴링하지 않도록, 채팅 작업이 끝나면(task_postrun, 결과 저장 이후)
+"task:done:<task_id>" 채널에 상태를 publish 하고 기다리는 쪽은 그 채널을 구독해 바로 깨어난다.
+
+- 구독 전에 이미 끝난 작업은 구독 직후 한 번 더 확인해 놓치지 않는다 (publish 는 저장되지 않으므로)
+- 여러 요청(동기 응답 + long-poll)이 같은 작업을 기다려도 pub/sub 이라 모두 깨어난다
+- Redis 오류 시에는 기다리지 않고 현재 상태를 그대로 돌려준다 (호출 측은 pending 으로 응답)
+- ASGI 모드의 async 뷰는 async_wait_for_task 로 같은 알림을 redis.asyncio 로 기다린다 (스레드 점유 없음)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from celery.result import AsyncResult
+from django.conf import settings
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+TASK_EVENT_PREFIX = "task:done"
+# 완료 알림을 보내는 작업 (shared_task 이름)
+TASK_EVENT_TASKS = {"chat.tasks.process_chat_async", "process_recommend_async"}
+# chat_with_gpt 가 결과/충돌을 기다리는 최대 시간(초)
+CHAT_TASK_WAIT_SECONDS = float(os.getenv("CHAT_TASK_WAIT_SECONDS", 10))
+# long-poll 상태 조회 최대 대기(초) — gunicorn timeout 보다 짧게.
+# WSGI(sync 워커 4개)에서는 기다리는 동안 워커 하나를 통째로 잡으므로 짧게 끊고 클라이언트가 다시 묻는다.
+# ASGI 모드는 이벤트 루프에서 기다리므로(async_wait_for_task) 길게 잡는다
+TASK_LONGPOLL_MAX_SECONDS = float(os.getenv(
+    "TASK_LONGPOLL_MAX_SECONDS", 25 if settings.SERVER_MODE == "asgi" else 5
+))
+
+
+def task_channel(task_id: str) -> str:
+    return f"{TASK_EVENT_PREFIX}:{task_id}"
+
+
+def publish_task_done(task_id: str, state: str) -> None:
+    try:
+        get_redis_connection("default").publish(task_channel(task_id), state or "")
+    except Exception as e:
+        logger.warning(f"task done publish failed: task_id={task_id}, {e}")
+
+
+def wait_for_task(task_id: str, timeout: float) -> AsyncResult:
+    """
+    작업 완료 알림을 최대 timeout 초 기다린 뒤 AsyncResult 를 돌려준다 (완료 여부는 ready()).
+    고정 sleep 없이 알림이 오는 즉시 반환한다.
+    """
+    result = AsyncResult(task_id)
+    if timeout <= 0 or result.ready():
+        return result
+
+    started = time.monotonic()
+    pubsub = None
+    try:
+        pubsub = get_redis_connection("default").pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(task_channel(task_id))
+        # 구독하기 전에 끝났으면 알림은 이미 지나갔다
+        if result.ready():
+            return result
+        while True:
+            left = timeout - (time.monotonic() - started)
+            if left <= 0:
+                break
+            message = pubsub.get_message(timeout=left)
+            if message and message.get("type") == "message":
+                break
+    except Exception as e:
+        logger.warning(f"task wait failed, returning current state: task_id={task_id}, {e}")
+    finally:
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+        logger.info("task wait", extra={"task_id": task_id, "waited": round(time.monotonic() - started, 3)})
+    return result
+
+
+# ── ASGI(async 뷰) 용 ──
+_async_redis_lock = threading.Lock()
+_async_redis = {"pid": None, "client": None}
+
+
+def get_async_redis() -> aioredis.Redis:
+    """프로세스 공용 redis.asyncio 클라이언트 (django-redis 와 같은 Redis/DB)."""
+    with _async_redis_lock:
+        if _async_redis["pid"] != os.getpid() or _async_redis["client"] is None:
+            _async_redis.update(pid=os.getpid(), client=aioredis.from_url(
+                settings.CACHES["default"]["LOCATION"], max_connections=1000, socket_keepalive=True,
+            ))
+        return _async_redis["client"]
+
+
+async def _ready(task_id: str) -> bool:
+    return await sync_to_async(AsyncResult(task_id).ready, thread_sensitive=False)()
+
+
+async def async_wait_for_task(task_id: str, timeout: float) -> bool:
+    """wait_for_task 의 async 판. 완료 여부를 돌려준다 (결과 조회는 호출 측에서)."""
+    if await _ready(task_id):
+        return True
+    if timeout <= 0:
+        return False
+
+    started = time.monotonic()
+    pubsub = None
+    try:
+        pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(task_channel(task_id))
+        if await _ready(task_id):
+            return True
+        while True:
+            left = timeout - (time.monotonic() - started)
+            if left <= 0:
+                break
+            message = await pubsub.get_message(timeout=left)
+            if message and message.get("type") == "message":
+                return True
+    except asyncio.CancelledError:
+        # 클라이언트가 연결을 끊음
+        raise
+    except Exception as e:
+        logger.warning(f"async task wait failed, returning current state: task_id={task_id}, {e}")
+    finally:
+        if pubsub is not None:
+            try:
+                await (pubsub.aclose() if hasattr(pubsub, "aclose") else pubsub.reset())
+            except Exception:
+                pass
+        logger.info("task wait", extra={"task_id": task_id, "waited": round(time.monotonic() - started, 3)})
+    return await _ready(task_id)
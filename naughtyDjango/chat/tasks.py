@@ -1,16 +1,16 @@
 #chat/tasks.py
 
 from celery import shared_task
-from openai import OpenAI
 import os
 import re
-import io
+import time
+import uuid
 from .models import ChatMessage
 from main.models import User
 from chat.gpt.parser import extract_json_from_response
 from chat.gpt.flow import handle_chat
+from chat.gpt.openai_client import client
 from chat.gpt.session_store import get_session_data, set_session_data
-from django.core.management import call_command
 
 DETECTION_SYSTEM = """
 당신은 '투자 프로필 변경 트리거'를 감지하는 어시스턴트입니다.
@@ -49,8 +49,6 @@ DETECTION_SYSTEM = """
 def process_chat_async(session_id, username, message, product_type):
     """Async task for heavy GPT processing"""
     try:
-        openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
         session_snapshot = get_session_data(session_id) or {}
         last_asked_key = session_snapshot.get("_last_asked_key")
 
@@ -64,7 +62,8 @@ def process_chat_async(session_id, username, message, product_type):
             })
         detection_messages.append({"role": "user", "content": message})
 
-        detect_resp = openai_client.chat.completions.create(
+        # 동일 발화/질문 맥락의 감지 결과는 completion 캐시에서 재사용
+        detect_resp = client.create_completion(
             model="gpt-3.5-turbo",
             messages=detection_messages,
             temperature=0,
@@ -169,12 +168,214 @@ def process_chat_async(session_id, username, message, product_type):
         traceback.print_exc()
         return {"type": "error", "error": str(e)}
 
-@shared_task(name="index_financial_products")
-def index_financial_products():
-    """Run 'python manage.py index_to_opensearch' in background."""
-    buf = io.StringIO()
-    call_command("index_to_opensearch", stdout=buf)
-    return buf.getvalue()
+@shared_task(bind=True, name="index_financial_products")
+def index_financial_products(self, in_place=False):
+    """
+    재색인을 테이블 × PK 구간 하위 작업으로 나눠 chord 로 실행한다.
+    하위 작업마다 CELERY_TASK_TIME_LIMIT 안에 끝나도록 INDEX_RANGE_SIZE 로 구간을 자른다.
+    반환값(하위 작업 id 목록)은 OpenSearchService.index_status 가 진행 상황 집계에 사용한다.
+    """
+    from celery import chord
+    from chat.indexing.documents import TABLES
+    from chat.indexing.embedding_store import EmbeddingStore
+    from chat.indexing.generations import acquire_reindex_lock, release_reindex_lock, ReindexInProgress
+    from chat.indexing.pipeline import table_id_ranges
+    from chat.indexing.reindex import get_index_client, begin_generation, discard_generation
+
+    try:
+        token = acquire_reindex_lock()
+    except ReindexInProgress as e:
+        return {"status": "locked", "error": str(e)}
+
+    client = get_index_client()
+    store = EmbeddingStore()
+    plan = None
+    try:
+        plan = begin_generation(client, store=store, in_place=in_place)
+        plan["lock_token"] = token
+
+        parts = [
+            {"id": str(uuid.uuid4()), "table": tbl, "range": [lo, hi]}
+            for tbl in TABLES
+            for lo, hi in table_id_ranges(tbl)
+        ]
+        finalize_id = str(uuid.uuid4())
+        callback = (
+            finalize_reindex.s(plan)
+            .set(task_id=finalize_id)
+            .on_error(abort_reindex.si(plan))
+        )
+        header = [index_table_range.s(plan, p["table"], p["range"]).set(task_id=p["id"]) for p in parts]
+        if header:
+            chord(header)(callback)
+        else:
+            callback.apply_async(args=([],))
+    except Exception:
+        if plan is not None:
+            discard_generation(client, plan, store=store)
+        release_reindex_lock(token)
+        raise
+    finally:
+        store.close()
+
+    return {
+        "status": "dispatched",
+        "generation": plan["generation"],
+        "index": plan["index"],
+        "in_place": plan["in_place"],
+        "started_at": time.time(),
+        "parts": parts,
+        "finalize_id": finalize_id,
+    }
+
+
+@shared_task(
+    bind=True,
+    name="index_table_range",
+    acks_late=True,
+    reject_on_worker_lost=True,  # 워커가 죽으면(메모리 한도 등) 다시 큐에 넣는다
+    autoretry_for=(Exception,),  # SoftTimeLimitExceeded 포함
+    retry_backoff=True,
+    max_retries=int(os.getenv("INDEX_TASK_MAX_RETRIES", 3)),
+)
+def index_table_range(self, plan, tbl, id_range):
+    """
+    테이블 하나의 PK 구간 [lo, hi) 를 색인하고 진행 상황을 PROGRESS 상태로 게시한다.
+    재시도/재전달 시에는 체크포인트(마지막 커밋 PK) 다음부터 이어서 색인한다.
+    """
+    from chat.indexing.documents import TABLES, EMBEDDING_DIM
+    from chat.indexing.embedding_store import EmbeddingStore
+    from chat.indexing.pipeline import (
+        PipelineStats, index_table, replay_local_index, EMBED_MODEL, EMBED_TOKENS_PER_MINUTE,
+    )
+    from chat.indexing.reindex import get_index_client
+    from chat.indexing.throttle import RedisTokenBudget
+    from chat.vector_index import LocalVectorIndexWriter, LOCAL_VECTOR_INDEX_DIR
+
+    lo, hi = id_range
+    part = f"{tbl}:{lo}"
+    meta = {"table": tbl, "range": [lo, hi], "attempt": self.request.retries}
+    stats = PipelineStats()
+    store = EmbeddingStore()
+    last_id, done = store.get_checkpoint(plan["run_id"], part)
+    # 구간별 로컬 벡터 인덱스 조각 → finalize_reindex 에서 하나로 합친다
+    part_path = os.path.join(f"{LOCAL_VECTOR_INDEX_DIR}.parts", plan["run_id"], f"{tbl}-{lo:012d}")
+    writer = LocalVectorIndexWriter(path=part_path, dim=EMBEDDING_DIM, model=EMBED_MODEL)
+    last_update = [0.0]
+
+    def _progress(snapshot):
+        now = time.monotonic()
+        if now - last_update[0] >= 1.0:
+            self.update_state(state="PROGRESS", meta={**meta, **snapshot})
+            last_update[0] = now
+
+    try:
+        if done or last_id is not None:
+            # 이미 커밋된 구간은 로컬 인덱스 조각에만 다시 기록 (임베딩은 저장소에서)
+            replay_local_index(tbl, TABLES[tbl], writer, store, id_range=(lo, hi), upto_id=None if done else last_id)
+            meta["resumed_after"] = last_id
+        if not done:
+            index_table(
+                get_index_client(), tbl, TABLES[tbl], plan["index"],
+                stats=stats,
+                local_writer=writer,
+                store=store,
+                run_id=plan["run_id"],
+                full=plan["full"],
+                id_range=(lo, hi),
+                delete_stale=False,  # 삭제 감지는 모든 구간이 끝난 뒤 finalize 에서
+                progress=_progress,
+                # TPM 한도는 모든 하위 작업이 Redis 에서 함께 쓴다
+                budget=RedisTokenBudget(EMBED_TOKENS_PER_MINUTE) if EMBED_TOKENS_PER_MINUTE > 0 else None,
+                after_id=last_id,
+                checkpoint=lambda pk: store.save_checkpoint(plan["run_id"], part, pk),
+            )
+            store.save_checkpoint(plan["run_id"], part, None, done=True)
+        writer.commit()
+    except Exception:
+        writer.abort()
+        raise
+    finally:
+        store.close()
+
+    return {**meta, **stats.snapshot(), "local_part": part_path}
+
+
+@shared_task(bind=True, name="finalize_reindex")
+def finalize_reindex(self, results, plan):
+    """
+    chord 콜백: MySQL 행 수와 대조 → alias 교체 → generation 게시 → 로컬 벡터 인덱스 병합.
+    구간 체크포인트(EmbeddingStore)와 로컬 인덱스 조각은 이 호스트에서 보여야 한다 —
+    다른 호스트에서 끝난 구간이 보이지 않으면 삭제 감지/병합이 틀리므로 generation 을 폐기한다.
+    """
+    import shutil
+    from chat.indexing.documents import TABLES
+    from chat.indexing.embedding_store import EmbeddingStore
+    from chat.indexing.generations import release_reindex_lock, ValidationFailed
+    from chat.indexing.pipeline import delete_stale_documents, mysql_row_counts, EMBED_MODEL
+    from chat.indexing.reindex import get_index_client, complete_generation, discard_generation
+    from chat.vector_index import merge_local_indexes, LOCAL_VECTOR_INDEX_DIR
+
+    client = get_index_client()
+    store = EmbeddingStore()
+    try:
+        missing = _missing_index_parts(results, plan["run_id"], store)
+        if missing:
+            raise ValidationFailed(
+                f"index parts not visible on this host: {missing[:5]} (총 {len(missing)}개) — "
+                "색인 워커가 INDEX_EMBEDDING_STORE / LOCAL_VECTOR_INDEX_DIR 를 공유해야 한다"
+            )
+        if plan["in_place"]:
+            for tbl in TABLES:
+                delete_stale_documents(client, tbl, plan["index"], store, plan["run_id"])
+        # 재시도된 구간은 read 가 부분값이므로 기준은 MySQL 행 수
+        summary = complete_generation(client, plan, mysql_row_counts(TABLES), store=store)
+        parts = [r["local_part"] for r in results if r.get("local_part")]
+        if parts:
+            summary["local_rows"] = merge_local_indexes(parts, model=EMBED_MODEL)
+    except Exception:
+        discard_generation(client, plan, store=store)
+        raise
+    finally:
+        store.close()
+        release_reindex_lock(plan["lock_token"])
+        shutil.rmtree(os.path.join(f"{LOCAL_VECTOR_INDEX_DIR}.parts", plan["run_id"]), ignore_errors=True)
+
+    summary["indexed"] = sum(r.get("indexed", 0) for r in results)
+    summary["failed"] = sum(r.get("failed", 0) for r in results)
+    return summary
+
+
+def _missing_index_parts(results, run_id, store):
+    """완료 체크포인트나 로컬 인덱스 조각을 이 호스트에서 찾을 수 없는 구간 목록."""
+    from chat.vector_index import META_FILE
+
+    missing = []
+    for r in results:
+        part = f"{r['table']}:{r['range'][0]}"
+        _, done = store.get_checkpoint(run_id, part)
+        if not done or not os.path.isfile(os.path.join(r.get("local_part") or "", META_FILE)):
+            missing.append(part)
+    return missing
+
+
+@shared_task(name="abort_reindex")
+def abort_reindex(plan):
+    """하위 작업이 실패하면 chord 콜백 대신 호출된다: 새 generation 폐기 + 락 해제."""
+    import shutil
+    from chat.indexing.embedding_store import EmbeddingStore
+    from chat.indexing.generations import release_reindex_lock
+    from chat.indexing.reindex import get_index_client, discard_generation
+    from chat.vector_index import LOCAL_VECTOR_INDEX_DIR
+
+    store = EmbeddingStore()
+    try:
+        discard_generation(get_index_client(), plan, store=store)
+    finally:
+        store.close()
+        release_reindex_lock(plan["lock_token"])
+        shutil.rmtree(os.path.join(f"{LOCAL_VECTOR_INDEX_DIR}.parts", plan["run_id"]), ignore_errors=True)
+    return {"status": "aborted", "generation": plan["generation"]}
 
 def _normalize_trigger_value(field: str, value):
     """Normalize LLM-detected values to canonical forms (lightweight safety net)."""
@@ -265,15 +466,22 @@ def _parse_currency_kr_to_won(text: str):
             return None
     return None
 
-@shared_task(name="process_recommend_async")
-def process_recommend_async(session_id, username, message, product_type="", top_k=3, index="financial-products"):
+@shared_task(bind=True, name="process_recommend_async")
+def process_recommend_async(self, session_id, username, message, product_type="", top_k=3, index="financial-products"):
+    from chat.deadline import bind_deadline, deadline_from_request, DeadlineExceeded, DEADLINE_FALLBACK_MESSAGE
+    from chat.stream_events import bind_stream
     try:
         from chat.services import RecommendationService
-        final_response, intent = RecommendationService.recommend_or_chitchat(
-            username=username,
-            session_id=session_id,
-            query=message,  # 내부 시그니처 유지
-        )
+        # API 가 헤더로 넘긴 요청 마감을 이 작업 안의 LLM/검색 호출에 전파하고,
+        # 답변 토큰은 작업 스트림(SSE)으로 흘려보낸다 (종료 이벤트는 task_postrun 에서 기록)
+        with bind_deadline(deadline_from_request(self.request)), bind_stream(self.request.id):
+            final_response, intent = RecommendationService.recommend_or_chitchat(
+                username=username,
+                session_id=session_id,
+                query=message,  # 내부 시그니처 유지
+            )
         return {"type": "chat_response", "response": final_response, "intent": intent}
+    except DeadlineExceeded:
+        return {"type": "chat_response", "response": DEADLINE_FALLBACK_MESSAGE, "intent": "deadline_exceeded"}
     except Exception as e:
         return {"type": "error", "error": str(e)}
\ No newline at end of file
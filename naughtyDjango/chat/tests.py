@@ -1,3 +1,498 @@
-from django.test import TestCase
+import csv
+import os
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from chat.consumers import ProfileChatConsumer
+from chat.gpt.completion_cache import make_cache_key
+from chat.gpt.openai_client import OptimizedOpenAIClient
+from chat.rag import intent_router
+from chat.rag.autocomplete import PrefixIndex
+from chat.rag.entity_index import EntityIndex
+from chat.rag.screener_engine import SCREENER_COLUMNS, ColumnarScreener, MarketColumns
+from chat.rag.screener_plan import compile_plan, parse_conditions
+from chat.services import ChatService
+from chat.singleflight import single_flight
+
+
+def _krx_row(pk, per=None, pbr=None, eps=None):
+    return {"id": pk, "per": per, "pbr": pbr, "eps": eps, "stck_prpr": "1,000",
+            "bstp_kor_isnm": f"종목{pk}", "prdt_abrv_name": f"종목{pk}", "stck_shrn_iscd": f"{pk:06d}"}
+
+
+@mock.patch("chat.rag.screener_engine.catalog_generation", return_value=1)
+class ColumnarScreenerTests(SimpleTestCase):
+    """인메모리 스크리너의 필터/정렬이 OpenSearch 의미(결측 _last, 동점은 PK 순)와 같은지."""
+
+    KRX = [{"term": {"product_type": "국내주식"}}]
+
+    def _screener(self, rows):
+        product_type, numeric, text = SCREENER_COLUMNS["krx_stock_info"]
+        market = MarketColumns("krx_stock_info", product_type, rows, numeric, text)
+        return ColumnarScreener(lambda: {product_type: market})
+
+    def _codes(self, screener, filters, sorts, top_n):
+        hits = screener.search(filters, sorts, ["stck_shrn_iscd"], top_n)["hits"]["hits"]
+        return [h["_source"]["stck_shrn_iscd"] for h in hits]
+
+    def test_multi_key_order_matches_reference_sort(self, _gen):
+        rows = [_krx_row(pk, per=(pk * 7) % 23 + 1, pbr=round((pk * 3) % 11 / 5, 1), eps=(pk * 13) % 97 - 20)
+                for pk in range(1, 301)]
+        filters = self.KRX + [{"range": {"eps": {"gt": 0}}}, {"range": {"pbr": {"gte": 0.4, "lte": 1.6}}}]
+        sorts = [{"pbr": {"order": "asc"}}, {"per": {"order": "asc"}}, {"eps": {"order": "desc"}}]
+
+        expected = sorted((r for r in rows if r["eps"] > 0 and 0.4 <= r["pbr"] <= 1.6),
+                          key=lambda r: (r["pbr"], r["per"], -r["eps"], r["id"]))
+        self.assertEqual(self._codes(self._screener(rows), filters, sorts, 15),
+                         [r["stck_shrn_iscd"] for r in expected[:15]])
+
+    def test_ties_on_first_key_broken_by_next_key_across_top_n_cut(self, _gen):
+        # pbr 동점 4건이 top_n 경계에 걸쳐 있어도 per 로 순서가 정해져야 한다
+        rows = [_krx_row(1, per=9, pbr=0.5), _krx_row(2, per=3, pbr=0.8), _krx_row(3, per=1, pbr=0.8),
+                _krx_row(4, per=7, pbr=0.8), _krx_row(5, per=2, pbr=0.8), _krx_row(6, per=1, pbr=2.0)]
+        sorts = [{"pbr": {"order": "asc"}}, {"per": {"order": "asc"}}]
+        self.assertEqual(self._codes(self._screener(rows), self.KRX, sorts, 3), ["000001", "000003", "000005"])
+
+    def test_full_ties_keep_primary_key_order(self, _gen):
+        # 스냅샷은 id 순으로 적재된다
+        rows = [_krx_row(1, per=5, pbr=1.0), _krx_row(2, per=5, pbr=2.0),
+                _krx_row(3, per=5, pbr=1.0), _krx_row(4, per=5, pbr=1.0)]
+        sorts = [{"pbr": {"order": "desc"}}, {"per": {"order": "asc"}}]
+        self.assertEqual(self._codes(self._screener(rows), self.KRX, sorts, 3), ["000002", "000001", "000003"])
+
+    def test_missing_values_sort_last_in_both_directions(self, _gen):
+        rows = [_krx_row(1, per=None), _krx_row(2, per=4), _krx_row(3, per=12)]
+        screener = self._screener(rows)
+        self.assertEqual(self._codes(screener, self.KRX, [{"per": {"order": "asc"}}], 3), ["000002", "000003", "000001"])
+        self.assertEqual(self._codes(screener, self.KRX, [{"per": {"order": "desc"}}], 3), ["000003", "000002", "000001"])
+
+    def test_range_excludes_missing_values(self, _gen):
+        rows = [_krx_row(1, per=None), _krx_row(2, per=4), _krx_row(3, per=12)]
+        filters = self.KRX + [{"range": {"per": {"lte": 10}}}]
+        self.assertEqual(self._codes(self._screener(rows), filters, [], 10), ["000002"])
+
+    def test_unsupported_clause_raises_for_opensearch_fallback(self, _gen):
+        screener = self._screener([_krx_row(1, per=4)])
+        with self.assertRaises(ValueError):
+            screener.search(self.KRX + [{"match": {"prdt_abrv_name": "종목1"}}], [], None, 10)
+        with self.assertRaises(ValueError):
+            screener.search([{"range": {"per": {"lte": 10}}}], [], None, 10)
+
+
+class ScreenerPlanTests(SimpleTestCase):
+    """숫자 조건 파서와 프리셋 적용 규칙."""
+
+    def test_parse_conditions(self):
+        cases = [
+            ("PER 10 이하, EPS 1000 이상, PBR 0.5~1 국내 10개",
+             [("per", "lte", 10.0), ("eps", "gte", 1000.0), ("pbr", "gte", 0.5), ("pbr", "lte", 1.0)], []),
+            ("현재가 5만원 이하 per 15 미만", [("price", "lte", 50000.0), ("per", "lt", 15.0)], []),
+            ("nasdaq per under 20 eps > 0 top 3", [("per", "lt", 20.0), ("eps", "gt", 0.0)], []),
+            ("주가수익비율 8배 이하", [("per", "lte", 8.0)], []),
+            ("저PER 흑자 종목", [("eps", "gt", 0.0)], [("per", "asc")]),
+            ("EPS 1000 이상이면서 가장 낮은 PER", [("eps", "gte", 1000.0)], [("per", "asc")]),
+            ("PER 낮은 EPS 1000 이상", [("eps", "gte", 1000.0)], [("per", "asc")]),
+        ]
+        for query, conditions, sorts in cases:
+            with self.subTest(query=query):
+                self.assertEqual(parse_conditions(query), (conditions, sorts))
+
+    def test_explicit_conditions_skip_presets(self):
+        plan = compile_plan("PBR 1 미만 저평가 국내 10개")
+        self.assertEqual(plan["preset"], "custom")
+        self.assertEqual(plan["filters"], [{"term": {"product_type": "국내주식"}}, {"range": {"pbr": {"lt": 1.0}}}])
+        self.assertEqual(plan["sorts"][0], {"pbr": {"order": "asc"}})
+        self.assertEqual(plan["top_n"], 10)
+        # 프리셋 키워드는 종합 점수 가중치에만 남는다
+        self.assertEqual(plan["score_profile"], "value")
+
+        plan = compile_plan("장기 안정 PER 10 이하")
+        self.assertEqual(plan["filters"], [{"term": {"product_type": "국내주식"}}, {"range": {"per": {"lte": 10.0}}}])
+
+    def test_pbr_condition_is_not_a_value_keyword(self):
+        plan = compile_plan("pbr 1 이하 종목")
+        self.assertEqual(plan["preset"], "custom")
+        self.assertIsNone(plan["score_profile"])
+
+    def test_presets_without_conditions(self):
+        cases = [
+            ("장기적으로 안정적인 국내주식 상위 5개", "stable", "국내주식", {"per": {"gte": 5, "lte": 20}}),
+            ("해외 성장주 추천", "growth", "해외주식", {"perx": {"gte": 15, "lte": 40}}),
+            ("저평가 종목", "value", "국내주식", {"pbr": {"gte": 0, "lt": 1.0}}),
+            ("PBR 가장 낮은 종목", "default", "국내주식", {"pbr": {"gte": 0}}),
+        ]
+        for query, preset, market, range_filter in cases:
+            with self.subTest(query=query):
+                plan = compile_plan(query)
+                self.assertEqual((plan["preset"], plan["market"]), (preset, market))
+                self.assertIn({"range": range_filter}, plan["filters"])
+
+    def test_annuity_plan(self):
+        plan = compile_plan("보증이율 2% 이상 연금 수익률 높은 순")
+        self.assertEqual(plan["market"], "연금")
+        self.assertIn({"range": {"guar_rate": {"gte": 2.0}}}, plan["filters"])
+        self.assertEqual(plan["sorts"], [{"avg_prft_rate": {"order": "desc"}}])
+        self.assertEqual(plan["ranking"], "lexicographic")
+
+
+_TSV_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# TSV 덤프의 열 번호 → 스냅샷 문자열 필드 (숫자 컬럼은 엔티티 추출에 쓰지 않는다)
+_TSV_TEXT_COLUMNS = {
+    "krx_stock_info": ("krx_stock_info.tsv", {"bstp_kor_isnm": 1, "stck_shrn_iscd": 7, "prdt_abrv_name": 8}),
+    "nasdaq_stock_info": ("nasdaq_stock_info.tsv", {"code": 1, "e_icod": 2, "prdt_abrv_name": 6}),
+}
+
+
+def _markets_from_tsv():
+    markets = {}
+    for table, (filename, columns) in _TSV_TEXT_COLUMNS.items():
+        with open(os.path.join(_TSV_DIR, filename), encoding="utf-8", newline="") as f:
+            rows = [{"id": int(line[0]), **{field: line[i] for field, i in columns.items()}}
+                    for line in csv.reader(f, delimiter="\t")]
+        product_type, numeric, text = SCREENER_COLUMNS[table]
+        markets[product_type] = MarketColumns(table, product_type, rows, numeric, text)
+    return markets
+
+
+class EntityIndexTests(SimpleTestCase):
+    """저장소의 종목 덤프(krx/nasdaq TSV)로 만든 사전의 추출/퍼지 일치."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.index = EntityIndex(_markets_from_tsv())
+
+    def _names(self, query):
+        return [e["name"] for e in self.index.resolve(query)]
+
+    def test_blank_field_values_build_no_empty_pattern(self):
+        self.assertNotIn("", self.index.patterns)
+
+    def test_extract(self):
+        cases = [
+            ("삼성전자 정보 알려줘", ["삼성전자"]),
+            ("삼성전자랑 SK하이닉스 비교", ["삼성전자", "SK하이닉스"]),
+            ("005930 주가", ["삼성전자"]),
+            ("ON 주가", ["온 세미컨덕터"]),
+            ("it is on sale", []),
+        ]
+        for query, names in cases:
+            with self.subTest(query=query):
+                self.assertEqual([m["entity"]["name"] for m in self.index.extract(query)], names)
+
+    def test_fuzzy_typo(self):
+        self.assertEqual(self._names("삼성전지 주가"), ["삼성전자"])
+        self.assertEqual(self._names("TSLAA 주가"), ["테슬라"])
+
+    def test_fuzzy_ignores_short_and_indicator_terms(self):
+        for query in ("PER 10 이하 종목", "it is on sale", "intel price", "EPS 높은 순", "종목 정보"):
+            with self.subTest(query=query):
+                self.assertEqual(self._names(query), [])
+
+
+class IntentRouterTests(SimpleTestCase):
+    """규칙 단계 라우팅 (임베딩 단계는 끄고, 종목 사전은 TSV 덤프로 만든다)."""
+
+    CASES = [
+        # 예·적금에 붙은 시장 표현은 주식 신호가 아니다
+        ("국내 적금 추천", "rag"),
+        ("10개 추천해줘 국내 예금", "rag"),
+        ("해외 저축 상품 있어?", "rag"),
+        ("해외 주식 추천해줘", "screener"),
+        ("미국 주식 10개 추천", "screener"),
+        ("PER 10 이하 국내주식 상위 5개", "screener"),
+        ("PBR 1 미만 저평가 종목 추천해줘", "screener"),
+        ("EPS 높은 해외주식 10개 골라줘", "screener"),
+        ("장기적으로 안정적인 국내주식 추천", "screener"),
+        ("성장주 위주로 미국 주식 추천해줘", "screener"),
+        ("보증이율 2% 이상 연금 상품", "screener"),
+        ("삼성전자 정보 알려줘", "lookup"),
+        ("애플 PER 얼마야", "lookup"),
+        ("삼성전자랑 애플 비교", "lookup"),
+        ("테슬라 어때?", "lookup"),
+        ("내 투자 성향 뭐야?", "profile"),
+        ("지금까지 입력한 내용 요약해줘", "profile"),
+        ("금리 높은 정기예금 추천해줘", "rag"),
+        ("노후 대비 연금저축 상품 추천", "rag"),
+        ("비대면 가입 가능한 적금 있어?", "rag"),
+        ("안녕 반가워", "chitchat"),
+        ("PBR이 무슨 뜻이야?", "chitchat"),
+        ("예금이랑 적금 차이", "chitchat"),
+        # 규칙이 확정하지 못하면 에이전트로 위임
+        ("삼성전자 같은 종목 추천", "agent"),
+        ("요즘 경제 어때", "agent"),
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        resolver = mock.Mock()
+        resolver.index.return_value = EntityIndex(_markets_from_tsv())
+        cls._patches = [
+            mock.patch.object(intent_router, "ENTITY_RESOLVER", resolver),
+            mock.patch.object(intent_router, "ROUTER_USE_EMBEDDINGS", False),
+            mock.patch.object(intent_router, "ROUTER_ENABLED", True),
+        ]
+        for patch in cls._patches:
+            patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in cls._patches:
+            patch.stop()
+        super().tearDownClass()
+
+    def test_routing_table(self):
+        for query, intent in self.CASES:
+            with self.subTest(query=query):
+                self.assertEqual(intent_router.route_intent(query)["intent"], intent)
+
+
+class ProfileConflictTests(SimpleTestCase):
+    """두 세션에 충돌이 동시에 대기 중일 때 각자 자기 충돌만 반영되는지 (공용 캐시 키를 쓰지 않는다)."""
+
+    def setUp(self):
+        self.sessions = {"s-a": {}, "s-b": {}}
+        self.users = {"a@x.com": mock.Mock(age=20), "b@x.com": mock.Mock(age=40)}
+        users = mock.Mock()
+        users.get.side_effect = lambda email: self.users[email]
+        patches = [
+            mock.patch("chat.services.get_session_data", side_effect=lambda sid: dict(self.sessions[sid])),
+            mock.patch("chat.services.set_session_data", side_effect=self.sessions.__setitem__),
+            mock.patch("chat.services.User", mock.Mock(objects=users)),
+            # 공용 캐시에는 마지막에 생긴 b 의 충돌만 남아 있다
+            mock.patch("chat.services.pop_conflict_pending", return_value={"age": 50}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _consumer(self, session_id, username):
+        consumer = ProfileChatConsumer()
+        consumer.session_id, consumer.username, consumer.pending_conflict = session_id, username, None
+        consumer._push = mock.AsyncMock()
+        return consumer
+
+    def test_each_connection_applies_its_own_conflict(self):
+        a, b = self._consumer("s-a", "a@x.com"), self._consumer("s-b", "b@x.com")
+        with mock.patch("chat.consumers.database_sync_to_async", lambda func: sync_to_async(func)):
+            async_to_sync(a._on_task_event)("t-a", "conflict", {"field": "age", "value": 30})
+            async_to_sync(b._on_task_event)("t-b", "conflict", {"field": "age", "value": 50})
+            async_to_sync(a._on_conflict_choice)("yes")
+            async_to_sync(b._on_conflict_choice)("yes")
+
+        self.assertEqual(self.sessions, {"s-a": {"age": 30}, "s-b": {"age": 50}})
+        self.assertEqual((self.users["a@x.com"].age, self.users["b@x.com"].age), (30, 50))
+        self.assertIsNone(a.pending_conflict)
+
+    def test_http_path_falls_back_to_shared_cache(self):
+        ChatService.resolve_profile_conflict("s-b", "yes", "b@x.com")
+        self.assertEqual(self.sessions["s-b"], {"age": 50})
+
+    def test_no_keeps_profile(self):
+        ChatService.resolve_profile_conflict("s-a", "no", "a@x.com", {"age": 30})
+        self.assertEqual((self.sessions["s-a"], self.users["a@x.com"].age), ({}, 20))
+
+
+class PrefixIndexTests(SimpleTestCase):
+    """자동완성 순위 (일치 품질 → 종류 → 짧은 키), 초성 질의, 상품 유형 필터."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        stocks = [{"id": 1, "prdt_abrv_name": "삼성전자", "stck_shrn_iscd": "005930"},
+                  {"id": 2, "prdt_abrv_name": "삼성전자우", "stck_shrn_iscd": "005935"},
+                  {"id": 3, "prdt_abrv_name": "삼성", "stck_shrn_iscd": "900001"}]
+        # '삼' 구간의 사전순 앞쪽을 채우는 긴 이름들
+        stocks += [{"id": 10 + n, "prdt_abrv_name": f"삼가{n:03d}", "stck_shrn_iscd": f"{100000 + n}"}
+                   for n in range(400)]
+        cls.index = PrefixIndex({
+            "krx_stock_info": stocks,
+            # 예금은 저축기간 옵션마다 행이 있다
+            "deposit": [{"id": 1, "fin_prdt_nm": "정기예금", "kor_co_nm": "우리은행"},
+                        {"id": 2, "fin_prdt_nm": "정기예금", "kor_co_nm": "우리은행"},
+                        {"id": 3, "fin_prdt_nm": "KB Star 정기예금", "kor_co_nm": "국민은행"}],
+            "annuity": [{"id": 1, "fin_prdt_nm": "연금저축보험", "kor_co_nm": "삼성생명"}],
+        })
+
+    def _labels(self, query, limit=5, product_type=None):
+        return [e["label"] for e in self.index.suggest(query, limit, product_type)]
+
+    def test_short_prefix_ranks_whole_range(self):
+        self.assertEqual(self._labels("삼", 2), ["삼성", "삼성전자"])
+        self.assertEqual(self._labels("ㅅ", 2), ["삼성", "삼성전자"])
+
+    def test_ranking(self):
+        # 전체 일치 → 이름 맨 앞 접두어 → 단어 시작 접두어, 중복 행은 한 번만
+        self.assertEqual(self._labels("정기예금"), ["정기예금", "KB Star 정기예금"])
+        self.assertEqual(self._labels("star"), ["KB Star 정기예금"])
+        # 이름 일치가 회사명 일치보다 앞선다
+        self.assertEqual(self._labels("삼성생", 5), ["연금저축보험"])
+        self.assertEqual(self._labels("삼성", 4), ["삼성", "삼성전자", "삼성전자우", "연금저축보험"])
+        # 코드 접두어는 코드 순서
+        self.assertEqual(self._labels("00593"), ["삼성전자", "삼성전자우"])
+
+    def test_chosung(self):
+        self.assertEqual(self._labels("ㅅㅅㅈㅈ"), ["삼성전자", "삼성전자우"])
+        self.assertEqual(self._labels("삼성ㅈ"), ["삼성전자", "삼성전자우"])
+        # 조합형 초성(U+1109 ᄉ)도 같은 결과
+        self.assertEqual(self._labels("ᄉᄉᄌᄌ"), ["삼성전자", "삼성전자우"])
+        self.assertEqual(self._labels("ㅈㄱㅇㄱ"), ["정기예금", "KB Star 정기예금"])
+
+    def test_product_type_filter(self):
+        self.assertEqual(self._labels("삼성", 5, "연금"), ["연금저축보험"])
+        self.assertEqual(self._labels("삼성", 2, "국내주식"), ["삼성", "삼성전자"])
+        self.assertEqual(self._labels("정기", 5, "국내주식"), [])
+        self.assertEqual(self._labels("삼성", 5, "적금"), [])
+        self.assertEqual(self.index.suggest("삼성", 5, "국내주식")[0]["product_type"], "국내주식")
+
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "chat-tests"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SingleFlightTests(SimpleTestCase):
+    """워커 간 요청 합치기 (Redis 대신 LocMem — 스레드가 같은 저장소를 본다)."""
+
+    KEY = "test:flight"
+    LOCK = f"sf:lock:{KEY}"
+
+    def setUp(self):
+        cache.clear()
+
+    def _publish_later(self, token, outcome, delay=0.1):
+        # 다른 워커의 leader 가 끝나는 상황: 결과를 올리고 락을 푼다
+        def finish():
+            time.sleep(delay)
+            cache.set(f"sf:result:{self.KEY}:{token}", outcome, 30)
+            cache.delete(self.LOCK)
+        thread = threading.Thread(target=finish)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_leader_runs_once_and_releases_lock(self):
+        fn = mock.Mock(return_value={"answer": 1})
+        self.assertEqual(single_flight(self.KEY, fn), {"answer": 1})
+        fn.assert_called_once_with()
+        self.assertIsNone(cache.get(self.LOCK))
+
+    def test_leader_error_propagates_and_releases_lock(self):
+        with self.assertRaises(RuntimeError):
+            single_flight(self.KEY, mock.Mock(side_effect=RuntimeError("boom")))
+        self.assertIsNone(cache.get(self.LOCK))
+
+    def test_concurrent_callers_share_the_leader_result(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(single_flight(self.KEY, slow)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(single_flight(self.KEY, slow)))
+                     for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(results, ["value"] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_follower_runs_locally_when_leader_failed(self):
+        cache.set(self.LOCK, "leader", 60)
+        self._publish_later("leader", {"ok": False, "error": "RuntimeError('boom')"})
+        fn = mock.Mock(return_value="local")
+        self.assertEqual(single_flight(self.KEY, fn, wait_timeout=5), "local")
+        fn.assert_called_once_with()
+
+    def test_follower_runs_locally_after_wait_timeout(self):
+        cache.set(self.LOCK, "stuck", 60)
+        fn = mock.Mock(return_value="local")
+        started = time.monotonic()
+        self.assertEqual(single_flight(self.KEY, fn, wait_timeout=0.2), "local")
+        self.assertLess(time.monotonic() - started, 2)
+        fn.assert_called_once_with()
+        # 남의 락은 건드리지 않는다
+        self.assertEqual(cache.get(self.LOCK), "stuck")
+
+    def test_result_key_is_scoped_to_the_leader_token(self):
+        # 이전 flight 의 결과가 남아 있어도 지금 leader 의 결과만 읽는다
+        cache.set(f"sf:result:{self.KEY}:previous", {"ok": True, "value": "stale"}, 30)
+        cache.set(self.LOCK, "current", 60)
+        self._publish_later("current", {"ok": True, "value": "fresh"})
+        fn = mock.Mock(return_value="local")
+        self.assertEqual(single_flight(self.KEY, fn, wait_timeout=5), "fresh")
+        fn.assert_not_called()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CompletionCacheTests(SimpleTestCase):
+    """내용 주소 기반 완료 캐시 키와 create_completion 의 캐시 사용 조건."""
+
+    MESSAGES = [{"role": "user", "content": "예금 추천"}]
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(
+            OptimizedOpenAIClient, "_complete",
+            side_effect=lambda messages, model, kwargs: {"model": model, "content": "답변", "usage": {}},
+        )
+        self.complete = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _key(self, model="gpt-4o-mini", messages=None, **params):
+        return make_cache_key(model, messages or self.MESSAGES, params)
+
+    def test_non_semantic_params_are_excluded(self):
+        base = self._key(temperature=0, max_tokens=100)
+        self.assertEqual(base, self._key(max_tokens=100, temperature=0, timeout=5, user="u1", stream=False,
+                                         extra_headers={"x": "1"}, extra_query={"q": 1}, extra_body={"b": 1}))
+        # 값이 None 인 파라미터는 지정하지 않은 것과 같다
+        self.assertEqual(base, self._key(temperature=0, max_tokens=100, top_p=None))
+
+    def test_semantic_params_change_the_key(self):
+        base = self._key(temperature=0, max_tokens=100)
+        for changed in (self._key(temperature=0.5, max_tokens=100),
+                        self._key(temperature=0, max_tokens=200),
+                        self._key(temperature=0, max_tokens=100, response_format={"type": "json_object"}),
+                        self._key("gpt-4o", temperature=0, max_tokens=100),
+                        self._key(messages=[{"role": "user", "content": "적금 추천"}], temperature=0, max_tokens=100)):
+            self.assertNotEqual(base, changed)
+
+    def test_temperature_zero_is_cached(self):
+        client = OptimizedOpenAIClient()
+        first = client.create_completion(self.MESSAGES, model="gpt-4o-mini", temperature=0)
+        second = client.create_completion(self.MESSAGES, model="gpt-4o-mini", temperature=0, timeout=3)
+        self.assertEqual(self.complete.call_count, 1)
+        self.assertFalse(first.cached)
+        self.assertTrue(second.cached)
+        self.assertEqual(second.choices[0].message.content, "답변")
+
+    def test_nonzero_temperature_skips_cache_unless_asked(self):
+        client = OptimizedOpenAIClient()
+        with mock.patch("chat.gpt.openai_client.get_cached") as get_cached:
+            client.create_completion(self.MESSAGES, model="gpt-4o-mini", temperature=0.7)
+            client.create_completion(self.MESSAGES, model="gpt-4o-mini", temperature=0.7)
+            # temperature 를 주지 않으면 API 기본값(1)으로 보고 캐시하지 않는다
+            client.create_completion(self.MESSAGES, model="gpt-4o-mini")
+        get_cached.assert_not_called()
+        self.assertEqual(self.complete.call_count, 3)
+
+        client.create_completion(self.MESSAGES, model="gpt-4o-mini", temperature=0.7, use_cache=True)
+        self.assertTrue(client.create_completion(self.MESSAGES, model="gpt-4o-mini", temperature=0.7,
+                                                 use_cache=True).cached)
+        self.assertEqual(self.complete.call_count, 4)
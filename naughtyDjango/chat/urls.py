@@ -1,18 +1,44 @@
+from django.conf import settings
 from django.urls import path
-from .views.chat_views import chat_with_gpt, get_task_status, handle_profile_conflict, end_chat_session
+from .views.chat_views import chat_with_gpt, get_task_status, wait_task_status, handle_profile_conflict, end_chat_session
 from .views.recommendation_views import recommend_products
-from .views.opensearch_views import api_index_opensearch
+from .views.opensearch_views import api_index_opensearch, api_index_opensearch_status
+from .views.autocomplete_views import autocomplete
+from .views.stream_views import stream_task_events
 
 urlpatterns = [
     # 챗봇 관련
     path('chat_profile_gather/', chat_with_gpt, name='chat_profile_gather'), # (1) 챗봇 서비스 시작
     path('task/<str:task_id>/', get_task_status, name='get_task_status'), # (2) 챗봇과 대화
+    path('task/<str:task_id>/wait/', wait_task_status, name='wait_task_status'), # (2-1) 작업 완료 long-poll
+    path('stream/<str:task_id>/', stream_task_events, name='stream_task_events'), # (2-2) 작업 응답 스트림 (SSE)
     path('session/<str:session_id>/end/', end_chat_session, name='end_chat_session'), # (3) 챗봇 세션 종료
     path('profile/conflict/', handle_profile_conflict, name='handle_profile_conflict'), # (4) 프로필 충돌 처리
 
     # RAG 관련
     path('chat/', recommend_products, name='chat'),
+    path('autocomplete/', autocomplete, name='autocomplete'),
     
     # OpenSearch
     path('opensearch/index/', api_index_opensearch, name='api_index_opensearch'),
-]
\ No newline at end of file
+    path('opensearch/index/<str:task_id>/', api_index_opensearch_status, name='api_index_opensearch_status'),
+]
+
+# ASGI 모드: 오래 기다리는 엔드포인트는 같은 경로/응답 형식의 async 뷰로 교체
+if settings.SERVER_MODE == 'asgi':
+    from .views.async_views import (
+        chat_with_gpt_async, get_task_status_async, wait_task_status_async,
+        stream_task_events_async, recommend_products_async,
+    )
+
+    ASYNC_VIEWS = {
+        'chat_profile_gather': chat_with_gpt_async,
+        'get_task_status': get_task_status_async,
+        'wait_task_status': wait_task_status_async,
+        'stream_task_events': stream_task_events_async,
+        'chat': recommend_products_async,
+    }
+    urlpatterns = [
+        path(str(p.pattern), ASYNC_VIEWS[p.name], name=p.name) if p.name in ASYNC_VIEWS else p
+        for p in urlpatterns
+    ]
\ No newline at end of file
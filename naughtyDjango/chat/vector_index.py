@@ -0,0 +1,242 @@
+# chat/vector_index.py
+"""
+로컬 벡터 인덱스 (메모리 매핑 기반 k-NN).
+
+상품 카탈로그는 MySQL 테이블 5개 규모라 전체 임베딩 행렬을 파일 하나로 두고
+모든 gunicorn/Celery 프로세스가 읽기 전용 mmap 으로 같은 페이지 캐시를 공유한다.
+
+디렉터리 구성 (LOCAL_VECTOR_INDEX_DIR → "<dir>.v<ns>" 심볼릭 링크):
+- vectors.bin : L2 정규화된 임베딩 행렬 (float32 또는 float16, row-major)
+- docs.jsonl  : 행 순서대로의 메타데이터 (id, text, product_type, table)
+- meta.json   : {"dim", "count", "dtype", "model", "built_at"}
+
+검색은 정규화 벡터의 내적(= 코사인 유사도) + product_type 마스크 + argpartition top-k.
+
+교체는 버전 디렉터리를 만들고 심볼릭 링크를 rename 으로 바꿔 끼우므로
+LOCAL_VECTOR_INDEX_DIR 이 비어 있는 순간이 없다. 읽는 쪽은 링크를 한 번 풀어(realpath) 그 버전에서만 읽는다.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "var", "vector_index")
+LOCAL_VECTOR_INDEX_DIR = os.getenv("LOCAL_VECTOR_INDEX_DIR", _DEFAULT_DIR)
+LOCAL_VECTOR_DTYPE = os.getenv("LOCAL_VECTOR_DTYPE", "float32")  # float32 | float16
+
+VECTORS_FILE = "vectors.bin"
+DOCS_FILE = "docs.jsonl"
+META_FILE = "meta.json"
+
+# 한 번에 내적을 계산할 행 수 (float16 → float32 변환 임시 메모리 상한)
+_SCORE_BLOCK = 8192
+
+
+class LocalVectorIndexWriter:
+    """
+    인덱싱 시점에 행을 스트리밍으로 추가하고, commit() 에서 원자적으로 교체한다.
+    작성 중에는 "<dir>.tmp-<pid>" 에 쓰므로 읽는 프로세스는 항상 완성된 인덱스만 본다.
+    """
+
+    def __init__(self, path: str = LOCAL_VECTOR_INDEX_DIR, dim: int = 1536,
+                 dtype: str = LOCAL_VECTOR_DTYPE, model: str = None):
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.model = model
+        self.count = 0
+        self._tmp = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        os.makedirs(self._tmp, exist_ok=True)
+        self._vec_fp = open(os.path.join(self._tmp, VECTORS_FILE), "wb")
+        self._doc_fp = open(os.path.join(self._tmp, DOCS_FILE), "w", encoding="utf-8")
+
+    def add(self, vectors: Iterable, docs: Iterable[dict]) -> None:
+        mat = np.asarray(list(vectors), dtype=np.float32)
+        if mat.size == 0:
+            return
+        mat = mat.reshape(-1, self.dim)
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._vec_fp.write((mat / norms).astype(self.dtype).tobytes())
+        for doc in docs:
+            self._doc_fp.write(json.dumps(doc, ensure_ascii=False, default=str) + "\n")
+        self.count += mat.shape[0]
+
+    def commit(self) -> None:
+        self._vec_fp.close()
+        self._doc_fp.close()
+        with open(os.path.join(self._tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": self.dim,
+                "count": self.count,
+                "dtype": self.dtype.name,
+                "model": self.model,
+                "built_at": time.time(),
+            }, f)
+        # 버전 디렉터리로 옮긴 뒤 심볼릭 링크를 원자적으로 교체 (mmap 중인 프로세스는 이전 inode 를 계속 사용)
+        version = f"{self.path}.v{time.time_ns()}"
+        os.replace(self._tmp, version)
+        previous = None
+        if os.path.islink(self.path):
+            previous = os.path.realpath(self.path)
+        elif os.path.exists(self.path):
+            # 링크 도입 전 레이아웃(실제 디렉터리): 한 번만 옮겨 둔다
+            previous = f"{self.path}.old-{os.getpid()}"
+            os.replace(self.path, previous)
+        link_tmp = f"{self.path}.link-{os.getpid()}"
+        if os.path.lexists(link_tmp):
+            os.remove(link_tmp)
+        os.symlink(os.path.basename(version), link_tmp)
+        os.replace(link_tmp, self.path)
+        if previous and previous != version:
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def abort(self) -> None:
+        for fp in (self._vec_fp, self._doc_fp):
+            try:
+                fp.close()
+            except Exception:
+                pass
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def merge_local_indexes(part_paths: List[str], path: str = LOCAL_VECTOR_INDEX_DIR,
+                        dtype: str = LOCAL_VECTOR_DTYPE, model: str = None) -> int:
+    """
+    분할 색인(Celery 하위 작업)이 각각 기록한 부분 인덱스를 순서대로 이어 붙여 path 에 커밋한다.
+    부분 인덱스는 이미 정규화돼 있으므로 dtype 이 같으면 바이트를 그대로 복사한다.
+    """
+    dim = None
+    parts = []
+    for part in part_paths:
+        with open(os.path.join(part, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if dim is not None and meta["dim"] != dim:
+            raise ValueError(f"dimension mismatch in {part}: {meta['dim']} != {dim}")
+        dim = meta["dim"]
+        parts.append((part, meta))
+
+    writer = LocalVectorIndexWriter(path=path, dim=dim or 1536, dtype=dtype, model=model)
+    try:
+        for part, meta in parts:
+            if not meta["count"]:
+                continue
+            vec_path = os.path.join(part, VECTORS_FILE)
+            if np.dtype(meta["dtype"]) == writer.dtype:
+                with open(vec_path, "rb") as src:
+                    shutil.copyfileobj(src, writer._vec_fp, 1 << 20)
+            else:
+                mat = np.memmap(vec_path, dtype=np.dtype(meta["dtype"]), mode="r", shape=(meta["count"], meta["dim"]))
+                for start in range(0, meta["count"], _SCORE_BLOCK):
+                    writer._vec_fp.write(np.asarray(mat[start:start + _SCORE_BLOCK]).astype(writer.dtype).tobytes())
+            with open(os.path.join(part, DOCS_FILE), encoding="utf-8") as src:
+                shutil.copyfileobj(src, writer._doc_fp)
+            writer.count += meta["count"]
+        writer.commit()
+    except Exception:
+        writer.abort()
+        raise
+    return writer.count
+
+
+class LocalVectorIndex:
+    """읽기 전용 mmap 인덱스. meta.json 이 바뀌면 다음 검색에서 자동으로 다시 연다."""
+
+    def __init__(self, path: str = LOCAL_VECTOR_INDEX_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        # (matrix, docs, type_codes, type_ids) — 한 번에 교체해 검색 중 일관성 유지
+        self._state = (None, [], None, {})
+
+    def available(self) -> bool:
+        return os.path.exists(os.path.join(self.path, META_FILE))
+
+    def _load_if_changed(self) -> None:
+        try:
+            self._load_version(os.path.realpath(self.path))
+        except FileNotFoundError:
+            # 링크를 푼 직후 그 버전이 교체·삭제된 경우: 링크를 다시 풀어 한 번 더 시도
+            try:
+                self._load_version(os.path.realpath(self.path))
+            except FileNotFoundError:
+                if self._state[0] is None:
+                    raise
+                # 새 버전을 못 읽으면 이미 열어 둔 인덱스로 계속 검색
+                logger.warning(f"local vector index reload failed, keeping loaded version: {self.path}")
+
+    def _load_version(self, base: str) -> None:
+        meta_path = os.path.join(base, META_FILE)
+        stamp = (base, os.stat(meta_path).st_mtime_ns)
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            count, dim = meta["count"], meta["dim"]
+            matrix = np.memmap(
+                os.path.join(base, VECTORS_FILE),
+                dtype=np.dtype(meta["dtype"]),
+                mode="r",
+                shape=(count, dim),
+            ) if count else np.zeros((0, dim), dtype=np.float32)
+            with open(os.path.join(base, DOCS_FILE), encoding="utf-8") as f:
+                docs = [json.loads(line) for line in f]
+
+            type_ids: Dict[str, int] = {}
+            codes = np.empty(len(docs), dtype=np.int16)
+            for i, d in enumerate(docs):
+                codes[i] = type_ids.setdefault(d.get("product_type"), len(type_ids))
+
+            self._state = (matrix, docs, codes, type_ids)
+            self._stamp = stamp
+            logger.info(f"local vector index loaded: {count} rows, dim={dim}, dtype={meta['dtype']} ({base})")
+
+    def search(self, vector, top_k: int = 5, product_types: Optional[List[str]] = None) -> List[dict]:
+        self._load_if_changed()
+        matrix, docs, type_codes, type_ids = self._state
+        if not len(docs):
+            return []
+
+        q = np.array(vector, dtype=np.float32)
+        q /= (np.linalg.norm(q) or 1.0)
+
+        scores = np.empty(len(docs), dtype=np.float32)
+        for start in range(0, len(docs), _SCORE_BLOCK):
+            block = np.asarray(matrix[start:start + _SCORE_BLOCK], dtype=np.float32)
+            scores[start:start + len(block)] = block @ q
+
+        if product_types:
+            wanted = [type_ids[t] for t in product_types if t in type_ids]
+            if not wanted:
+                return []
+            scores[~np.isin(type_codes, wanted)] = -np.inf
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "id": docs[i].get("id"),
+                "score": float(scores[i]),
+                "text": (docs[i].get("text") or "").replace("\n", " "),
+                "type": docs[i].get("product_type"),
+                "table": docs[i].get("table"),
+            }
+            for i in top
+            if np.isfinite(scores[i])
+        ]
+
+
+# 프로세스 단일 인스턴스
+LOCAL_VECTOR_INDEX = LocalVectorIndex()
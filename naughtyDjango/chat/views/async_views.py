@@ -0,0 +1,188 @@
+# chat/views/async_views.py
+"""
+ASGI 모드(SERVER_MODE=asgi, uvicorn 워커)용 async 뷰.
+
+오래 기다리는 요청(작업 완료 대기, long-poll, SSE)이 워커 프로세스/스레드를 붙잡지 않도록
+대기는 redis.asyncio(pub/sub, XREAD BLOCK)로 이벤트 루프에서 하고,
+짧은 동기 호출(ORM, Celery 큐잉, 결과 백엔드 조회)만 sync_to_async 로 스레드 풀에 넘긴다.
+응답 형식은 sync 뷰와 같다 (같은 응답 생성 함수를 공유).
+
+DRF 의 @api_view 는 async 뷰를 지원하지 않으므로 Django 함수 뷰로 작성한다 (Swagger 문서는 sync 뷰 기준).
+"""
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from celery.result import AsyncResult
+from django.http import HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from main.utils.custom_response import CustomResponse
+from main.constants.error_codes import GeneralErrorCode
+from main.constants.success_codes import GeneralSuccessCode
+from chat.gpt_service import get_session_id
+from chat.services import ChatService
+from chat.stream_events import (
+    TERMINAL_EVENTS, already_delivered, aread_events, aterminal_event_id, emit_missing_result, sse_message,
+)
+from chat.task_events import CHAT_TASK_WAIT_SECONDS, TASK_LONGPOLL_MAX_SECONDS, async_wait_for_task
+from chat.tasks import process_chat_async
+from chat.views.chat_views import _chat_task_response, _task_status_response
+from chat.views.recommendation_views import enqueue_recommendation
+from chat.views.stream_views import SSE_HEARTBEAT_SECONDS, SSE_MAX_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def _in_thread(func):
+    # 스레드 풀에서 병렬 실행 (thread_sensitive=True 면 모든 호출이 한 스레드로 직렬화된다)
+    return sync_to_async(func, thread_sensitive=False)
+
+
+def _internal_error() -> CustomResponse:
+    return CustomResponse(
+        is_success=False,
+        code=GeneralErrorCode.INTERNAL_SERVER_ERROR[0],
+        message=GeneralErrorCode.INTERNAL_SERVER_ERROR[1],
+        result={},
+        status=GeneralErrorCode.INTERNAL_SERVER_ERROR[2],
+    )
+
+
+@csrf_exempt
+async def chat_with_gpt_async(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    started = time.time()
+    try:
+        body = json.loads(request.body)
+        username = body.get("username", "")
+        session_id = body.get("session_id") or get_session_id(body)
+        message = (body.get("message") or "").strip()
+        logger.info(
+            "chat_with_gpt_async: received request",
+            extra={"session_id": session_id, "username": username, "msg_len": len(message)}
+        )
+
+        if not message:
+            return CustomResponse(
+                is_success=False,
+                code=GeneralErrorCode.MESSAGE_REQUIRED[0],
+                message=GeneralErrorCode.MESSAGE_REQUIRED[1],
+                result={},
+                status=GeneralErrorCode.MESSAGE_REQUIRED[2],
+            )
+
+        # ORM 호출은 Django 권장대로 thread_sensitive(기본값)로 실행
+        user = await sync_to_async(ChatService.get_or_validate_user)(username)
+        if not user:
+            return CustomResponse(
+                is_success=False,
+                code=GeneralErrorCode.USER_NOT_FOUND[0],
+                message=GeneralErrorCode.USER_NOT_FOUND[1],
+                result={},
+                status=GeneralErrorCode.USER_NOT_FOUND[2],
+            )
+
+        await sync_to_async(ChatService.save_user_message)(session_id, username, message)
+
+        quick = ChatService.maybe_quick_reply(message)
+        if quick:
+            await sync_to_async(ChatService.save_assistant_message)(session_id, username, quick)
+            return CustomResponse(
+                is_success=True,
+                code=GeneralSuccessCode.OK[0],
+                message=GeneralSuccessCode.OK[1],
+                result={"response": quick, "session_id": session_id},
+                status=GeneralSuccessCode.OK[2],
+            )
+
+        task = await _in_thread(process_chat_async.delay)(session_id, username, message, "")
+        logger.info(
+            "chat_with_gpt_async: task_enqueued",
+            extra={"task_id": task.id, "session_id": session_id, "username": username}
+        )
+
+        # 완료 알림을 이벤트 루프에서 기다린다 (스레드 점유 없음)
+        await async_wait_for_task(task.id, CHAT_TASK_WAIT_SECONDS)
+        return await _in_thread(_chat_task_response)(task.id, session_id, username)
+
+    except Exception as e:
+        logger.error(f"chat_with_gpt_async 에러: {str(e)}")
+        return _internal_error()
+    finally:
+        logger.info(f"[채팅 완료] {time.time() - started:.2f}초")
+
+
+async def get_task_status_async(request, task_id):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    return await _in_thread(_task_status_response)(task_id, lambda: AsyncResult(task_id))
+
+
+async def wait_task_status_async(request, task_id):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    try:
+        timeout = float(request.GET.get("timeout", TASK_LONGPOLL_MAX_SECONDS))
+    except (TypeError, ValueError):
+        timeout = TASK_LONGPOLL_MAX_SECONDS
+    timeout = max(0.0, min(timeout, TASK_LONGPOLL_MAX_SECONDS))
+
+    await async_wait_for_task(task_id, timeout)
+    return await _in_thread(_task_status_response)(task_id, lambda: AsyncResult(task_id))
+
+
+@csrf_exempt
+async def recommend_products_async(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    try:
+        body = json.loads(request.body or "{}")
+        # 검증 + Celery 큐잉 (브로커 왕복 1회)
+        return await _in_thread(enqueue_recommendation)(body)
+    except Exception as e:
+        return CustomResponse(
+            is_success=False,
+            code=GeneralErrorCode.INTERNAL_SERVER_ERROR[0],
+            message=GeneralErrorCode.INTERNAL_SERVER_ERROR[1],
+            result={"error": repr(e)},
+            status=GeneralErrorCode.INTERNAL_SERVER_ERROR[2],
+        )
+
+
+async def _aevent_stream(task_id: str, last_id: str):
+    started = time.monotonic()
+    yield "retry: 3000\n\n"
+    while time.monotonic() - started < SSE_MAX_SECONDS:
+        block_ms = int(min(SSE_HEARTBEAT_SECONDS, SSE_MAX_SECONDS - (time.monotonic() - started)) * 1000)
+        events = await aread_events(task_id, last_id, block_ms=max(1, block_ms))
+        for event_id, event, data in events:
+            last_id = event_id
+            yield sse_message(event, data, event_id)
+            if event in TERMINAL_EVENTS:
+                return
+        if events:
+            continue
+
+        result = AsyncResult(task_id)
+        if await _in_thread(result.ready)() and await _in_thread(emit_missing_result)(
+                task_id, result.state, result.result):
+            continue
+        yield ": keep-alive\n\n"
+    yield sse_message("timeout", {"message": "스트림 연결 시간이 지났습니다. 다시 연결해 주세요."})
+
+
+async def stream_task_events_async(request, task_id):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_id") or "0"
+    logger.info("stream_task_events_async: connected", extra={"task_id": task_id, "last_id": last_id})
+    if last_id != "0" and already_delivered(await aterminal_event_id(task_id), last_id):
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(_aevent_stream(task_id, last_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
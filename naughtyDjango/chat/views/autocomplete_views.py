@@ -0,0 +1,88 @@
+# chat/views/autocomplete_views.py
+import logging
+import time
+
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+
+from main.utils.custom_response import CustomResponse
+from main.constants.error_codes import GeneralErrorCode
+from main.constants.success_codes import GeneralSuccessCode
+from chat.rag.autocomplete import AUTOCOMPLETE, AUTOCOMPLETE_DEFAULT_LIMIT, AUTOCOMPLETE_MAX_LIMIT
+
+logger = logging.getLogger(__name__)
+
+
+@swagger_auto_schema(
+    method="get",
+    operation_description="상품명/금융회사/종목명/종목코드/티커 자동완성 (초성 검색 지원, 인메모리 접두어 색인)",
+    manual_parameters=[
+        openapi.Parameter("q", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                          description="입력 중인 문자열 (예: 삼성, ㅅㅅㅈㅈ, AAPL, 0059)"),
+        openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                          description=f"최대 결과 수 (기본값: {AUTOCOMPLETE_DEFAULT_LIMIT}, 최대 {AUTOCOMPLETE_MAX_LIMIT})"),
+        openapi.Parameter("product_type", openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          description="상품 유형 필터 (예금, 적금, 연금, 국내주식, 해외주식 중 하나)"),
+    ],
+    responses={
+        200: openapi.Response(
+            "조회 성공",
+            openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "isSuccess": openapi.Schema(type=openapi.TYPE_BOOLEAN, example=True),
+                    "code": openapi.Schema(type=openapi.TYPE_STRING, example="COMMON200"),
+                    "message": openapi.Schema(type=openapi.TYPE_STRING, example="성공적으로 처리했습니다."),
+                    "result": openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            "query": openapi.Schema(type=openapi.TYPE_STRING),
+                            "suggestions": openapi.Schema(
+                                type=openapi.TYPE_ARRAY,
+                                items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                                description="label, product_type, table, id (+ kor_co_nm / stck_shrn_iscd / code 등)",
+                            ),
+                            "took_ms": openapi.Schema(type=openapi.TYPE_NUMBER),
+                        }
+                    )
+                }
+            )
+        ),
+    }
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def autocomplete(request):
+    query = (request.query_params.get("q") or "").strip()
+    product_type = (request.query_params.get("product_type") or "").strip() or None
+    try:
+        limit = int(request.query_params.get("limit") or AUTOCOMPLETE_DEFAULT_LIMIT)
+        limit = max(1, min(AUTOCOMPLETE_MAX_LIMIT, limit))
+    except ValueError:
+        limit = AUTOCOMPLETE_DEFAULT_LIMIT
+
+    try:
+        started = time.perf_counter()
+        suggestions = AUTOCOMPLETE.suggest(query, limit, product_type) if query else []
+        return CustomResponse(
+            is_success=True,
+            code=GeneralSuccessCode.OK[0],
+            message=GeneralSuccessCode.OK[1],
+            result={
+                "query": query,
+                "suggestions": suggestions,
+                "took_ms": round((time.perf_counter() - started) * 1000, 3),
+            },
+            status=GeneralSuccessCode.OK[2],
+        )
+    except Exception as e:
+        logger.exception("autocomplete failed")
+        return CustomResponse(
+            is_success=False,
+            code=GeneralErrorCode.INTERNAL_SERVER_ERROR[0],
+            message=GeneralErrorCode.INTERNAL_SERVER_ERROR[1],
+            result={"error": str(e)},
+            status=GeneralErrorCode.INTERNAL_SERVER_ERROR[2],
+        )
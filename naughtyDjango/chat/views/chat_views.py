@@ -12,16 +12,15 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from celery.result import AsyncResult
 from django.core.management import call_command
-from chat.models import ChatMessage
-from main.models import User
 from main.utils.custom_response import CustomResponse
 from main.constants.error_codes import GeneralErrorCode
 from main.constants.success_codes import GeneralSuccessCode
 from main.utils.logging_decorator import chat_logger, api_logger
 from chat.gpt_service import get_session_id
 from chat.tasks import process_chat_async
-from chat.gpt.session_store import get_session_data, set_session_data, delete_session_data, set_conflict_pending_cache, get_conflict_pending, pop_conflict_pending
+from chat.gpt.session_store import get_session_data, delete_session_data, set_conflict_pending_cache, get_conflict_pending
 from chat.services import ChatService
+from chat.task_events import CHAT_TASK_WAIT_SECONDS, TASK_LONGPOLL_MAX_SECONDS, wait_for_task
 
 load_dotenv()
 
@@ -43,7 +42,11 @@ value_growth, risk_acceptance_level, investment_concern
 # ===== GPT 채팅 엔드포인트 =====
 @swagger_auto_schema(
     method="post",
-    operation_description="챗봇이 사용자의 프로필 정보를 수집합니다.",
+    operation_description=(
+        "챗봇이 사용자의 프로필 정보를 수집합니다. "
+        "작업이 CHAT_TASK_WAIT_SECONDS(기본 10초) 안에 끝나면 결과(completed) 또는 충돌을 바로 돌려주고, "
+        "아니면 task_id 와 함께 processing 을 돌려줍니다."
+    ),
     request_body=openapi.Schema(
         type=openapi.TYPE_OBJECT,
         properties={
@@ -67,7 +70,8 @@ value_growth, risk_acceptance_level, investment_concern
                         properties={
                             "task_id": openapi.Schema(type=openapi.TYPE_STRING, example="abc-123-def"),
                             "session_id": openapi.Schema(type=openapi.TYPE_STRING, example="session_123"),
-                            "status": openapi.Schema(type=openapi.TYPE_STRING, example="processing")
+                            "status": openapi.Schema(type=openapi.TYPE_STRING, example="processing", description="completed/processing"),
+                            "result": openapi.Schema(type=openapi.TYPE_OBJECT, description="completed 일 때 작업 결과")
                         }
                     )
                 }
@@ -204,60 +208,9 @@ def chat_with_gpt(request):
             extra={"task_id": task.id, "session_id": session_id, "username": username}
         )
         
-        # Task 결과를 폴링하여 충돌 감지
-        max_polling = 20
-        polling_count = 0
-        
-        while polling_count < max_polling:
-            result = AsyncResult(task.id)
-            
-            if result.ready():
-                if result.successful():
-                    task_result = result.get()
-                    
-                    if task_result.get("type") == "conflict_detected":
-                        field = task_result.get("field")
-                        value = task_result.get("value")
-                        
-                        set_conflict_pending_cache({field: value})
-                        conflict_data = {field: value}
-                        logger.info(
-                            "chat_with_gpt: conflict_detected",
-                            extra={"session_id": session_id, "username": username, "conflict": conflict_data}
-                        )
-                        
-                        return CustomResponse(
-                            is_success=True,
-                            code=GeneralSuccessCode.CONFLICTS[0],
-                            message=GeneralSuccessCode.CONFLICTS[1],
-                            result={
-                                "message": f"프로필 변경이 감지되었습니다: {field} = {value}",
-                                "conflict_data": conflict_data,
-                                "session_id": session_id,
-                                "requires_confirmation": True
-                            },
-                            status=GeneralSuccessCode.CONFLICTS[2],
-                        )
-                    else:
-                        break
-                else:
-                    break
-            
-            import time
-            time.sleep(0.5)
-            polling_count += 1
-        
-        return CustomResponse(
-            is_success=True,
-            code=GeneralSuccessCode.OK[0],
-            message="처리 중입니다...",
-            result={
-                "task_id": task.id,
-                "session_id": session_id,
-                "status": "processing"
-            },
-            status=GeneralSuccessCode.OK[2],
-        )
+        # 완료 알림(pub/sub)을 기다려 결과/충돌을 바로 돌려준다 (sleep 폴링 없음)
+        wait_for_task(task.id, CHAT_TASK_WAIT_SECONDS)
+        return _chat_task_response(task.id, session_id, username)
 
     except Exception as e:
         logger = logging.getLogger(__name__)
@@ -272,6 +225,64 @@ def chat_with_gpt(request):
         )
 
 
+def _chat_task_response(task_id, session_id, username):
+    """chat_with_gpt 작업의 현재 결과 응답: 충돌(COMMON2001) / 완료 / 처리 중."""
+    logger = logging.getLogger(__name__)
+    result = AsyncResult(task_id)
+    if result.ready() and result.successful():
+        task_result = result.get()
+
+        if task_result.get("type") == "conflict_detected":
+            field = task_result.get("field")
+            value = task_result.get("value")
+
+            set_conflict_pending_cache({field: value})
+            conflict_data = {field: value}
+            logger.info(
+                "chat_with_gpt: conflict_detected",
+                extra={"session_id": session_id, "username": username, "conflict": conflict_data}
+            )
+
+            return CustomResponse(
+                is_success=True,
+                code=GeneralSuccessCode.CONFLICTS[0],
+                message=GeneralSuccessCode.CONFLICTS[1],
+                result={
+                    "message": f"프로필 변경이 감지되었습니다: {field} = {value}",
+                    "conflict_data": conflict_data,
+                    "session_id": session_id,
+                    "requires_confirmation": True
+                },
+                status=GeneralSuccessCode.CONFLICTS[2],
+            )
+
+        return CustomResponse(
+            is_success=True,
+            code=GeneralSuccessCode.OK[0],
+            message=GeneralSuccessCode.OK[1],
+            result={
+                "task_id": task_id,
+                "session_id": session_id,
+                "status": "completed",
+                "result": task_result
+            },
+            status=GeneralSuccessCode.OK[2],
+        )
+
+    # 시간 안에 끝나지 않았거나 실패 → task_id 로 상태 조회(long-poll 권장)
+    return CustomResponse(
+        is_success=True,
+        code=GeneralSuccessCode.OK[0],
+        message="처리 중입니다...",
+        result={
+            "task_id": task_id,
+            "session_id": session_id,
+            "status": "processing"
+        },
+        status=GeneralSuccessCode.OK[2],
+    )
+
+
 @swagger_auto_schema(
     method="get",
     operation_description="비동기 작업 상태를 확인합니다. chat/ API 호출 후 task_id로 결과를 폴링합니다.",
@@ -339,8 +350,53 @@ def chat_with_gpt(request):
 @permission_classes([AllowAny])
 @api_logger
 def get_task_status(request, task_id):
+    return _task_status_response(task_id, lambda: AsyncResult(task_id))
+
+
+@swagger_auto_schema(
+    method="get",
+    operation_description=(
+        "비동기 작업 상태를 long-poll 로 확인합니다. 작업이 끝나는 즉시(Redis pub/sub 알림) 응답하고, "
+        "timeout 초 안에 끝나지 않으면 pending 을 돌려줍니다. 응답을 받으면 바로 다시 호출하세요."
+    ),
+    manual_parameters=[
+        openapi.Parameter(
+            'task_id',
+            openapi.IN_PATH,
+            description="비동기 작업 ID",
+            type=openapi.TYPE_STRING,
+            required=True
+        ),
+        openapi.Parameter(
+            'timeout',
+            openapi.IN_QUERY,
+            description="최대 대기 시간(초), 기본/최대 TASK_LONGPOLL_MAX_SECONDS",
+            type=openapi.TYPE_NUMBER,
+            required=False
+        ),
+    ],
+    responses={
+        200: openapi.Response("작업 상태 조회 성공 (completed/pending, get_task_status 와 동일)"),
+        404: openapi.Response("작업 없음"),
+        500: openapi.Response("작업 실패"),
+    }
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+@api_logger
+def wait_task_status(request, task_id):
+    try:
+        timeout = float(request.GET.get("timeout", TASK_LONGPOLL_MAX_SECONDS))
+    except (TypeError, ValueError):
+        timeout = TASK_LONGPOLL_MAX_SECONDS
+    timeout = max(0.0, min(timeout, TASK_LONGPOLL_MAX_SECONDS))
+    return _task_status_response(task_id, lambda: wait_for_task(task_id, timeout))
+
+
+def _task_status_response(task_id, load_result):
+    """작업 상태 응답 (load_result: 바로 조회 또는 완료 알림을 기다린 뒤 조회)."""
     try:
-        result = AsyncResult(task_id)
+        result = load_result()
         logger = logging.getLogger(__name__)
         logger.info("get_task_status: polled", extra={"task_id": task_id, "ready": result.ready()})
         
@@ -474,47 +530,8 @@ def handle_profile_conflict(request):
             status=GeneralErrorCode.NOT_CONFLICTS[2],
         )
     
-    pending = pop_conflict_pending() or {}
-    
-    if user_choice == 'yes':
-        # 충돌 항목을 세션에 저장 (캐시)
-        current = get_session_data(session_id)
-        current.update(pending)
-        set_session_data(session_id, current)
-        
-        try:
-            email = request.data.get('username')
-            if not email:
-                chat = ChatMessage.objects.filter(session_id=session_id).order_by('-timestamp').first()
-                email = chat.username if chat else None
-            if email:
-                user = User.objects.get(email=email)
-                field_mapping = {
-                    'age': 'age',
-                    'monthly_income': 'income',
-                    'risk_tolerance': 'risk_tolerance',
-                    'income_stability': 'income_stability',
-                    'income_sources': 'income_source',
-                    'investment_horizon': 'period',
-                    'expected_return': 'expected_income',
-                    'expected_loss': 'expected_loss',
-                    'investment_purpose': 'purpose',
-                    'asset_allocation_type': 'asset_allocation_type',
-                    'value_growth': 'value_growth',
-                    'risk_acceptance_level': 'risk_acceptance_level',
-                    'investment_concern': 'investment_concern',
-                }
-                for field, value in pending.items():
-                    if field in field_mapping:
-                        setattr(user, field_mapping[field], value)
-                user.save()
-        except Exception:
-            pass
-        
-        message = "프로필이 성공적으로 업데이트되었습니다. 계속 진행할게요."
-    else:
-        message = "기존 프로필 정보를 유지합니다. 계속 진행할게요."
-    
+    message = ChatService.resolve_profile_conflict(session_id, user_choice, request.data.get('username'))
+
     return CustomResponse(
         is_success=True,
         code=GeneralSuccessCode.OK[0],
@@ -67,12 +67,13 @@ load_dotenv()
 @csrf_exempt
 def api_index_opensearch(request):
     try:
-        task_id = OpenSearchService.index_async()
+        in_place = str(request.data.get("in_place", "")).lower() in ("1", "true", "yes")
+        task_id = OpenSearchService.index_async(in_place=in_place)
         return CustomResponse(
             is_success=True,
             code=GeneralSuccessCode.OK[0],
             message="인덱싱 작업이 큐에 등록되었습니다.",
-            result={"task_id": task_id},
+            result={"task_id": task_id, "status_url": f"/chats/opensearch/index/{task_id}/"},
             status=202,  # 비동기 처리: Accepted
         )
     except Exception as e:
@@ -82,4 +83,54 @@ def api_index_opensearch(request):
             message=GeneralErrorCode.INTERNAL_SERVER_ERROR[1],
             result={"error": str(e)},
             status=GeneralErrorCode.INTERNAL_SERVER_ERROR[2],
-        )
\ No newline at end of file
+        )
+
+
+@swagger_auto_schema(
+    method="get",
+    operation_description="인덱싱 작업 진행 상황을 조회합니다. (하위 작업별 read/embedded/indexed 합계, rows/sec)",
+    responses={
+        200: openapi.Response(
+            "조회 성공",
+            openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "isSuccess": openapi.Schema(type=openapi.TYPE_BOOLEAN, example=True),
+                    "code": openapi.Schema(type=openapi.TYPE_STRING, example="COMMON200"),
+                    "message": openapi.Schema(type=openapi.TYPE_STRING, example="성공적으로 처리했습니다."),
+                    "result": openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            "task_id": openapi.Schema(type=openapi.TYPE_STRING),
+                            "state": openapi.Schema(type=openapi.TYPE_STRING, example="SUCCESS"),
+                            "catalog_generation": openapi.Schema(type=openapi.TYPE_INTEGER, example=3),
+                            "progress": openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                description="status(running/finalizing/succeeded/failed), totals, tables, rows_per_sec",
+                            ),
+                        }
+                    )
+                }
+            )
+        ),
+    }
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def api_index_opensearch_status(request, task_id):
+    try:
+        return CustomResponse(
+            is_success=True,
+            code=GeneralSuccessCode.OK[0],
+            message=GeneralSuccessCode.OK[1],
+            result=OpenSearchService.index_status(task_id),
+            status=GeneralSuccessCode.OK[2],
+        )
+    except Exception as e:
+        return CustomResponse(
+            is_success=False,
+            code=GeneralErrorCode.INTERNAL_SERVER_ERROR[0],
+            message=GeneralErrorCode.INTERNAL_SERVER_ERROR[1],
+            result={"error": str(e)},
+            status=GeneralErrorCode.INTERNAL_SERVER_ERROR[2],
+        )
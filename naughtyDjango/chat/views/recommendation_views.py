@@ -13,6 +13,7 @@ from main.utils.custom_response import CustomResponse
 from main.constants.error_codes import GeneralErrorCode
 from main.constants.success_codes import GeneralSuccessCode
 from chat.tasks import process_recommend_async
+from chat.deadline import new_deadline, DEADLINE_HEADER
 
 load_dotenv()
 
@@ -76,47 +77,7 @@ def recommend_products(request):
     async=true 이면 Celery로 비동기 처리하고 task_id를 반환합니다.
     """
     try:
-        body = json.loads(request.body or "{}")
-
-        username   = (body.get("username") or "").strip()
-        session_id = (body.get("session_id") or get_session_id(body)).strip()
-        message    = (body.get("message") or "").strip()
-        if not message:
-            return CustomResponse(
-                is_success=False,
-                code=GeneralErrorCode.BAD_REQUEST[0],
-                message="`message` 파라미터가 필요합니다.",
-                result={},
-                status=GeneralErrorCode.BAD_REQUEST[2],
-            )
-
-        # 선택 파라미터(기본값 적용)
-        product_type = (body.get("product_type") or "").strip()
-        index        = (body.get("index") or "financial-products").strip()
-        try:
-            top_k = int(body.get("top_k") or 3)
-            top_k = max(1, min(50, top_k))
-        except Exception:
-            top_k = 3
-
-        # 항상 태스크로 처리
-        task = process_recommend_async.delay(
-            session_id, username, message, product_type, top_k, index
-        )
-
-        logging.getLogger(__name__).info(
-            "recommend: enqueued",
-            extra={"session_id": session_id, "username": username, "task_id": task.id, "top_k": top_k, "index": index, "product_type": product_type}
-        )
-
-        return CustomResponse(
-            is_success=True,
-            code=GeneralSuccessCode.OK[0],
-            message="처리 중입니다...",
-            result={"task_id": task.id, "session_id": session_id, "status": "processing"},
-            status=202,
-        )
-
+        return enqueue_recommendation(json.loads(request.body or "{}"))
     except Exception as e:
         return CustomResponse(
             is_success=False,
@@ -124,4 +85,48 @@ def recommend_products(request):
             message=GeneralErrorCode.INTERNAL_SERVER_ERROR[1],
             result={"error": repr(e)},
             status=GeneralErrorCode.INTERNAL_SERVER_ERROR[2],
-        )
\ No newline at end of file
+        )
+
+
+def enqueue_recommendation(body: dict) -> CustomResponse:
+    """요청 본문을 검증하고 process_recommend_async 를 큐에 넣는다 (sync/async 뷰 공용)."""
+    username   = (body.get("username") or "").strip()
+    session_id = (body.get("session_id") or get_session_id(body)).strip()
+    message    = (body.get("message") or "").strip()
+    if not message:
+        return CustomResponse(
+            is_success=False,
+            code=GeneralErrorCode.BAD_REQUEST[0],
+            message="`message` 파라미터가 필요합니다.",
+            result={},
+            status=GeneralErrorCode.BAD_REQUEST[2],
+        )
+
+    # 선택 파라미터(기본값 적용)
+    product_type = (body.get("product_type") or "").strip()
+    index        = (body.get("index") or "financial-products").strip()
+    try:
+        top_k = int(body.get("top_k") or 3)
+        top_k = max(1, min(50, top_k))
+    except Exception:
+        top_k = 3
+
+    # 항상 태스크로 처리. 요청 마감 시각은 작업 헤더로 넘겨 큐 대기 시간까지 예산에 포함한다
+    deadline = new_deadline()
+    task = process_recommend_async.apply_async(
+        args=(session_id, username, message, product_type, top_k, index),
+        headers={DEADLINE_HEADER: deadline},
+    )
+
+    logging.getLogger(__name__).info(
+        "recommend: enqueued",
+        extra={"session_id": session_id, "username": username, "task_id": task.id, "top_k": top_k, "index": index, "product_type": product_type, "deadline": deadline}
+    )
+
+    return CustomResponse(
+        is_success=True,
+        code=GeneralSuccessCode.OK[0],
+        message="처리 중입니다...",
+        result={"task_id": task.id, "session_id": session_id, "status": "processing"},
+        status=202,
+    )
@@ -0,0 +1,89 @@
+# chat/views/stream_views.py
+import logging
+import os
+import time
+
+from celery.result import AsyncResult
+from django.http import HttpResponse, StreamingHttpResponse
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from chat.stream_events import (
+    TERMINAL_EVENTS, already_delivered, emit_missing_result, read_events, sse_message, terminal_event_id,
+)
+
+logger = logging.getLogger(__name__)
+
+# 연결 하나의 최대 유지 시간(초) — gunicorn timeout(30초)보다 짧게. 넘으면 닫고 클라이언트가 Last-Event-ID 로 재연결
+SSE_MAX_SECONDS = float(os.getenv("SSE_MAX_SECONDS", 25))
+# 이벤트가 없을 때 보내는 keep-alive 주석 간격(초)
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+
+
+class EventStreamRenderer(BaseRenderer):
+    """EventSource 의 Accept: text/event-stream 을 DRF 콘텐츠 협상에서 허용하기 위한 렌더러."""
+
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_message("error", data if isinstance(data, dict) else {"message": str(data)})
+
+
+def _event_stream(task_id: str, last_id: str):
+    started = time.monotonic()
+    yield "retry: 3000\n\n"
+    while time.monotonic() - started < SSE_MAX_SECONDS:
+        block_ms = int(min(SSE_HEARTBEAT_SECONDS, SSE_MAX_SECONDS - (time.monotonic() - started)) * 1000)
+        events = read_events(task_id, last_id, block_ms=max(1, block_ms))
+        for event_id, event, data in events:
+            last_id = event_id
+            yield sse_message(event, data, event_id)
+            if event in TERMINAL_EVENTS:
+                return
+        if events:
+            continue
+
+        # 스트림 기록이 유실됐는데(예: Redis 재시작) 작업은 끝난 경우 결과 백엔드에서 종료 이벤트를 만든다
+        # (스트림에 종료 이벤트가 이미 있으면 다음 XREAD 가 받는다)
+        result = AsyncResult(task_id)
+        if result.ready() and emit_missing_result(task_id, result.state, result.result):
+            continue
+        yield ": keep-alive\n\n"
+    yield sse_message("timeout", {"message": "스트림 연결 시간이 지났습니다. 다시 연결해 주세요."})
+
+
+@swagger_auto_schema(
+    method="get",
+    operation_description=(
+        "작업 응답 스트림 (Server-Sent Events). chat/ 또는 chat_profile_gather/ 가 돌려준 task_id 로 연결합니다.\n"
+        "event: token(답변 조각) / done(최종 결과) / conflict(프로필 충돌) / error / timeout.\n"
+        "done/conflict/error 이후 서버가 연결을 닫습니다. 재연결 시 Last-Event-ID 헤더 또는 last_id 로 이어 받습니다.\n"
+        "종료 이벤트를 이미 받은 뒤의 재연결에는 204 로 응답합니다 (EventSource 재연결 중단)."
+    ),
+    manual_parameters=[
+        openapi.Parameter("task_id", openapi.IN_PATH, type=openapi.TYPE_STRING, required=True,
+                          description="비동기 작업 ID"),
+        openapi.Parameter("last_id", openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          description="이 이벤트 ID 이후부터 받기 (기본값: 처음부터)"),
+    ],
+    responses={200: openapi.Response("text/event-stream"), 204: openapi.Response("종료 이벤트를 이미 받음")},
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def stream_task_events(request, task_id):
+    last_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_id") or "0"
+    logger.info("stream_task_events: connected", extra={"task_id": task_id, "last_id": last_id})
+    if last_id != "0" and already_delivered(terminal_event_id(task_id), last_id):
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(_event_stream(task_id, last_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # nginx 가 응답을 버퍼링하지 않도록
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,30 @@
+"""
+ASGI global for naughtyDjango project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+SERVER_MODE=asgi 로 uvicorn 워커에서 실행한다 (config/docker/entrypoint.prod.sh).
+HTTP 는 Django, WebSocket(ws/...)은 Channels 라우팅(chat/routing.py)으로 보낸다.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+os.environ.setdefault('SERVER_MODE', 'asgi')
+
+# 앱 모듈(consumer → 모델)을 불러오기 전에 Django 를 먼저 초기화
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
+
+from chat.routing import websocket_urlpatterns
+
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    "websocket": AllowedHostsOriginValidator(URLRouter(websocket_urlpatterns)),
+})
@@ -1,5 +1,7 @@
 import os
+import logging
 from celery import Celery
+from celery.signals import task_postrun, worker_process_init, worker_process_shutdown
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,4 +10,36 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
 
 app = Celery('naughtyDjango')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def _reset_pooled_clients(**kwargs):
+    # prefork 자식 프로세스는 부모의 HTTP 커넥션 풀을 공유하지 않도록 새로 시작
+    from chat.gpt.openai_client import reset_clients
+    reset_clients()
+    # 에이전트(LLM 클라이언트/도구/Executor)는 새 커넥션 풀로 자식에서 다시 만든다.
+    # 작업을 받기 전에 미리 만들어 두므로 첫 작업 지연에서 생성 비용이 빠진다
+    from chat.rag.agent import get_finrec_agent, reset_finrec_agent
+    reset_finrec_agent()
+    try:
+        get_finrec_agent()
+    except Exception:
+        logging.getLogger(__name__).exception("finrec agent warm-up failed (built lazily on first task)")
+
+
+@worker_process_shutdown.connect
+def _log_pooled_client_metrics(**kwargs):
+    from chat.gpt.openai_client import client_metrics
+    logging.getLogger('chat.performance').info(f"openai connection metrics: {client_metrics()}")
+
+
+@task_postrun.connect
+def _publish_task_done(sender=None, task_id=None, state=None, retval=None, **kwargs):
+    # 결과가 백엔드에 저장된 뒤 발행되므로, 알림을 받은 뷰는 바로 AsyncResult 를 읽을 수 있다
+    from chat.stream_events import emit_task_result
+    from chat.task_events import TASK_EVENT_TASKS, publish_task_done
+    if sender is not None and sender.name in TASK_EVENT_TASKS:
+        # SSE 스트림에는 토큰과 같은 채널로 종료(done/conflict/error) 이벤트를 남긴다
+        emit_task_result(task_id, state, retval)
+        publish_task_done(task_id, state)
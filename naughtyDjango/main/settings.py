@@ -179,6 +179,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'main.wsgi.application'
+ASGI_APPLICATION = 'main.asgi.application'
+# wsgi: gunicorn sync 워커 + DRF 뷰 / asgi: uvicorn 워커 + 대기형 엔드포인트는 async 뷰 (chat/urls.py)
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
 
 
 # Database